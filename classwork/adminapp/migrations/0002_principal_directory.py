@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+ACCOUNTS = [
+    ('admin', 'adminapp', 'AdminUser', 'admin_username'),
+    ('student', 'studentapp', 'Student', 'stu_no'),
+    ('teacher', 'teacherapp', 'teacher', 'teacher_no'),
+]
+
+
+def fill_directory(apps, schema_editor):
+    PrincipalDirectory = apps.get_model('adminapp', 'PrincipalDirectory')
+    for user_type, app_label, model_name, identifier in ACCOUNTS:
+        model = apps.get_model(app_label, model_name)
+        PrincipalDirectory.objects.bulk_create(
+            [PrincipalDirectory(user_type=user_type, user_id=user_id, login=login)
+             for user_id, login in model.objects.values_list('pk', identifier)],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('studentapp', '0001_initial'),
+        ('teacherapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrincipalDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('login', models.CharField(db_index=True, max_length=150, verbose_name='登录标识')),
+                ('user_type', models.CharField(choices=[('admin', '管理员'), ('student', '学生'), ('teacher', '教师')], max_length=10, verbose_name='账号类型')),
+                ('user_id', models.IntegerField(verbose_name='账号ID')),
+            ],
+            options={
+                'verbose_name': '登录目录',
+                'verbose_name_plural': '登录目录',
+                'db_table': 'principal_directory',
+                'indexes': [models.Index(fields=['user_id'], name='principal_d_user_id_d8acf0_idx')],
+                'unique_together': {('user_type', 'login'), ('user_type', 'user_id')},
+            },
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
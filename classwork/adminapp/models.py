@@ -1,9 +1,10 @@
 from django.db import models
 from studentapp.models import Student, Major
 from teacherapp.models import teacher
+from classwork.principals import PrincipalMixin
 
 # Create your models here.
-class AdminUser(models.Model):
+class AdminUser(PrincipalMixin, models.Model):
     #主键
     admin_id = models.AutoField(primary_key=True)
     admin_name = models.CharField(max_length=150, unique=True)
@@ -14,6 +15,38 @@ class AdminUser(models.Model):
         return self.admin_username
 
 
+class PrincipalDirectory(models.Model):
+    """
+    登录目录：登录标识（学号、工号、管理员用户名）→ 账号类型、主键。
+    登录时一次查询按登录标识找到账号，并按主键从账号表读取密码哈希（classwork/principals.py: find_principal）。
+    账号保存、删除时由 adminapp/signals.py 同步，bulk_create 导入后调用 sync_principal_directory。
+    """
+    USER_TYPE_CHOICES = [
+        ('admin', '管理员'),
+        ('student', '学生'),
+        ('teacher', '教师'),
+    ]
+
+    login = models.CharField(max_length=150, db_index=True, verbose_name='登录标识')
+    user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICES, verbose_name='账号类型')
+    user_id = models.IntegerField(verbose_name='账号ID')
+
+    class Meta:
+        db_table = 'principal_directory'
+        verbose_name = '登录目录'
+        verbose_name_plural = verbose_name
+        unique_together = [
+            ('user_type', 'user_id'),
+            ('user_type', 'login'),
+        ]
+        indexes = [
+            models.Index(fields=['user_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.user_type}:{self.login}'
+
+
 class MutualSelectionEvent(models.Model):
     event_id = models.AutoField(primary_key=True)
     event_name = models.CharField(max_length=255, verbose_name='分组名称')
@@ -0,0 +1,51 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    游标分页：按稳定的排序字段定位下一页，翻到任意深度都只读取一页数据。
+    ?page_size= 调整每页条数；?with_count=1 时额外返回符合条件的总数（多一次 COUNT 查询），
+    next / previous 链接不带 with_count，翻页时不再计数。
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'with_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def encode_cursor(self, cursor):
+        return remove_query_param(super().encode_cursor(cursor), self.count_query_param)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+
+class StudentPagination(KeysetPagination):
+    ordering = 'stu_id'
+
+
+class TeacherPagination(KeysetPagination):
+    ordering = 'teacher_id'
+
+
+class AdminUserPagination(KeysetPagination):
+    ordering = '-admin_id'
+
+
+class MajorPagination(KeysetPagination):
+    ordering = 'major_id'
+
+
+class EventPagination(KeysetPagination):
+    # CursorPagination 只以第一个排序字段作为游标，开始时间可能相同（相同时退化为按偏移量跳过），
+    # 因此按唯一的主键排序，最新创建的活动在前
+    ordering = '-event_id'
@@ -1,4 +1,5 @@
-from django.db.models import Q
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import AdminUser, MutualSelectionEvent
 from django.contrib.auth.hashers import make_password
@@ -6,6 +7,23 @@ from django.utils import timezone
 from studentapp.models import Student, Major
 from teacherapp.models import teacher
 from teamapp.models import Group
+from classwork.fieldsets import SparseFieldsetMixin
+
+def annotate_participant_counts(queryset):
+    """附加 teacher_count / student_count（子查询计数，避免两个多对多连接相乘）"""
+    def count_of(through):
+        return Coalesce(Subquery(
+            through.objects.filter(mutualselectionevent=OuterRef('pk')).values('mutualselectionevent').annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ), 0)
+
+    return queryset.annotate(
+        teacher_count=count_of(MutualSelectionEvent.teachers.through),
+        student_count=count_of(MutualSelectionEvent.students.through),
+    )
+
 
 class AdminUserSerializer(serializers.ModelSerializer):
     """
@@ -271,9 +289,10 @@ class MutualSelectionEventSerializer(serializers.ModelSerializer):
         return data
 
 
-class MutualSelectionEventListSerializer(serializers.ModelSerializer):
-    teachers = TeacherProfileSerializer(many=True, read_only=True)
-    students = SimpleStudentSerializer(many=True, read_only=True)
+class MutualSelectionEventListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    活动列表只返回人数和状态，参与者通过 /mutualselectionevents/<id>/students/、teachers/ 分页获取
+    """
     teacher_count = serializers.IntegerField(read_only=True)
     student_count = serializers.IntegerField(read_only=True)
     status = serializers.SerializerMethodField()
@@ -284,10 +303,9 @@ class MutualSelectionEventListSerializer(serializers.ModelSerializer):
         fields = [
             'event_id', 'event_name', 'stu_start_time', 'stu_end_time',
             'tea_start_time', 'tea_end_time', 'teacher_choice_limit', 'status',
-            'teacher_count', 'student_count', 'group_member_limit','teachers', 'students'
+            'teacher_count', 'student_count', 'group_member_limit'
         ]
 
-
     def get_status(self, obj: MutualSelectionEvent) -> str:
         now = timezone.now()
         if obj.stu_start_time > now and obj.tea_start_time > now:
@@ -295,4 +313,14 @@ class MutualSelectionEventListSerializer(serializers.ModelSerializer):
         elif obj.stu_end_time < now and obj.tea_end_time < now:
             return "已结束"
         else:
-            return "进行中"
\ No newline at end of file
+            return "进行中"
+
+
+class MutualSelectionEventDetailSerializer(MutualSelectionEventListSerializer):
+    """单个活动详情，附带全部参与者（编辑活动时使用）"""
+    teachers = TeacherProfileSerializer(many=True, read_only=True)
+    students = SimpleStudentSerializer(many=True, read_only=True)
+
+    class Meta(MutualSelectionEventListSerializer.Meta):
+        fields = MutualSelectionEventListSerializer.Meta.fields + ['teachers', 'students']
+        expandable_fields = ('teachers', 'students')
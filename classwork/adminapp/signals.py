@@ -0,0 +1,44 @@
+"""
+管理员、学生、教师账号保存或删除时，使认证用户缓存失效（classwork/principals.py），删除时撤销令牌，并同步登录目录。
+bulk_create 不会触发这些信号，批量导入后需要调用 sync_principal_directory。
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from classwork.principals import (
+    invalidate_principal, remove_from_directory, restore_principal, revoke_principal, update_directory,
+)
+from studentapp.models import Student
+from teacherapp.models import teacher
+
+from .models import AdminUser
+
+USER_TYPES = {
+    AdminUser: 'admin',
+    Student: 'student',
+    teacher: 'teacher',
+}
+
+
+@receiver([post_save, post_delete], sender=AdminUser)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=teacher)
+def account_changed(sender, instance, **kwargs):
+    invalidate_principal(USER_TYPES[sender], instance.pk)
+
+
+@receiver(post_save, sender=AdminUser)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=teacher)
+def account_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        restore_principal(USER_TYPES[sender], instance.pk)
+    update_directory(USER_TYPES[sender], instance, update_fields)
+
+
+@receiver(post_delete, sender=AdminUser)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=teacher)
+def account_deleted(sender, instance, **kwargs):
+    revoke_principal(USER_TYPES[sender], instance.pk)
+    remove_from_directory(USER_TYPES[sender], instance.pk)
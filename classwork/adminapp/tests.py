@@ -1,3 +1,461 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from classwork import admission
+from classwork.admission import SUMMED_STATS, AdmissionGate, admission_stats, reset_gates
+from classwork.principals import principal_token, reset_principal_cache, sync_principal_directory
+from studentapp.models import Major, Student
+from teacherapp.models import teacher
+
+from .authentication import AdminUserBackend, MultiModelBackend
+from .models import AdminUser, MutualSelectionEvent, PrincipalDirectory
+
+
+class PrincipalCacheTests(TestCase):
+    """JWT 认证由令牌声明构造用户，其他字段按需从缓存读取；账号修改、删除后立即生效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(stu_no='AUTH', stu_name='认证', grade='2024')
+        cls.student.set_password('old-password')
+        cls.student.save()
+
+    def setUp(self):
+        reset_principal_cache()
+
+    def token_client(self, user_id, user_type):
+        refresh = RefreshToken()
+        refresh['user_id'] = user_id
+        refresh['user_type'] = user_type
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        return client
+
+    def test_claims_principal(self):
+        # 只用到类型和主键的接口不读取账号
+        client = self.token_client(self.student.pk, 'student')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/teams/student/history/').status_code, 200)
+        self.assertFalse(any('FROM "student"' in query['sql'] for query in ctx.captured_queries))
+
+    def test_cached_between_requests(self):
+        client = self.token_client(self.student.pk, 'student')
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(client.get('/api/student/profile/').json()['stu_name'], '认证')
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(client.get('/api/student/profile/').status_code, 200)
+        self.assertEqual(len(second), len(first) - 1)
+        self.assertFalse(any('"password"' in query['sql'] for query in first.captured_queries))
+
+    def test_invalidated_on_change(self):
+        client = self.token_client(self.student.pk, 'student')
+        self.assertEqual(client.get('/api/student/profile/').json()['phone'], None)
+
+        # 修改密码时按需读取密码哈希
+        response = client.put('/api/student/profile/', {
+            'phone': '13800000000', 'old_password': 'old-password',
+            'new_password': 'new-password', 'confirm_password': 'new-password',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/student/profile/').json()['phone'], '13800000000')
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('new-password'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        self.assertEqual(client.get('/api/student/profile/').status_code, 403)
+
+    def login(self):
+        response = APIClient().post('/api/student/login/', {'stu_no': 'AUTH', 'password': 'old-password'})
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        return client, response.json()['refresh']
+
+    def test_login_token(self):
+        client, _ = self.login()
+        # 登录时只加载了主键和学号，之后的请求从缓存读取整行
+        with CaptureQueriesContext(connection) as ctx:
+            data = client.get('/api/student/profile/').json()
+        self.assertEqual(sum('FROM "student"' in query['sql'] for query in ctx.captured_queries), 1)
+        self.assertEqual((data['stu_no'], data['stu_name']), ('AUTH', '认证'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/student/profile/').status_code, 200)
+        self.assertFalse(any('FROM "student"' in query['sql'] for query in ctx.captured_queries))
+
+    def test_deleted_account(self):
+        client, refresh = self.login()
+        self.assertEqual(client.get('/api/teams/student/history/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        self.assertEqual(client.get('/api/teams/student/history/').status_code, 403)
+        response = APIClient().post('/api/student/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_admin(self):
+        AdminUser.objects.create(admin_name='临时', admin_username='temp', admin_password=make_password('pw'))
+        response = APIClient().post('/api/admin/login/', {'admin_username': 'temp', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(client.get('/api/admin/admission-stats/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminUser.objects.filter(admin_username='temp').delete()
+        self.assertEqual(client.get('/api/admin/admission-stats/').status_code, 403)
+        self.assertEqual(client.get('/api/admin/students/').status_code, 403)
+        refresh = APIClient().post('/api/admin/token/refresh/', {'refresh': response.json()['refresh']})
+        self.assertEqual(refresh.status_code, 401)
+
+    def test_deleted_in_other_process(self):
+        # 其他进程删除的账号（本进程没有撤销标记）：访问其他字段时发现账号不存在，之后直接拒绝
+        client = self.token_client(self.student.pk, 'student')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        reset_principal_cache()
+        self.assertEqual(client.get('/api/student/profile/').status_code, 401)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/teams/student/history/').status_code, 403)
+        self.assertEqual(len(ctx), 0)
+
+    def test_restored_on_create(self):
+        client = self.token_client(self.student.pk, 'student')
+        pk = self.student.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        self.assertEqual(client.get('/api/teams/student/history/').status_code, 403)
+        Student.objects.create(stu_id=pk, stu_no='AUTH-2', stu_name='新建', grade='2024')
+        self.assertEqual(client.get('/api/student/profile/').json()['stu_no'], 'AUTH-2')
+
+    def test_unknown_user(self):
+        # 令牌由本服务签发，不存在的账号在访问其他字段时拒绝
+        self.assertEqual(self.token_client(0, 'student').get('/api/student/profile/').status_code, 401)
+        self.assertEqual(self.token_client(self.student.pk, 'unknown').get('/api/student/profile/').status_code, 403)
+
+    def test_token_claims(self):
+        token = principal_token('student', self.student).access_token
+        self.assertEqual((token['user_type'], token['user_id']), ('student', self.student.pk))
+        self.assertNotIn('principal', token)
+
+
+class PrincipalDirectoryTests(TestCase):
+    """登录按登录目录一次查询，账号修改、删除、批量导入后目录保持一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(stu_no='DIR', stu_name='目录', grade='2024')
+        cls.student.set_password('student-password')
+        cls.student.save()
+        cls.teacher = teacher.objects.create(teacher_no='DIR', teacher_name='目录')
+        cls.teacher.set_password('teacher-password')
+        cls.teacher.save()
+
+    def student_login(self, stu_no, password):
+        return APIClient().post('/api/student/login/', {'stu_no': stu_no, 'password': password})
+
+    def test_login_single_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.student_login('DIR', 'student-password').status_code, 200)
+        self.assertEqual(len(ctx), 1)
+        self.assertIn('"principal_directory"', ctx.captured_queries[0]['sql'])
+        self.assertEqual(self.student_login('DIR', 'teacher-password').status_code, 401)
+        self.assertEqual(self.student_login('MISSING', 'student-password').status_code, 401)
+
+    def test_backends(self):
+        backend = MultiModelBackend()
+        # 同一登录标识：教师优先，密码不符时再校验学生
+        self.assertIsInstance(backend.authenticate(None, username='DIR', password='teacher-password'), teacher)
+        user = backend.authenticate(None, username='DIR', password='student-password')
+        self.assertIsInstance(user, Student)
+        self.assertEqual((user.pk, user.stu_name), (self.student.pk, '目录'))
+        self.assertIsNone(backend.authenticate(None, username='DIR', password='wrong'))
+        self.assertIsInstance(backend.get_user(self.teacher.pk), teacher)
+        self.assertIsNone(AdminUserBackend().authenticate(None, admin_username='DIR', password='teacher-password'))
+
+    def test_kept_in_sync(self):
+        self.student.stu_no = 'DIR-2'
+        self.student.save()
+        self.assertEqual(self.student_login('DIR', 'student-password').status_code, 401)
+        self.assertEqual(self.student_login('DIR-2', 'student-password').status_code, 200)
+
+        self.student.set_password('changed')
+        self.student.save(update_fields=['password'])
+        self.assertEqual(self.student_login('DIR-2', 'changed').status_code, 200)
+
+        self.student.delete()
+        self.assertFalse(PrincipalDirectory.objects.filter(user_type='student').exists())
+
+    def test_bulk_import(self):
+        imported = Student(stu_no='BULK', stu_name='导入', grade='2024')
+        imported.set_password('bulk-password')
+        Student.objects.bulk_create([imported])
+        self.assertEqual(self.student_login('BULK', 'bulk-password').status_code, 401)
+        sync_principal_directory('student', ['BULK'])
+        self.assertEqual(self.student_login('BULK', 'bulk-password').status_code, 200)
+
+    def test_password_changed_without_signals(self):
+        # 密码只保存在账号表：绕过保存信号的修改同样立即生效
+        Student.objects.filter(pk=self.student.pk).update(password=make_password('updated'))
+        self.assertEqual(self.student_login('DIR', 'student-password').status_code, 401)
+        self.assertEqual(self.student_login('DIR', 'updated').status_code, 200)
+
+        # 登录标识被直接修改、目录未同步时，旧的登录标识不能登录
+        Student.objects.filter(pk=self.student.pk).update(stu_no='DIR-3')
+        self.assertEqual(self.student_login('DIR', 'updated').status_code, 401)
+
+
+class AdmissionControlTests(TestCase):
+    """登录、重置密码的并发闸门：超出并发时排队，队列已满或排队超时返回 429"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.stats_dir = directory.name
+        stats_settings = override_settings(ADMISSION_STATS_DIR=directory.name)
+        stats_settings.enable()
+        self.addCleanup(stats_settings.disable)
+        reset_gates()
+        self.addCleanup(reset_gates)
+
+    def test_gate(self):
+        gate = AdmissionGate('test', max_concurrent=1, max_queue=1, queue_timeout=0.05, retry_after=1)
+        self.assertTrue(gate.acquire())
+        # 排队超时
+        self.assertFalse(gate.acquire())
+        self.assertEqual(gate.stats()['timed_out'], 1)
+
+        # 排队中的请求在名额释放后执行；此时队列已满，新请求立即被拒绝
+        gate.queue_timeout = 5
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(gate.acquire()))
+        waiter.start()
+        while gate.stats()['queue_depth'] == 0:
+            pass
+        self.assertFalse(gate.acquire())
+        gate.release()
+        waiter.join()
+        self.assertEqual(results, [True])
+        self.assertEqual(gate.stats(), {
+            'max_concurrent': 1, 'max_queue': 1, 'active': 1, 'queue_depth': 0, 'max_queue_depth': 1,
+            'admitted': 2, 'rejected': 1, 'timed_out': 1,
+        })
+
+    @override_settings(ADMISSION_CONTROL={'login': {'MAX_CONCURRENT': 0, 'MAX_QUEUE': 0, 'RETRY_AFTER': 3}})
+    def test_login_rejected_when_full(self):
+        response = APIClient().post('/api/student/login/', {'stu_no': 'ANY', 'password': 'any'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+
+        admin = AdminUser.objects.create(admin_name='监控', admin_username='monitor', admin_password='')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", admin).access_token}')
+        stats = client.get('/api/admin/admission-stats/').json()['gates']
+        self.assertEqual((stats['login']['rejected'], stats['login']['admitted']), (1, 0))
+        self.assertEqual(stats['login']['queue_depth'], 0)
+
+    @override_settings(ADMISSION_CONTROL={'login': {'MAX_CONCURRENT': 0, 'MAX_QUEUE': 0}})
+    def test_published_in_background(self):
+        # 请求（包括 429）不写文件，由后台线程随后写入本进程的状态
+        publish = admission._publish
+        writers = []
+
+        def record():
+            writers.append(threading.current_thread().name)
+            publish()
+
+        path = os.path.join(self.stats_dir, f'{os.getpid()}.json')
+        with mock.patch.object(admission, 'PUBLISH_INTERVAL', 0.05), mock.patch.object(admission, '_publish', record):
+            for _ in range(3):
+                response = APIClient().post('/api/student/login/', {'stu_no': 'ANY', 'password': 'any'})
+                self.assertEqual(response.status_code, 429)
+            for _ in range(200):
+                if os.path.exists(path):
+                    break
+                threading.Event().wait(0.01)
+        self.assertTrue(writers)
+        self.assertEqual(set(writers), {'admission-stats'})
+        with open(path) as f:
+            self.assertEqual(json.load(f)['gates']['login']['rejected'], 3)
+
+    def test_stats_across_processes(self):
+        def write(pid, rejected):
+            stats = dict.fromkeys(SUMMED_STATS, 0) | {'max_concurrent': 2, 'max_queue_depth': rejected, 'rejected': rejected}
+            with open(os.path.join(self.stats_dir, f'{pid}.json'), 'w') as f:
+                json.dump({'pid': pid, 'gates': {'login': stats}}, f)
+
+        # 另一个存活的工作进程，以及一个已退出的进程
+        write(os.getppid(), 2)
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        write(exited.pid, 5)
+
+        stats = admission_stats()
+        self.assertEqual(sorted(data['pid'] for data in stats['processes']), sorted([os.getpid(), os.getppid()]))
+        self.assertEqual(stats['gates']['login']['rejected'], 2)
+        self.assertEqual(stats['gates']['login']['max_concurrent'], 2 + settings.ADMISSION_CONTROL['login']['MAX_CONCURRENT'])
+        self.assertFalse(os.path.exists(os.path.join(self.stats_dir, f'{exited.pid}.json')))
+
+
+class KeysetPaginationTests(TestCase):
+    """管理端列表的游标分页：翻页往返、with_count、同一开始时间的活动"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AdminUser.objects.create(admin_name='分页', admin_username='page-admin', admin_password='-')
+        cls.students = [
+            Student.objects.create(stu_no=f'P{i:02d}', stu_name=f'分页{i}', grade='2023' if i % 2 else '2024')
+            for i in range(7)
+        ]
+        start = timezone.now()
+        cls.events = [
+            MutualSelectionEvent.objects.create(
+                event_name=f'活动{i}', stu_start_time=start if i < 4 else start + timedelta(days=1),
+                stu_end_time=start + timedelta(days=2), tea_start_time=start, tea_end_time=start + timedelta(days=2),
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", self.admin).access_token}')
+
+    def walk(self, url, direction='next'):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            url = data[direction]
+        return pages
+
+    def test_cursor_round_trip(self):
+        pages = self.walk('/api/admin/students/?page_size=3')
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        forward = [student['stu_id'] for page in pages for student in page['results']]
+        self.assertEqual(forward, [student.pk for student in self.students])
+
+        # 从最后一页沿 previous 翻回第一页，每页内容与正向时一致
+        backward = self.walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(
+            [page['results'] for page in backward],
+            [page['results'] for page in reversed(pages[:-1])],
+        )
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_with_count(self):
+        data = self.client.get('/api/admin/students/?page_size=3').json()
+        self.assertNotIn('count', data)
+
+        data = self.client.get('/api/admin/students/?page_size=3&with_count=1&grade=2024').json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(len(data['results']), 3)
+        # 翻页时不再计数
+        self.assertNotIn('count', self.client.get(data['next']).json())
+
+    def test_events_with_same_start_time(self):
+        # 按主键翻页，开始时间相同的活动不会重复或遗漏
+        pages = self.walk('/api/admin/mutualselectionevents/?page_size=2')
+        ids = [event['event_id'] for page in pages for event in page['results']]
+        self.assertEqual(ids, [event.pk for event in reversed(self.events)])
+        backward = self.walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(
+            [page['results'] for page in backward],
+            [page['results'] for page in reversed(pages[:-1])],
+        )
+
+    def test_grades(self):
+        self.assertEqual(self.client.get('/api/admin/students/grades/').json(), ['2023', '2024'])
+
+
+class EventParticipantsTests(TestCase):
+    """活动参与者子资源（分页、搜索、with_count）和参与者 ID 接口"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AdminUser.objects.create(admin_name='参与者', admin_username='participant-admin', admin_password='-')
+        major = Major.objects.create(major_name='软件工程')
+        cls.students = [
+            Student.objects.create(stu_no=f'E{i:02d}', stu_name=f'参与{i}', grade='2024', major=major if i < 2 else None)
+            for i in range(5)
+        ]
+        cls.teachers = [teacher.objects.create(teacher_no=f'ET{i}', teacher_name=f'导师{i}') for i in range(3)]
+        now = timezone.now()
+        times = dict(stu_start_time=now, stu_end_time=now + timedelta(days=1),
+                     tea_start_time=now, tea_end_time=now + timedelta(days=1))
+        cls.event = MutualSelectionEvent.objects.create(event_name='当前', **times)
+        cls.event.students.set(cls.students[:4])
+        cls.event.teachers.set(cls.teachers[:2])
+        cls.other = MutualSelectionEvent.objects.create(event_name='其他', **times)
+        cls.other.students.set(cls.students[3:])
+        cls.other.teachers.set(cls.teachers[2:])
+        ended = MutualSelectionEvent.objects.create(
+            event_name='已结束', stu_start_time=now - timedelta(days=3), stu_end_time=now - timedelta(days=2),
+            tea_start_time=now - timedelta(days=3), tea_end_time=now - timedelta(days=2),
+        )
+        ended.students.set(cls.students)
+        ended.teachers.set(cls.teachers)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", self.admin).access_token}')
+
+    def test_students(self):
+        url = f'/api/admin/mutualselectionevents/{self.event.pk}/students/'
+        data = self.client.get(url, {'page_size': 3, 'with_count': 1}).json()
+        self.assertEqual(data['count'], 4)
+        rest = self.client.get(data['next']).json()
+        self.assertNotIn('count', rest)
+        self.assertIsNone(rest['next'])
+        self.assertEqual(
+            [s['stu_id'] for s in data['results'] + rest['results']],
+            [s.pk for s in self.students[:4]],
+        )
+
+        # 按专业搜索
+        data = self.client.get(url, {'search': '软件', 'with_count': 1}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([s['stu_no'] for s in data['results']], ['E00', 'E01'])
+
+    def test_teachers(self):
+        url = f'/api/admin/mutualselectionevents/{self.event.pk}/teachers/'
+        data = self.client.get(url, {'with_count': 1}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([t['teacher_no'] for t in data['results']], ['ET0', 'ET1'])
+        self.assertEqual(self.client.get(url, {'search': '导师1'}).json()['results'][0]['teacher_no'], 'ET1')
+        self.assertNotIn('count', self.client.get(url, {'search': '导师1'}).json())
+
+        self.assertEqual(self.client.get('/api/admin/mutualselectionevents/999999/teachers/').status_code, 404)
+
+    def test_participant_ids(self):
+        data = self.client.get(f'/api/admin/mutualselectionevents/{self.event.pk}/participant-ids/').json()
+        self.assertEqual(data, {
+            'teacher_ids': [t.pk for t in self.teachers[:2]],
+            'student_ids': [s.pk for s in self.students[:4]],
+        })
+
+    def test_busy_participants(self):
+        # 已结束的活动不占用参与者
+        url = '/api/admin/mutualselectionevents/busy-participants/'
+        data = self.client.get(url, {'exclude': self.event.pk}).json()
+        self.assertEqual(data, {
+            'teacher_ids': [self.teachers[2].pk],
+            'student_ids': [s.pk for s in self.students[3:]],
+        })
+
+        data = self.client.get(url).json()
+        self.assertEqual(data['teacher_ids'], [t.pk for t in self.teachers])
+        self.assertEqual(data['student_ids'], [s.pk for s in self.students])
+        self.assertEqual(self.client.get(url, {'exclude': 'x'}).status_code, 400)
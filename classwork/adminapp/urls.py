@@ -6,6 +6,7 @@ from .views import (
     LoginView,
     AdminUserManagementViewSet,
     AdminProfileView,
+    AdmissionStatsView,
     StudentManagementViewSet,
     DownloadStudentTemplateView,
     BulkRegisterStudentsView,
@@ -34,6 +35,22 @@ mutual_selection_bulk_delete = MutualSelectionEventViewSet.as_view({
     'post': 'bulk_delete' # POST 请求映射到 bulk_delete 方法
 })
 
+mutual_selection_students = MutualSelectionEventViewSet.as_view({
+    'get': 'participant_students'  # 活动参与学生（分页、搜索）
+})
+
+mutual_selection_teachers = MutualSelectionEventViewSet.as_view({
+    'get': 'participant_teachers'  # 活动参与教师（分页、搜索）
+})
+
+mutual_selection_participant_ids = MutualSelectionEventViewSet.as_view({
+    'get': 'participant_ids'  # 活动参与者 ID
+})
+
+mutual_selection_busy_participants = MutualSelectionEventViewSet.as_view({
+    'get': 'busy_participants'  # 已参与其他未结束活动的教师、学生 ID
+})
+
 mutual_selection_auto_assign = MutualSelectionEventViewSet.as_view({
     'post': 'auto_assign'  # POST 请求映射到 auto_assign 方法
 })
@@ -50,6 +67,9 @@ urlpatterns = [
 
     path('profile/', AdminProfileView.as_view(), name='admin-profile'),
 
+    # 登录、重置密码准入控制的状态
+    path('admission-stats/', AdmissionStatsView.as_view(), name='admission-stats'),
+
     # simple-jwt 提供的用于刷新 access token 的接口
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
@@ -78,5 +98,9 @@ urlpatterns = [
     path('mutualselectionevents/<int:pk>/', mutual_selection_detail, name='mutual-selection-event-detail'),
     # 批量删除
     path('mutualselectionevents/bulk-delete/', mutual_selection_bulk_delete, name='mutual-selection-event-bulk-delete'),
+    path('mutualselectionevents/<int:pk>/students/', mutual_selection_students, name='mutual-selection-event-students'),
+    path('mutualselectionevents/<int:pk>/teachers/', mutual_selection_teachers, name='mutual-selection-event-teachers'),
+    path('mutualselectionevents/<int:pk>/participant-ids/', mutual_selection_participant_ids, name='mutual-selection-event-participant-ids'),
+    path('mutualselectionevents/busy-participants/', mutual_selection_busy_participants, name='mutual-selection-event-busy-participants'),
     path('mutualselectionevents/<int:pk>/auto-assign/', mutual_selection_auto_assign,name='mutual-selection-event-auto-assign'),
 ]
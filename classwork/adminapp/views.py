@@ -1,4 +1,4 @@
-from django.db.models import Count, Q
+from django.db.models import Q
 from django.utils import timezone
 import django_filters
 from django.contrib.auth import authenticate
@@ -16,7 +16,11 @@ from .serializers import (
     AdminUserSerializer, LoginSerializer, UserProfileSerializer,
     StudentManagementSerializer, StudentListSerializer, MajorSerializer,
     TeacherManagementSerializer, TeacherProfileSerializer,
-    MutualSelectionEventListSerializer, MutualSelectionEventSerializer
+    MutualSelectionEventListSerializer, MutualSelectionEventSerializer,
+    MutualSelectionEventDetailSerializer, SimpleStudentSerializer, annotate_participant_counts
+)
+from .pagination import (
+    AdminUserPagination, EventPagination, MajorPagination, StudentPagination, TeacherPagination,
 )
 from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
@@ -33,6 +37,11 @@ from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.exceptions import TokenError
 
 from teamapp.views import is_admin
+from teamapp.matching.loader import invalidate_score_matrix
+from teamapp.versioning import bump_event_version
+from classwork.admission import admission_controlled, admission_stats
+from classwork.principals import get_principal, principal_token, sync_principal_directory
+from classwork.streaming import serialized_array, stream_json_response, wants_stream
 
 
 
@@ -52,6 +61,7 @@ class LoginView(APIView):
     permission_classes = [AllowAny]
     serializer_class = LoginSerializer
 
+    @admission_controlled('login')
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -62,9 +72,7 @@ class LoginView(APIView):
         user = authenticate(request, admin_username=admin_username_val, password=password_val)
 
         if user and isinstance(user, AdminUser):
-            refresh = RefreshToken()
-            refresh['user_id'] = user.admin_id
-            refresh['user_type'] = 'admin'
+            refresh = principal_token('admin', user)
 
             return Response({
                 'refresh': str(refresh),
@@ -74,6 +82,18 @@ class LoginView(APIView):
             return Response({'detail': '用户名或密码错误。'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+class AdmissionStatsView(views.APIView):
+    """
+    各工作进程登录、重置密码闸门的状态（执行中、排队数、拒绝次数等）及合计，供监控采集。
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        if not is_admin(request.user):
+            return Response({'error': '只有管理员可以查看'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(admission_stats())
+
+
 class AdminProfileView(views.APIView):
     """
     管理员查看和更新自己的个人信息
@@ -212,7 +232,10 @@ class BulkRegisterView(views.APIView):
                 )
             )
 
-        AdminUser.objects.bulk_create(users_to_create)
+        with transaction.atomic():
+            AdminUser.objects.bulk_create(users_to_create)
+            # bulk_create 不触发信号，手动同步登录目录
+            sync_principal_directory('admin', [user.admin_username for user in users_to_create])
 
         return Response({'message': f'成功注册 {len(users_to_create)} 名用户。'}, status=status.HTTP_201_CREATED)
 
@@ -306,6 +329,7 @@ class BulkRegisterTeachersView(views.APIView):
         if teachers_to_create:
             with transaction.atomic():
                 teacher.objects.bulk_create(teachers_to_create)
+                sync_principal_directory('teacher', [t.teacher_no for t in teachers_to_create])
 
         return Response({
             'message': f'处理完成。成功注册 {len(teachers_to_create)} 名教师。',
@@ -433,6 +457,7 @@ class BulkRegisterStudentsView(views.APIView):
             with transaction.atomic():
                 for i in range(0, len(students_to_create), self.BATCH_SIZE):
                     Student.objects.bulk_create(students_to_create[i:i+self.BATCH_SIZE])
+                sync_principal_directory('student', [s.stu_no for s in students_to_create])
 
         return Response({
             'message': f'处理完成。成功注册 {len(students_to_create)} 名学生。',
@@ -450,6 +475,7 @@ class AdminUserManagementViewSet(viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['admin_username', 'admin_name']
+    pagination_class = AdminUserPagination
 
     def get_serializer_class(self):
         """根据操作返回不同的序列化器"""
@@ -525,6 +551,7 @@ class TeacherManagementViewSet(viewsets.ModelViewSet):
     queryset = teacher.objects.all().order_by('teacher_id')
     filter_backends = [filters.SearchFilter]
     search_fields = ['teacher_no', 'teacher_name']
+    pagination_class = TeacherPagination
 
     def get_serializer_class(self):
         """根据操作返回不同的序列化器。"""
@@ -547,6 +574,12 @@ class TeacherManagementViewSet(viewsets.ModelViewSet):
             )
 
         # ✅ 1. 清理这些教师在所有活动中的团队志愿
+        affected_event_ids = set(Group.objects.filter(
+            Q(preferred_advisor_1_id__in=teacher_ids) |
+            Q(preferred_advisor_2_id__in=teacher_ids) |
+            Q(preferred_advisor_3_id__in=teacher_ids)
+        ).values_list('event_id', flat=True))
+        advised_event_ids = set(Group.objects.filter(advisor_id__in=teacher_ids).values_list('event_id', flat=True))
         Group.objects.filter(preferred_advisor_1_id__in=teacher_ids).update(preferred_advisor_1=None)
         Group.objects.filter(preferred_advisor_2_id__in=teacher_ids).update(preferred_advisor_2=None)
         Group.objects.filter(preferred_advisor_3_id__in=teacher_ids).update(preferred_advisor_3=None)
@@ -557,6 +590,9 @@ class TeacherManagementViewSet(viewsets.ModelViewSet):
         # ✅ 3. 删除教师（外键级联会自动删除 TeacherGroupPreference 和 ProvisionalAssignment）
         queryset = self.get_queryset().filter(teacher_id__in=teacher_ids)
         deleted_count, _ = queryset.delete()
+        # QuerySet.update 不触发信号，手动使得分矩阵缓存失效、活动数据版本号自增
+        invalidate_score_matrix(affected_event_ids)
+        bump_event_version(affected_event_ids | advised_event_ids)
 
         return Response(
             {'message': f'成功删除 {deleted_count} 名教师及其所有活动关联数据。'},
@@ -603,6 +639,7 @@ class StudentManagementViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_class = StudentFilter
     search_fields = ['stu_no', 'stu_name']
+    pagination_class = StudentPagination
 
     def get_serializer_class(self):
         """根据不同的操作(action)，使用不同的序列化器。"""
@@ -610,6 +647,21 @@ class StudentManagementViewSet(viewsets.ModelViewSet):
             return StudentListSerializer
         return StudentManagementSerializer
 
+    def list(self, request, *args, **kwargs):
+        """?stream=1 时不分页，分批读取并流式输出全部符合条件的学生"""
+        if not wants_stream(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_json_response(
+            serialized_array(queryset, self.get_serializer_class(), context=self.get_serializer_context())
+        )
+
+    @action(detail=False, methods=['get'], url_path='grades')
+    def grades(self, request, *args, **kwargs):
+        """所有年级（去重、排序），供列表分页后的年级筛选使用"""
+        grades = Student.objects.order_by('grade').values_list('grade', flat=True).distinct()
+        return Response(list(grades))
+
     @action(detail=False, methods=['post'], url_path='bulk-delete')
     @transaction.atomic
     def bulk_delete(self, request, *args, **kwargs):
@@ -655,31 +707,111 @@ class MajorListView(generics.ListAPIView):
     """
     queryset = Major.objects.all()
     serializer_class = MajorSerializer
+    pagination_class = MajorPagination
 
 
 class MutualSelectionEventViewSet(viewsets.ModelViewSet):
     """
     ✅ 修正：互选活动管理视图集，完善多活动支持
     """
-    queryset = MutualSelectionEvent.objects.prefetch_related(
-        'teachers', 'students__major'
-    ).annotate(
-        teacher_count=Count('teachers', distinct=True),
-        student_count=Count('students', distinct=True)
-    ).all().order_by('-stu_start_time')
+    queryset = annotate_participant_counts(MutualSelectionEvent.objects.all()).order_by('-event_id')
 
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['event_name']
+    pagination_class = EventPagination
     filterset_fields = {
         'stu_start_time': ['gte', 'lte'], 'stu_end_time': ['gte', 'lte'],
         'tea_start_time': ['gte', 'lte'], 'tea_end_time': ['gte', 'lte'],
     }
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action == 'list':
             return MutualSelectionEventListSerializer
+        if self.action == 'retrieve':
+            return MutualSelectionEventDetailSerializer
         return MutualSelectionEventSerializer
 
+    def get_queryset(self):
+        """详情只预取 ?fields= / ?expand= 请求到的参与者；列表不含参与者"""
+        queryset = super().get_queryset()
+        if self.action != 'retrieve':
+            return queryset
+        fields = MutualSelectionEventDetailSerializer.selected_fields(self.request)
+        if fields is None or 'teachers' in fields:
+            queryset = queryset.prefetch_related('teachers')
+        if fields is None or 'students' in fields:
+            queryset = queryset.prefetch_related('students__major')
+        return queryset
+
+    def _paginate_participants(self, request, pk, queryset, search_fields, serializer_class, pagination_class):
+        if not MutualSelectionEvent.objects.filter(pk=pk).exists():
+            return Response({'error': '活动不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        search = request.query_params.get('search', '').strip()
+        if search:
+            condition = Q()
+            for field in search_fields:
+                condition |= Q(**{f'{field}__icontains': search})
+            queryset = queryset.filter(condition)
+
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path='students')
+    def participant_students(self, request, pk=None):
+        """活动参与学生，游标分页；?search= 按学号、姓名、专业搜索"""
+        return self._paginate_participants(
+            request, pk,
+            Student.objects.filter(mutual_selection_events=pk).select_related('major'),
+            ('stu_no', 'stu_name', 'major__major_name'),
+            SimpleStudentSerializer,
+            StudentPagination
+        )
+
+    @action(detail=True, methods=['get'], url_path='teachers')
+    def participant_teachers(self, request, pk=None):
+        """活动参与教师，游标分页；?search= 按工号、姓名、研究方向搜索"""
+        return self._paginate_participants(
+            request, pk,
+            teacher.objects.filter(mutual_selection_events=pk),
+            ('teacher_no', 'teacher_name', 'research_direction'),
+            TeacherProfileSerializer,
+            TeacherPagination
+        )
+
+    @action(detail=True, methods=['get'], url_path='participant-ids')
+    def participant_ids(self, request, pk=None):
+        """活动参与者的 ID，供编辑弹窗回填已选人员"""
+        if not MutualSelectionEvent.objects.filter(pk=pk).exists():
+            return Response({'error': '活动不存在'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'teacher_ids': list(MutualSelectionEvent.teachers.through.objects.filter(
+                mutualselectionevent_id=pk).order_by('teacher_id').values_list('teacher_id', flat=True)),
+            'student_ids': list(MutualSelectionEvent.students.through.objects.filter(
+                mutualselectionevent_id=pk).order_by('student_id').values_list('student_id', flat=True)),
+        })
+
+    @action(detail=False, methods=['get'], url_path='busy-participants')
+    def busy_participants(self, request):
+        """
+        已参与其他未结束活动的教师、学生 ID（不能再加入新活动）。
+        ?exclude= 排除正在编辑的活动。
+        """
+        now = timezone.now()
+        events = MutualSelectionEvent.objects.exclude(stu_end_time__lt=now, tea_end_time__lt=now)
+        exclude = request.query_params.get('exclude')
+        if exclude:
+            if not exclude.isdigit():
+                return Response({'error': 'exclude 必须是活动ID'}, status=status.HTTP_400_BAD_REQUEST)
+            events = events.exclude(pk=exclude)
+        return Response({
+            'teacher_ids': list(MutualSelectionEvent.teachers.through.objects.filter(
+                mutualselectionevent__in=events).order_by('teacher_id').values_list('teacher_id', flat=True).distinct()),
+            'student_ids': list(MutualSelectionEvent.students.through.objects.filter(
+                mutualselectionevent__in=events).order_by('student_id').values_list('student_id', flat=True).distinct()),
+        })
+
     @transaction.atomic
     def update(self, request, *args, **kwargs):
         """
@@ -740,6 +872,8 @@ class MutualSelectionEventViewSet(viewsets.ModelViewSet):
             Group.objects.filter(event=instance, preferred_advisor_3_id__in=removed_teacher_ids).update(
                 preferred_advisor_3=None)
             Group.objects.filter(event=instance, advisor_id__in=removed_teacher_ids).update(advisor=None)
+            invalidate_score_matrix(instance.pk)
+            bump_event_version(instance.pk)
 
         return Response(self.get_serializer(instance).data)
 
@@ -838,6 +972,13 @@ def refresh_admin_token(request):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # 账号已删除的令牌不能再刷新
+        if get_principal('admin', refresh.get('user_id')) is None:
+            return Response(
+                {'error': '用户不存在'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
         # ✅ 生成新的access token（不再使用黑名单）
         new_access_token = str(refresh.access_token)
 
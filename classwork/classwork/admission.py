@@ -0,0 +1,257 @@
+"""
+登录、重置密码接口的准入控制。
+
+校验、生成密码哈希（PBKDF2）每次要占用几十到几百毫秒 CPU。互选开放时大量学生同时登录，
+这些请求会占满工作线程，dashboard 等普通请求只能排在后面。
+
+每个进程为每类接口设一个闸门（AdmissionGate）：
+- 同时执行的请求不超过 MAX_CONCURRENT，其余请求排队等待；
+- 排队的请求已达 MAX_QUEUE 时立即返回 429 和 Retry-After，不再占用工作线程；
+  排队超过 QUEUE_TIMEOUT 秒的请求同样返回 429。
+限额按进程计算：gunicorn 以 gthread 模式运行（gunicorn_start.sh），每个进程有 THREADS 个线程，
+MAX_CONCURRENT + MAX_QUEUE 要小于线程数，其余线程始终可以处理其他请求。见 settings.ADMISSION_CONTROL。
+
+排队的请求同样占用线程，所以队列要短。
+计数只保存在内存中，请求（包括 429）不做磁盘 I/O：状态变化时由每个进程的后台线程
+最多每 PUBLISH_INTERVAL 秒一次写入 ADMISSION_STATS_DIR 下以进程号命名的文件。
+admission_stats() 先写入本进程的最新状态，再汇总所有存活进程，
+管理员可通过 /api/admin/admission-stats/ 查看，不论请求落在哪个工作进程。
+"""
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'MAX_CONCURRENT': 2,  # 同时执行的请求数
+    'MAX_QUEUE': 2,  # 最多排队的请求数
+    'QUEUE_TIMEOUT': 2,  # 秒，排队超过该时间返回 429
+    'RETRY_AFTER': 1,  # 秒，429 响应的 Retry-After
+}
+
+
+PUBLISH_INTERVAL = 1  # 秒，后台线程写入状态文件的最短间隔
+
+# 累加的计数；max_queue_depth 取各进程的最大值，上限取各进程之和
+SUMMED_STATS = ('max_concurrent', 'max_queue', 'active', 'queue_depth', 'admitted', 'rejected', 'timed_out')
+
+
+def _config(name):
+    """未单独配置的闸门使用 DEFAULTS"""
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_CONTROL', {}).get(name, {})}
+
+
+def _stats_dir():
+    return getattr(settings, 'ADMISSION_STATS_DIR', None) or os.path.join(tempfile.gettempdir(), 'classwork-admission')
+
+
+class AdmissionGate:
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout, retry_after):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self):
+        """取得执行名额返回 True；队列已满或排队超时返回 False"""
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+_gates = {}
+_gates_guard = threading.Lock()
+
+
+def get_gate(name):
+    gate = _gates.get(name)
+    if gate is None:
+        with _gates_guard:
+            gate = _gates.get(name)
+            if gate is None:
+                config = _config(name)
+                gate = _gates[name] = AdmissionGate(
+                    name, config['MAX_CONCURRENT'], config['MAX_QUEUE'],
+                    config['QUEUE_TIMEOUT'], config['RETRY_AFTER'],
+                )
+    return gate
+
+
+def reset_gates():
+    """丢弃所有闸门（及统计），下一次请求按当前配置重新创建"""
+    with _gates_guard:
+        _gates.clear()
+    try:
+        os.remove(_stats_path(os.getpid()))
+    except FileNotFoundError:
+        pass
+
+
+def _stats_path(pid):
+    return os.path.join(_stats_dir(), f'{pid}.json')
+
+
+def _publish():
+    """把本进程的闸门状态写入文件（先写临时文件再替换，读取方不会读到半个文件）"""
+    with _gates_guard:
+        gates = dict(_gates)
+    data = {'pid': os.getpid(), 'gates': {name: gate.stats() for name, gate in gates.items()}}
+    directory = _stats_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = _stats_path(os.getpid())
+    temp = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp, path)
+
+
+_changed_event = threading.Event()
+_publisher_pid = None
+
+
+def _publisher():
+    while True:
+        _changed_event.wait()
+        time.sleep(PUBLISH_INTERVAL)
+        _changed_event.clear()
+        try:
+            _publish()
+        except OSError:
+            pass
+
+
+def _changed():
+    """闸门状态已变化：只做标记，由本进程的后台线程写文件（fork 出的工作进程各自启动线程）"""
+    global _publisher_pid
+    if _publisher_pid != os.getpid():
+        with _gates_guard:
+            if _publisher_pid != os.getpid():
+                _publisher_pid = os.getpid()
+                threading.Thread(target=_publisher, name='admission-stats', daemon=True).start()
+    _changed_event.set()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def admission_controlled(name):
+    """
+    视图方法的装饰器：取得闸门名额后才执行，否则返回 429 + Retry-After。
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            gate = get_gate(name)
+            if not gate.acquire():
+                _changed()
+                return Response(
+                    {'detail': '请求过多，请稍后重试。'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(gate.retry_after)}
+                )
+            try:
+                return method(self, request, *args, **kwargs)
+            finally:
+                gate.release()
+                _changed()
+        return wrapper
+    return decorator
+
+
+def admission_stats():
+    """
+    汇总所有存活工作进程的闸门状态：gates 为合计，processes 为各进程的状态。
+    rejected 为队列已满被拒绝的次数，timed_out 为排队超时的次数。
+    """
+    for name in getattr(settings, 'ADMISSION_CONTROL', {}):
+        get_gate(name)
+    _publish()
+
+    processes = []
+    directory = _stats_dir()
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _alive(data['pid']):
+            # 已退出的工作进程
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        processes.append(data)
+
+    totals = {}
+    for data in processes:
+        for name, stats in data['gates'].items():
+            total = totals.setdefault(name, dict.fromkeys(SUMMED_STATS, 0) | {'max_queue_depth': 0})
+            for key in SUMMED_STATS:
+                total[key] += stats[key]
+            total['max_queue_depth'] = max(total['max_queue_depth'], stats['max_queue_depth'])
+    return {
+        'gates': dict(sorted(totals.items())),
+        'processes': processes,
+    }
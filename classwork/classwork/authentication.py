@@ -1,13 +1,13 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from adminapp.models import AdminUser
-from studentapp.models import Student
-from teacherapp.models import teacher
+
+from .principals import lazy_principal
 
 
 class UniversalJWTAuthentication(JWTAuthentication):
     """
     一个通用的JWT认证类，可以处理多种用户模型。
     它通过检查Token中的 'user_type' 字段来决定去哪个模型中查找用户。
+    用户由令牌声明构造（principals.lazy_principal），只检查账号是否已删除，访问主键以外的字段时才读取账号。
     """
     def get_user(self, validated_token):
         try:
@@ -16,26 +16,9 @@ class UniversalJWTAuthentication(JWTAuthentication):
         except KeyError:
             return None  # Token中缺少必要信息
 
-        if user_type == 'admin':
-            try:
-                user = AdminUser.objects.get(pk=user_id)
-                # 为非标准用户动态添加 is_authenticated 属性
-                user.is_authenticated = True
-                return user
-            except AdminUser.DoesNotExist:
-                return None
-
-        elif user_type == 'student':
-            try:
-                return Student.objects.get(pk=user_id)
-            except Student.DoesNotExist:
-                return None
-
-        elif user_type == 'teacher':
-            try:
-                return teacher.objects.get(pk=user_id)
-            except teacher.DoesNotExist:
-                return None
-
         # 如果没有 user_type 或 user_type 不匹配，则认证失败
-        return None
\ No newline at end of file
+        user = lazy_principal(user_type, user_id)
+        if user is not None and user_type == 'admin':
+            # 为非标准用户动态添加 is_authenticated 属性
+            user.is_authenticated = True
+        return user
@@ -0,0 +1,50 @@
+"""
+稀疏字段集：?fields= / ?expand=
+
+- fields：逗号分隔的字段名，只输出这些字段；
+- expand：逗号分隔的嵌套关联名，在 fields 之外额外输出这些关联。
+
+两个参数都未提供时输出全部字段，与原有行为一致；提供任一参数时，
+Meta.expandable_fields 中的嵌套关联只有出现在 fields 或 expand 中才会输出。
+视图按 selected_fields 的结果决定 select_related / prefetch_related，未请求的关联既不序列化也不查询。
+"""
+
+
+def _split(value):
+    if not value:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    return names or None
+
+
+class SparseFieldsetMixin:
+    """
+    只对带 request 上下文的顶层序列化器生效（包括 many=True 的子序列化器），
+    作为字段嵌套的序列化器在初始化时没有上下文，保持完整输出。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """返回要输出的字段名集合；None 表示全部字段"""
+        if request is None:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields = _split(params.get('fields'))
+        expand = _split(params.get('expand'))
+        if fields is None and expand is None:
+            return None
+
+        names = set(cls.Meta.fields)
+        if fields is None:
+            selected = names - set(getattr(cls.Meta, 'expandable_fields', ()))
+        else:
+            selected = names & set(fields)
+        return selected | (names & set(expand or ()))
@@ -0,0 +1,345 @@
+"""
+认证用户（管理员 / 学生 / 教师）的缓存，供 UniversalJWTAuthentication 使用。
+
+- 进程内：按 (user_type, user_id) 缓存，LRU 淘汰，条目超过 TTL 秒后重新读取；
+- 共享（可选）：settings.PRINCIPAL_CACHE['SHARED_CACHE'] 指定 Django 缓存别名时，进程内未命中先查共享缓存。
+
+只缓存认证后需要的列，不包含密码哈希、最后登录时间；这些列在访问时才从数据库读取（Django 延迟字段）。
+缓存的是列值，每次请求都构造新的模型实例，视图修改 request.user 不会影响缓存。
+账号保存或删除时失效（adminapp/signals.py），其他工作进程的进程内缓存最多 TTL 秒后过期。
+
+认证时按令牌中的 user_type、user_id 构造延迟加载的实例（lazy_principal），不读取账号：
+isinstance 判断和主键可以直接使用，第一次访问其他字段时才经过上面的缓存读取整行。
+账号删除后记录撤销标记（revoke_principal），保留 access token 的有效期，认证时只检查该标记；
+撤销标记写入本进程和共享缓存，未配置共享缓存时，其他工作进程要等 access token 过期，
+或视图访问其他字段发现账号不存在时才拒绝。刷新令牌接口始终确认账号存在（get_principal）。
+
+登录时按登录标识查询登录目录（adminapp.PrincipalDirectory，见 find_principal），得到账号类型和主键，
+同一查询中按主键从账号表读取当前的登录标识和密码哈希（子查询），校验通过后构造延迟加载的实例。
+密码只保存在账号表中；目录中的登录标识与账号表不一致（绕过保存信号的修改）时不允许登录。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import CharField, Case, OuterRef, Subquery, Value, When
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# user_type: (模型, 登录标识字段, 密码字段)；模型按名称查找，本模块可被各 models 导入
+PRINCIPAL_MODELS = {
+    'admin': ('adminapp.AdminUser', 'admin_username', 'admin_password'),
+    'student': ('studentapp.Student', 'stu_no', 'password'),
+    'teacher': ('teacherapp.teacher', 'teacher_no', 'password'),
+}
+
+# 认证后用不到的列
+SECRET_FIELDS = {'admin_password', 'password', 'last_login'}
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'SHARED_CACHE': None,
+}
+
+
+def _config(name):
+    return getattr(settings, 'PRINCIPAL_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def principal_model(user_type):
+    entry = PRINCIPAL_MODELS.get(user_type)
+    return apps.get_model(entry[0]) if entry else None
+
+
+def directory_model():
+    return apps.get_model('adminapp', 'PrincipalDirectory')
+
+
+def principal_columns(model):
+    """按 concrete_fields 的顺序，供 Model.from_db 使用"""
+    return [f.attname for f in model._meta.concrete_fields if f.attname not in SECRET_FIELDS]
+
+
+class PrincipalCache:
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return values
+
+    def set(self, key, values, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or _config('TTL')), values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > _config('MAX_SIZE'):
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = PrincipalCache()
+# 已删除账号的撤销标记：{(user_type, user_id): True}
+_revoked = PrincipalCache()
+
+
+def reset_principal_cache():
+    """清空本进程的缓存和撤销标记"""
+    _local.clear()
+    _revoked.clear()
+
+
+def _shared():
+    alias = _config('SHARED_CACHE')
+    return caches[alias] if alias else None
+
+
+def _shared_key(user_type, user_id):
+    return f'principal:{user_type}:{user_id}'
+
+
+def _revoked_key(user_type, user_id):
+    return f'principal-revoked:{user_type}:{user_id}'
+
+
+def _load_values(user_type, user_id):
+    key = (user_type, str(user_id))
+    values = _local.get(key)
+    if values is not None:
+        return values
+
+    shared = _shared()
+    if shared is not None:
+        values = shared.get(_shared_key(user_type, user_id))
+
+    if values is None:
+        model = principal_model(user_type)
+        values = model.objects.filter(pk=user_id).values_list(*principal_columns(model)).first()
+        if values is None:
+            # 不缓存不存在的账号
+            return None
+        if shared is not None:
+            shared.set(_shared_key(user_type, user_id), values, _config('TTL'))
+
+    _local.set(key, values)
+    return values
+
+
+def get_principal(user_type, user_id):
+    """返回对应的模型实例（密码等列为延迟字段），不存在时返回 None"""
+    model = principal_model(user_type)
+    if model is None:
+        return None
+    values = _load_values(user_type, user_id)
+    if values is None:
+        return None
+    return model.from_db(model.objects.db, principal_columns(model), values)
+
+
+def principal_revoked(user_type, user_id):
+    """账号是否已删除：只检查撤销标记，不查询数据库"""
+    if _revoked.get((user_type, str(user_id))) is not None:
+        return True
+    shared = _shared()
+    return shared is not None and shared.get(_revoked_key(user_type, user_id)) is not None
+
+
+def lazy_principal(user_type, user_id):
+    """
+    由令牌声明构造实例：只有主键，其余字段第一次访问时整行读取（经过缓存）。
+    账号类型未知或账号已删除时返回 None。
+    """
+    model = principal_model(user_type)
+    if model is None or principal_revoked(user_type, user_id):
+        return None
+    return _lazy_instance(user_type, [model._meta.pk.attname], [user_id])
+
+
+def principal_token(user_type, user):
+    """登录成功后签发的 refresh token（access token 复制其中的声明，lazy_principal 只需要这两项）"""
+    refresh = RefreshToken()
+    refresh['user_id'] = user.pk
+    refresh['user_type'] = user_type
+    return refresh
+
+
+class PrincipalMixin:
+    """
+    管理员、学生、教师模型的混入类。
+    延迟加载的实例（lazy_principal、登录时的 _directory_principal）第一次访问未加载的字段时，
+    一次读取整行（经过缓存），而不是逐个字段查询。
+    """
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        user_type = self.__dict__.pop('_lazy_principal', None)
+        if user_type is not None and fields is not None:
+            values = _load_values(user_type, self.pk)
+            if values is None:
+                _revoked.set((user_type, str(self.pk)), True, _revoked_ttl())
+                raise AuthenticationFailed('用户不存在')
+            for attname, value in zip(principal_columns(type(self)), values):
+                # 不覆盖视图已经修改过的字段
+                self.__dict__.setdefault(attname, value)
+            fields = [name for name in fields if name not in self.__dict__]
+            if not fields:
+                return
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+
+def invalidate_principal(user_type, user_id):
+    """账号修改或删除后调用；事务提交后再失效一次，丢弃提交前其他线程读到的旧数据"""
+    def reset():
+        _local.delete((user_type, str(user_id)))
+        shared = _shared()
+        if shared is not None:
+            shared.delete(_shared_key(user_type, user_id))
+
+    reset()
+    transaction.on_commit(reset)
+
+
+def _revoked_ttl():
+    """撤销标记保留到删除前签发的 access token 全部过期"""
+    return int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def revoke_principal(user_type, user_id):
+    """账号删除后调用：事务提交后记录撤销标记，此后该账号的 access token 不再通过认证"""
+    def revoke():
+        _revoked.set((user_type, str(user_id)), True, _revoked_ttl())
+        shared = _shared()
+        if shared is not None:
+            shared.set(_revoked_key(user_type, user_id), True, _revoked_ttl())
+
+    transaction.on_commit(revoke)
+
+
+def restore_principal(user_type, user_id):
+    """新建账号时清除撤销标记（主键可能与已删除的账号相同）"""
+    _revoked.delete((user_type, str(user_id)))
+    shared = _shared()
+    if shared is not None:
+        shared.delete(_revoked_key(user_type, user_id))
+
+
+def _lazy_instance(user_type, fields, values):
+    model = principal_model(user_type)
+    user = model.from_db(model.objects.db, fields, values)
+    user._lazy_principal = user_type
+    return user
+
+
+def _directory_principal(user_type, user_id, login):
+    """由登录目录的一行构造实例：主键和登录标识已加载，其余字段延迟读取"""
+    model = principal_model(user_type)
+    identifier = PRINCIPAL_MODELS[user_type][1]
+    return _lazy_instance(user_type, [model._meta.pk.attname, identifier], [user_id, login])
+
+
+def _password_setter(user_type, user_id):
+    """密码哈希算法升级时重新保存密码"""
+    def setter(raw_password):
+        model, _, password_field = PRINCIPAL_MODELS[user_type]
+        user = apps.get_model(model).objects.filter(pk=user_id).first()
+        if user is not None:
+            setattr(user, password_field, make_password(raw_password))
+            user.save(update_fields=[password_field])
+    return setter
+
+
+def _account_column(index):
+    """目录各行对应账号的一列（index 为 PRINCIPAL_MODELS 中的字段序号），按类型以主键查询账号表"""
+    return Case(
+        *[When(user_type=user_type, then=Subquery(
+            apps.get_model(entry[0]).objects.filter(pk=OuterRef('user_id')).values(entry[index])[:1]
+        )) for user_type, entry in PRINCIPAL_MODELS.items()],
+        default=Value(None), output_field=CharField()
+    )
+
+
+def find_principal(login, password, user_types):
+    """
+    按登录标识查找账号并校验密码，只执行一次查询（目录按 login 索引，账号表按主键）。
+    user_types 的顺序即优先级：同一登录标识对应多个账号时，依次校验，返回第一个密码正确的账号。
+    """
+    if not login or password is None:
+        return None
+    entries = sorted(
+        directory_model().objects.filter(login=login, user_type__in=user_types).annotate(
+            account_login=_account_column(1), account_password=_account_column(2)
+        ).values_list('user_type', 'user_id', 'account_login', 'account_password'),
+        key=lambda entry: user_types.index(entry[0])
+    )
+    for user_type, user_id, account_login, account_password in entries:
+        if account_login != login:
+            # 账号已删除或登录标识已修改，目录尚未同步
+            continue
+        if check_password(password, account_password, _password_setter(user_type, user_id)):
+            return _directory_principal(user_type, user_id, login)
+    return None
+
+
+def find_principal_by_id(user_id, user_types):
+    """按主键查找账号，user_types 的顺序即优先级"""
+    entries = sorted(
+        directory_model().objects.filter(user_id=user_id, user_type__in=user_types),
+        key=lambda entry: user_types.index(entry.user_type)
+    )
+    if not entries:
+        return None
+    return _directory_principal(entries[0].user_type, entries[0].user_id, entries[0].login)
+
+
+def update_directory(user_type, user, update_fields=None):
+    """账号保存后同步登录目录；没有修改登录标识时跳过"""
+    identifier = PRINCIPAL_MODELS[user_type][1]
+    if update_fields is not None and identifier not in update_fields:
+        return
+    directory_model().objects.update_or_create(
+        user_type=user_type, user_id=user.pk, defaults={'login': getattr(user, identifier)}
+    )
+
+
+def remove_from_directory(user_type, user_id):
+    directory_model().objects.filter(user_type=user_type, user_id=user_id).delete()
+
+
+def sync_principal_directory(user_type, logins, batch_size=1000):
+    """
+    bulk_create 导入账号后调用（不触发保存信号）：按登录标识重新读取账号，替换登录目录中的对应行。
+    """
+    model, identifier, _ = PRINCIPAL_MODELS[user_type]
+    model = apps.get_model(model)
+    directory = directory_model()
+    logins = list(logins)
+    for start in range(0, len(logins), batch_size):
+        rows = list(model.objects.filter(**{f'{identifier}__in': logins[start:start + batch_size]}).values_list(
+            model._meta.pk.attname, identifier))
+        directory.objects.filter(user_type=user_type, user_id__in=[row[0] for row in rows]).delete()
+        directory.objects.filter(user_type=user_type, login__in=[row[1] for row in rows]).delete()
+        directory.objects.bulk_create([
+            directory(user_type=user_type, user_id=user_id, login=login) for user_id, login in rows
+        ])
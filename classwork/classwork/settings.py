@@ -123,6 +123,33 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# 认证用户缓存（classwork/principals.py）
+PRINCIPAL_CACHE = {
+    'MAX_SIZE': 10000,  # 进程内最多缓存的账号数
+    'TTL': 60,  # 秒，其他进程修改账号后最长的生效延迟
+    'SHARED_CACHE': None,  # 多进程共享的 Django 缓存别名（如 'default'），None 表示只用进程内缓存；撤销标记同样写入共享缓存
+}
+
+# 登录、重置密码接口的准入控制（classwork/admission.py），按工作进程计算。
+# gunicorn_start.sh 以 gthread 模式运行，每个进程 THREADS=8 个线程；排队的请求也占用线程，
+# 各闸门 MAX_CONCURRENT + MAX_QUEUE 之和要小于线程数，剩余线程留给 dashboard 等其他请求。
+ADMISSION_CONTROL = {
+    'login': {
+        'MAX_CONCURRENT': 2,  # 同时校验密码的请求数
+        'MAX_QUEUE': 3,  # 最多排队的请求数，超出时立即返回 429
+        'QUEUE_TIMEOUT': 2,  # 秒，排队超时返回 429
+        'RETRY_AFTER': 1,  # 秒，429 响应的 Retry-After
+    },
+    'password_reset': {
+        'MAX_CONCURRENT': 1,
+        'MAX_QUEUE': 1,
+        'QUEUE_TIMEOUT': 2,
+        'RETRY_AFTER': 5,
+    },
+}
+# 各工作进程写入闸门状态的目录，None 表示系统临时目录下的 classwork-admission
+ADMISSION_STATS_DIR = None
+
 
 
 
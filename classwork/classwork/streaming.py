@@ -0,0 +1,71 @@
+"""
+流式 JSON 响应（?stream=1）。
+
+大列表用 queryset.iterator(chunk_size=...) 分批读取、分批序列化，边生成边输出，
+工作进程内存只与单批大小有关，与数据总量无关。输出与 DRF JSONRenderer 的紧凑格式一致。
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def encode(value):
+    """与 JSONRenderer 相同的编码参数"""
+    text = json.dumps(value, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def iter_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按 chunk_size 分批产出模型实例列表；prefetch_related 也按批执行"""
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class StreamArray:
+    """需要流式输出的数组，chunks 逐批产出已序列化的条目列表"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+
+def serialized_array(queryset, serializer_class, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    return StreamArray(
+        serializer_class(chunk, many=True, **kwargs).data for chunk in iter_chunks(queryset, chunk_size)
+    )
+
+
+def iter_json(value):
+    """逐段产出 value 的 JSON 文本；字典逐键展开，StreamArray 逐批展开，其余值整体编码"""
+    if isinstance(value, StreamArray):
+        yield '['
+        separator = ''
+        for items in value.chunks:
+            if items:
+                yield separator + ','.join(encode(item) for item in items)
+                separator = ','
+        yield ']'
+    elif isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield (',' if index else '') + encode(str(key)) + ':'
+            yield from iter_json(item)
+        yield '}'
+    else:
+        yield encode(value)
+
+
+def stream_json_response(value, status=200):
+    return StreamingHttpResponse(iter_json(value), status=status, content_type='application/json')
@@ -2,6 +2,8 @@
 NAME="graduation_backend"
 DIR=/srv/graduation_system/classwork
 WORKERS=4
+# 每个工作进程的线程数；登录、重置密码的并发上限（settings.ADMISSION_CONTROL）要小于该值
+THREADS=8
 BIND=127.0.0.1:6184
 DJANGO_SETTINGS_MODULE=classwork.settings
 DJANGO_WSGI_MODULE=classwork.wsgi
@@ -24,6 +26,8 @@ export PYTHONPATH=$DIR:$PYTHONPATH
 exec $GUNICORN_PATH ${DJANGO_WSGI_MODULE}:application \
   --name $NAME \
   --workers $WORKERS \
+  --worker-class gthread \
+  --threads $THREADS \
   --bind=$BIND \
   --log-level=$LOG_LEVEL \
   --timeout 180
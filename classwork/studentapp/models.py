@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from classwork.principals import PrincipalMixin
 
 
 # 专业模型
@@ -26,7 +27,7 @@ class StudentManager(BaseUserManager):
         return user
 
 # 学生模型
-class Student(AbstractBaseUser):
+class Student(PrincipalMixin, AbstractBaseUser):
     stu_id = models.AutoField(primary_key=True)
     stu_no = models.CharField(max_length=50, unique=True, verbose_name='学号')
     stu_name = models.CharField(max_length=255, verbose_name='姓名')
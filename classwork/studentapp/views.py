@@ -4,6 +4,8 @@ from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from classwork.admission import admission_controlled
+from classwork.principals import find_principal, get_principal, principal_token
 from .models import Student, EmailVerifyCode
 from .serializers import StudentLoginSerializer, StudentProfileSerializer
 from django.core.mail import send_mail
@@ -20,6 +22,7 @@ class StudentLoginView(views.APIView):
     permission_classes = [AllowAny]
     serializer_class = StudentLoginSerializer
 
+    @admission_controlled('login')
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -28,23 +31,14 @@ class StudentLoginView(views.APIView):
         password = serializer.validated_data.get('password')
 
 
-        try:
-            student = Student.objects.get(stu_no=stu_no)
-        except Student.DoesNotExist:
+        student = find_principal(stu_no, password, ['student'])
+        if student is None:
             return Response(
                 {'detail': '学号或密码错误。'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not student.check_password(password):
-            return Response(
-                {'detail': '学号或密码错误。'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-
-        refresh = RefreshToken()
-        refresh['user_id'] = student.stu_id
-        refresh['user_type'] = 'student'
+        refresh = principal_token('student', student)
 
         return Response({
             'refresh': str(refresh),
@@ -55,6 +49,7 @@ class SendResetCodeView(views.APIView):
     """发送重置密码验证码（邮箱 + 姓名验证）"""
     permission_classes = [AllowAny]
 
+    @admission_controlled('password_reset')
     def post(self, request):
         stu_no = request.data.get("stu_no")
         email = request.data.get("email")
@@ -88,6 +83,7 @@ class ResetPasswordByCodeView(views.APIView):
     """通过验证码重置密码"""
     permission_classes = [AllowAny]
 
+    @admission_controlled('password_reset')
     def post(self, request):
         stu_no = request.data.get("stu_no")
         email = request.data.get("email")
@@ -117,7 +113,7 @@ class ResetPasswordByCodeView(views.APIView):
 
         # 更新密码
         student.set_password(new_password)
-        student.save()
+        student.save(update_fields=['password'])
         verify_obj.delete()  # 删除验证码
 
         return Response({"message": "密码重置成功"}, status=status.HTTP_200_OK)
@@ -171,6 +167,13 @@ def refresh_student_token(request):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # 账号已删除的令牌不能再刷新
+        if get_principal('student', refresh.get('user_id')) is None:
+            return Response(
+                {'error': '用户不存在'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
         # ✅ 生成新的access token
         new_access_token = str(refresh.access_token)
 
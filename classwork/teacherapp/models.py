@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from classwork.principals import PrincipalMixin
 
 
 class TeacherManager(BaseUserManager):
@@ -21,7 +22,7 @@ class TeacherManager(BaseUserManager):
 
 
 # 教师模型
-class teacher(AbstractBaseUser):
+class teacher(PrincipalMixin, AbstractBaseUser):
     teacher_id = models.AutoField(primary_key=True)
     teacher_no = models.CharField(max_length=50, unique=True, verbose_name='工号')
     teacher_name = models.CharField(max_length=255, verbose_name='姓名')
@@ -4,6 +4,8 @@ from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from classwork.admission import admission_controlled
+from classwork.principals import find_principal, get_principal, principal_token
 from .models import teacher # 导入 teacher 模型
 from .serializers import (
     TeacherLoginSerializer,  # 导入 TeacherLoginSerializer
@@ -21,6 +23,7 @@ class TeacherLoginView(views.APIView):
     permission_classes = [AllowAny]
     serializer_class = TeacherLoginSerializer
 
+    @admission_controlled('login')
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -28,23 +31,14 @@ class TeacherLoginView(views.APIView):
         teacher_no = serializer.validated_data.get('teacher_no')
         password = serializer.validated_data.get('password')
 
-        try:
-            teacher_user = teacher.objects.get(teacher_no=teacher_no)
-        except teacher.DoesNotExist:
+        teacher_user = find_principal(teacher_no, password, ['teacher'])
+        if teacher_user is None:
             return Response(
                 {'detail': '工号或密码错误。'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        if not teacher_user.check_password(password):
-            return Response(
-                {'detail': '工号或密码错误。'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-
-        refresh = RefreshToken()
-        refresh['user_id'] = teacher_user.teacher_id
-        refresh['user_type'] = 'teacher'
+        refresh = principal_token('teacher', teacher_user)
 
         return Response({
             'refresh': str(refresh),
@@ -100,6 +94,13 @@ def refresh_teacher_token(request):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # 账号已删除的令牌不能再刷新
+        if get_principal('teacher', refresh.get('user_id')) is None:
+            return Response(
+                {'error': '用户不存在'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
         # ✅ 生成新的access token
         new_access_token = str(refresh.access_token)
 
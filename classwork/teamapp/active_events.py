@@ -0,0 +1,264 @@
+"""
+进程内的活动时间索引：按参与者查找当前进行中的活动，不访问数据库。
+
+每个阶段（学生互选、学生 dashboard、教师互选）把所有活动的起止时间排序去重，得到若干时间点；
+相邻时间点之间（以及恰好位于时间点上）进行中的活动集合是固定的，构建时预先算好（按 event_id 排序）。
+查找时对时间点二分（bisect）得到进行中的活动，再与参与者所在活动的集合（字典查找）比较，
+取 event_id 最小的一个，与原查询 .first() 的结果一致。
+
+索引随信号更新（signals.py）：活动保存、删除或参与者变化时，记录受影响的活动和参与者，
+事务提交后只重新读取这些活动及其参与者并重新排序时间点，不重建整个索引；事务回滚时不做修改。
+其他工作进程收不到本进程的信号：每次修改同时在 ActiveEventIndexVersion 中写入新的标记，
+各进程最多每 CHECK_INTERVAL 秒读取一次标记（按主键读取一行），标记变化时才重新构建索引。
+
+索引只用于读接口。写操作（组队、退队、提交志愿等）据此授权，不能使用可能过期 CHECK_INTERVAL 秒的数据，
+改用 query_active_event_for_student / query_active_event_for_teacher 直接查询数据库。
+"""
+import bisect
+import copy
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from adminapp.models import MutualSelectionEvent
+
+from .models import ActiveEventIndexVersion
+
+# 读取版本标记的最短间隔（秒），用于感知其他进程中的修改
+CHECK_INTERVAL = 1
+
+# 阶段名: (开始时间字段, 结束时间字段)
+PHASES = {
+    'student': ('stu_start_time', 'stu_end_time'),
+    'dashboard': ('stu_start_time', 'tea_end_time'),
+    'teacher': ('tea_start_time', 'tea_end_time'),
+}
+
+# 参与者类型: ManyToMany 字段
+PARTICIPANTS = {
+    'student': MutualSelectionEvent.students,
+    'teacher': MutualSelectionEvent.teachers,
+}
+
+_PARTICIPANT_COLUMNS = {'student': 'student_id', 'teacher': 'teacher_id'}
+
+
+class PhaseIntervals:
+    """一个阶段的区间索引：points 为排序后的时间点，at[i] / after[i] 为 points[i] 上 / 之后进行中的活动"""
+
+    def __init__(self, events, start, end):
+        intervals = [(getattr(event, start), getattr(event, end), event.event_id) for event in events]
+        starts = sorted((s, pk) for s, _, pk in intervals)
+        ends = sorted((e, pk) for _, e, pk in intervals)
+        self.points = sorted({t for s, e, _ in intervals for t in (s, e)})
+        self.at = []
+        self.after = []
+        # 按时间点顺序扫描：加入已开始的活动，移除已结束的活动
+        current = set()
+        next_start = next_end = 0
+        for point in self.points:
+            while next_start < len(starts) and starts[next_start][0] <= point:
+                current.add(starts[next_start][1])
+                next_start += 1
+            while next_end < len(ends) and ends[next_end][0] < point:
+                current.discard(ends[next_end][1])
+                next_end += 1
+            self.at.append(tuple(sorted(current)))
+            # 到下一个时间点之前，恰好在 point 结束的活动已不在进行中
+            ending = {pk for e, pk in ends[next_end:bisect.bisect_right(ends, (point, float('inf')))]}
+            self.after.append(tuple(sorted(current - ending)))
+
+    def active(self, now):
+        i = bisect.bisect_right(self.points, now) - 1
+        if i < 0:
+            return ()
+        return self.at[i] if self.points[i] == now else self.after[i]
+
+
+class ActiveEventIndex:
+
+    def __init__(self, now, version):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.events = {}
+        # 参与者类型 -> {参与者ID: 活动ID集合} 及反向映射 {活动ID: 参与者ID集合}
+        self.participants = {kind: defaultdict(set) for kind in PARTICIPANTS}
+        self.members = {kind: defaultdict(set) for kind in PARTICIPANTS}
+        events = MutualSelectionEvent.objects.filter(tea_end_time__gte=now)
+        self._load_events(events, {event.event_id for event in events})
+        self._build_phases()
+
+    def _load_events(self, events, event_ids):
+        """替换 event_ids 中各活动的数据和参与者；events 中没有的活动视为已删除"""
+        for event_id in event_ids:
+            self.events.pop(event_id, None)
+            for kind in PARTICIPANTS:
+                for participant_id in self.members[kind].pop(event_id, ()):
+                    self.participants[kind][participant_id].discard(event_id)
+        for event in events:
+            self.events[event.event_id] = event
+        if not self.events.keys() & event_ids:
+            return
+        for kind, field in PARTICIPANTS.items():
+            column = _PARTICIPANT_COLUMNS[kind]
+            for participant_id, event_id in field.through.objects.filter(
+                    mutualselectionevent_id__in=self.events.keys() & event_ids
+            ).values_list(column, 'mutualselectionevent_id'):
+                self.participants[kind][participant_id].add(event_id)
+                self.members[kind][event_id].add(participant_id)
+
+    def _load_participants(self, kind, participant_ids):
+        """重新读取参与者所在的活动（反向 clear 时使用）"""
+        column = _PARTICIPANT_COLUMNS[kind]
+        for participant_id in participant_ids:
+            for event_id in self.participants[kind].pop(participant_id, ()):
+                self.members[kind][event_id].discard(participant_id)
+        for participant_id, event_id in PARTICIPANTS[kind].through.objects.filter(
+                **{f'{column}__in': participant_ids}, mutualselectionevent_id__in=self.events.keys()
+        ).values_list(column, 'mutualselectionevent_id'):
+            self.participants[kind][participant_id].add(event_id)
+            self.members[kind][event_id].add(participant_id)
+
+    def _build_phases(self):
+        events = list(self.events.values())
+        self.phases = {name: PhaseIntervals(events, start, end) for name, (start, end) in PHASES.items()}
+
+    def apply(self, event_ids, participant_ids):
+        """按信号记录的变化更新索引：event_ids 为活动ID，participant_ids 为 {参与者类型: 参与者ID}"""
+        if event_ids:
+            self._load_events(MutualSelectionEvent.objects.filter(pk__in=event_ids), set(event_ids))
+        for kind, ids in participant_ids.items():
+            if ids:
+                self._load_participants(kind, ids)
+        if event_ids:
+            self._build_phases()
+
+    def find(self, kind, participant_id, phase, now):
+        events = self.participants[kind].get(participant_id)
+        if not events:
+            return None
+        for event_id in self.phases[phase].active(now):
+            if event_id in events:
+                # 返回副本，调用方修改实例不会影响索引
+                return copy.copy(self.events[event_id])
+        return None
+
+
+_index = None
+_lock = threading.Lock()
+_pending = threading.local()
+
+
+def _current_version():
+    return ActiveEventIndexVersion.objects.filter(pk=1).values_list('token', flat=True).first()
+
+
+def get_index(now=None):
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < CHECK_INTERVAL:
+        return index
+    with _lock:
+        index = _index
+        if index is not None and time.monotonic() - index.checked_at < CHECK_INTERVAL:
+            return index
+        # 先读取标记再读取数据：标记只会比索引旧，下一次检查时多重建一次
+        version = _current_version()
+        if index is not None and version == index.version:
+            index.checked_at = time.monotonic()
+        else:
+            _index = ActiveEventIndex(now or timezone.now(), version)
+        return _index
+
+
+def reset_active_events():
+    """丢弃本进程的索引，下一次查找时重新构建"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def _pending_changes():
+    if not hasattr(_pending, 'event_ids'):
+        _pending.event_ids = set()
+        _pending.participant_ids = {kind: set() for kind in PARTICIPANTS}
+    return _pending.event_ids, _pending.participant_ids
+
+
+def _flush():
+    event_ids, participant_ids = _pending_changes()
+    if not event_ids and not any(participant_ids.values()):
+        return
+    event_ids = set(event_ids)
+    participant_ids = {kind: set(ids) for kind, ids in participant_ids.items()}
+    _pending.event_ids.clear()
+    for ids in _pending.participant_ids.values():
+        ids.clear()
+
+    with _lock:
+        token = uuid.uuid4().hex
+        index = _index
+        # 标记仍是本进程索引的版本时，说明其间没有其他进程的修改，更新后的索引对应新的标记
+        current = index is not None and index.version is not None and ActiveEventIndexVersion.objects.filter(
+            pk=1, token=index.version).update(token=token)
+        if not current:
+            ActiveEventIndexVersion.objects.update_or_create(pk=1, defaults={'token': token})
+        if index is not None:
+            index.apply(event_ids, participant_ids)
+            if current:
+                index.version = token
+
+
+def active_events_changed(event_ids=(), students=(), teachers=()):
+    """
+    活动或参与者变化后调用（signals.py）：事务提交后更新本进程的索引，并通知其他进程。
+    event_ids 的活动数据和参与者全部重新读取；students / teachers 只重新读取这些参与者所在的活动。
+    """
+    pending_events, pending_participants = _pending_changes()
+    pending_events.update(event_ids)
+    pending_participants['student'].update(students)
+    pending_participants['teacher'].update(teachers)
+    # 每次都注册回调：第一个执行的回调处理全部待提交的变化，其余的为空操作
+    transaction.on_commit(_flush)
+
+
+def active_event_for_student(student_id, now=None):
+    """学生互选期（stu_start_time ~ stu_end_time）内的活动"""
+    now = now or timezone.now()
+    return get_index(now).find('student', student_id, 'student', now)
+
+
+def dashboard_event_for_student(student_id, now=None):
+    """学生互选期开始到教师互选期结束（stu_start_time ~ tea_end_time）之间的活动"""
+    now = now or timezone.now()
+    return get_index(now).find('student', student_id, 'dashboard', now)
+
+
+def active_event_for_teacher(teacher_id, now=None):
+    """教师互选期（tea_start_time ~ tea_end_time）内的活动"""
+    now = now or timezone.now()
+    return get_index(now).find('teacher', teacher_id, 'teacher', now)
+
+
+def query_active_event_for_student(student_id, now=None):
+    """同 active_event_for_student，直接查询数据库（写操作使用）"""
+    now = now or timezone.now()
+    return MutualSelectionEvent.objects.filter(
+        students=student_id,
+        stu_start_time__lte=now,
+        stu_end_time__gte=now
+    ).order_by('event_id').first()
+
+
+def query_active_event_for_teacher(teacher_id, now=None):
+    """同 active_event_for_teacher，直接查询数据库（写操作使用）"""
+    now = now or timezone.now()
+    return MutualSelectionEvent.objects.filter(
+        teachers=teacher_id,
+        tea_start_time__lte=now,
+        tea_end_time__gte=now
+    ).order_by('event_id').first()
@@ -0,0 +1,292 @@
+"""
+自动分配流程：读取得分矩阵 -> 分配引擎 -> 写回 ProvisionalAssignment。
+手动调整后的局部修复也在这里，只改写受影响团队的记录。
+
+同步接口和后台任务（run_assign_jobs 命令）共用这里的实现。
+计算阶段不持有事务，只有最后的删除旧结果 + 批量写入在一个短事务中完成。
+"""
+import hashlib
+import random
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from teacherapp.models import teacher
+
+from .matching import assign_groups
+from .matching.loader import get_score_matrix
+from .matching.repair import repair_assignments
+from .models import AutoAssignJob, AutoAssignResult, ProvisionalAssignment
+from .versioning import bump_event_version
+
+DEFAULT_SEED = 0
+
+
+def input_fingerprint(score_matrix, limit, algorithm, seed):
+    """自动分配全部输入的摘要：志愿数据与评分规则、名额、算法、随机种子"""
+    digest = hashlib.sha256(score_matrix.fingerprint().encode())
+    digest.update(f'|{limit}|{algorithm}|{seed}'.encode())
+    return digest.hexdigest()
+
+
+def clear_auto_assign_result(event):
+    """临时分配被手动改动后，上次的自动分配结果不再可复用"""
+    AutoAssignResult.objects.filter(event=event).delete()
+
+
+def run_auto_assign(event, algorithm, progress=None, seed=DEFAULT_SEED, force=False):
+    """
+    执行一次自动分配并返回统计信息。
+    progress: 可选回调 progress(百分比, 阶段说明)
+    seed: 随机阶段的种子，相同输入 + 相同种子得到相同结果
+    输入指纹与上次相同且 force 为 False 时直接返回上次的结果。
+    活动没有团队或教师时抛出 ValueError。
+    """
+    def report(percent, stage):
+        if progress is not None:
+            progress(percent, stage)
+
+    report(5, '读取志愿数据')
+    score_matrix = get_score_matrix(event)
+    group_ids = score_matrix.group_ids
+    teacher_ids = score_matrix.teacher_ids
+
+    if not group_ids:
+        raise ValueError('当前活动没有任何团队')
+
+    if not teacher_ids:
+        raise ValueError('当前活动没有参与的教师')
+
+    fingerprint = input_fingerprint(score_matrix, event.teacher_choice_limit, algorithm, seed)
+    if not force:
+        previous = AutoAssignResult.objects.filter(event=event, fingerprint=fingerprint).first()
+        if previous is not None:
+            report(100, '输入未变化，复用上次结果')
+            return {**previous.result, 'reused': True}
+
+    # ========== 第一阶段：只取有志愿关系（得分大于 0）的组合 ==========
+    report(20, '计算志愿匹配')
+    candidates = score_matrix.candidates()
+
+    # ========== 第二、三阶段：志愿匹配 + 随机/超额分配 ==========
+    results = assign_groups(
+        group_ids,
+        teacher_ids,
+        candidates,
+        event.teacher_choice_limit,
+        algorithm=algorithm,
+        rng=random.Random(seed)
+    )
+
+    report(80, '保存分配结果')
+    provisional_assignments = [
+        ProvisionalAssignment(
+            event=event,
+            group_id=result['group_id'],
+            teacher_id=result['teacher_id'],
+            assignment_type='auto',
+            score=result['score'],
+            explanation=result['explanation']
+        )
+        for result in results
+    ]
+
+    # 统计信息
+    preference_matched = sum(1 for pa in provisional_assignments if pa.score > 0)
+    random_assigned = sum(1 for pa in provisional_assignments if pa.score == 0)
+    teacher_loads = defaultdict(int)
+    for pa in provisional_assignments:
+        teacher_loads[pa.teacher_id] += 1
+    over_capacity_ids = [
+        t for t in teacher_ids
+        if teacher_loads[t] > event.teacher_choice_limit
+    ]
+    over_capacity_teachers = list(
+        teacher.objects.filter(pk__in=over_capacity_ids).order_by('teacher_id').values_list('teacher_name', flat=True)
+    ) if over_capacity_ids else []
+
+    result = {
+        'message': '自动分配完成！',
+        'algorithm': algorithm,
+        'seed': seed,
+        'fingerprint': fingerprint,
+        'total_groups': len(group_ids),
+        'total_teachers': len(teacher_ids),
+        'assigned_count': len(provisional_assignments),
+        'preference_matched': preference_matched,
+        'random_assigned': random_assigned,
+        'unassigned_count': len(group_ids) - len(provisional_assignments),
+        'total_score': round(sum(pa.score for pa in provisional_assignments), 2),
+        'over_capacity_teachers': over_capacity_teachers,
+        'details': f'志愿匹配: {preference_matched}组，随机分配: {random_assigned}组'
+    }
+
+    with transaction.atomic():
+        # 清除旧的临时分配
+        ProvisionalAssignment.objects.filter(event=event).delete()
+        # 批量创建分配记录
+        ProvisionalAssignment.objects.bulk_create(provisional_assignments)
+        bump_event_version(event.pk)
+        AutoAssignResult.objects.update_or_create(
+            event=event, defaults={'fingerprint': fingerprint, 'result': result}
+        )
+
+    return {**result, 'reused': False}
+
+
+def run_repair(event, algorithm, affected_teacher_ids=None, exclude_groups=()):
+    """
+    保留手动分配和不受影响的自动分配，只重新分配受影响的团队。
+    affected_teacher_ids 为空时取当前仍有剩余名额的教师。
+    返回统计信息和发生变化的分配。
+    """
+    score_matrix = get_score_matrix(event)
+    limit = event.teacher_choice_limit
+
+    current = {}
+    pinned = set()
+    for group_id, teacher_id, score, assignment_type in ProvisionalAssignment.objects.filter(
+            event=event).values_list('group_id', 'teacher_id', 'score', 'assignment_type'):
+        current[group_id] = (teacher_id, score)
+        if assignment_type == 'manual':
+            pinned.add(group_id)
+
+    if affected_teacher_ids is None:
+        loads = defaultdict(int)
+        for teacher_id, _ in current.values():
+            loads[teacher_id] += 1
+        affected_teacher_ids = [t for t in score_matrix.teacher_ids if loads[t] < limit]
+
+    scope, results = repair_assignments(
+        score_matrix,
+        current,
+        pinned,
+        affected_teacher_ids,
+        limit,
+        algorithm=algorithm,
+        exclude_groups=exclude_groups
+    )
+
+    changes = [
+        {
+            'group_id': result['group_id'],
+            'from_teacher_id': current.get(result['group_id'], (None, 0))[0],
+            'to_teacher_id': result['teacher_id'],
+            'score': result['score'],
+            'explanation': result['explanation'],
+        }
+        for result in results
+        if current.get(result['group_id'], (None, 0))[0] != result['teacher_id']
+    ]
+
+    if scope:
+        with transaction.atomic():
+            clear_auto_assign_result(event)
+            ProvisionalAssignment.objects.filter(event=event, group_id__in=scope).delete()
+            ProvisionalAssignment.objects.bulk_create([
+                ProvisionalAssignment(
+                    event=event,
+                    group_id=result['group_id'],
+                    teacher_id=result['teacher_id'],
+                    assignment_type='auto',
+                    score=result['score'],
+                    explanation=result['explanation']
+                )
+                for result in results
+            ])
+            bump_event_version(event.pk)
+
+    return {
+        'algorithm': algorithm,
+        'pinned_count': len(pinned),
+        'repaired_groups': len(scope),
+        'changed_count': len(changes),
+        'changes': changes,
+    }
+
+
+# --- 后台任务 ---
+
+ACTIVE_JOB_STATUSES = (AutoAssignJob.STATUS_PENDING, AutoAssignJob.STATUS_RUNNING)
+
+
+def enqueue_auto_assign(event, algorithm, seed=DEFAULT_SEED, force=False):
+    """
+    提交后台分配任务。同一活动已有排队或执行中的任务时直接返回该任务。
+    返回 (job, created)
+    """
+    with transaction.atomic():
+        existing = AutoAssignJob.objects.select_for_update().filter(
+            event=event, status__in=ACTIVE_JOB_STATUSES
+        ).order_by('created_at').first()
+        if existing:
+            return existing, False
+        job = AutoAssignJob.objects.create(event=event, algorithm=algorithm, seed=seed, force=force)
+        return job, True
+
+
+def claim_next_job():
+    """领取最早的排队任务并标记为执行中，没有任务时返回 None"""
+    with transaction.atomic():
+        job = AutoAssignJob.objects.select_for_update(skip_locked=True).filter(
+            status=AutoAssignJob.STATUS_PENDING
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = AutoAssignJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.stage = '开始执行'
+        job.save(update_fields=['status', 'started_at', 'stage'])
+        return job
+
+
+def execute_job(job):
+    """执行已领取的任务，结果或错误写回任务记录；非预期异常在记录后继续抛出"""
+    def progress(percent, stage):
+        job.progress, job.stage = percent, stage
+        AutoAssignJob.objects.filter(pk=job.pk).update(progress=percent, stage=stage)
+
+    try:
+        job.result = run_auto_assign(
+            job.event, job.algorithm, progress=progress, seed=job.seed, force=job.force
+        )
+        job.status = AutoAssignJob.STATUS_SUCCEEDED
+        job.progress = 100
+        job.stage = '已完成'
+    except Exception as exc:
+        job.status = AutoAssignJob.STATUS_FAILED
+        job.error = str(exc) if isinstance(exc, ValueError) else f'{type(exc).__name__}: {exc}'
+        job.stage = '执行失败'
+        if not isinstance(exc, ValueError):
+            raise
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'progress', 'stage', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(timeout):
+    """执行超过 timeout 仍未结束的任务（工作进程异常退出）重新排队"""
+    deadline = timezone.now() - timeout
+    return AutoAssignJob.objects.filter(
+        status=AutoAssignJob.STATUS_RUNNING, started_at__lt=deadline
+    ).update(status=AutoAssignJob.STATUS_PENDING, progress=0, stage='重新排队', started_at=None)
+
+
+def job_payload(job):
+    """任务状态接口的返回格式"""
+    return {
+        'job_id': job.pk,
+        'event_id': job.event_id,
+        'algorithm': job.algorithm,
+        'seed': job.seed,
+        'status': job.status,
+        'progress': job.progress,
+        'stage': job.stage,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,254 @@
+"""
+匹配相关接口的性能基准。
+
+generate_event 在当前数据库中生成一个合成活动（学生、团队、教师、双向志愿），
+run_benchmarks 直接调用视图（带真实 JWT），记录耗时、峰值内存和 SQL 查询数；
+run_serialization_benchmarks 对比 DRF 序列化器与 values() 快速序列化。
+由 benchmark_matching / benchmark_serialization 命令调用，结果输出为 JSON，便于不同版本之间对比。
+"""
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from adminapp.models import AdminUser, MutualSelectionEvent
+from classwork.principals import sync_principal_directory
+from studentapp.models import Major, Student
+from teacherapp.models import teacher
+
+from .fast_serializers import serialize_available_teammates, serialize_groups
+from .matching.loader import get_score_matrix, invalidate_score_matrix
+from .models import Group, GroupMembership, TeacherGroupPreference
+from .serializers import AvailableTeammateSerializer, GroupDetailSerializer, annotate_teacher_ranks
+from .views import TeamViewSet
+
+DISTRIBUTION_UNIFORM = 'uniform'
+DISTRIBUTION_SKEW = 'skew'
+DISTRIBUTIONS = (DISTRIBUTION_UNIFORM, DISTRIBUTION_SKEW)
+
+BATCH_SIZE = 2000
+
+
+def _teacher_weights(teacher_count, distribution, skew):
+    """学生选择各教师的概率：uniform 为均匀分布，skew 为 Zipf 分布（少数热门教师）"""
+    if distribution == DISTRIBUTION_UNIFORM:
+        weights = np.ones(teacher_count)
+    elif distribution == DISTRIBUTION_SKEW:
+        weights = 1.0 / np.arange(1, teacher_count + 1) ** skew
+    else:
+        raise ValueError(f'未知的志愿分布: {distribution}')
+    return weights / weights.sum()
+
+
+def generate_event(groups, teachers, students_per_group=3, limit=None,
+                   distribution=DISTRIBUTION_UNIFORM, skew=1.2, seed=0):
+    """
+    生成合成活动并返回 MutualSelectionEvent。
+    每个团队从教师中选 3 个不同的志愿；每个教师优先从选了自己的团队中选 limit 个志愿，
+    不足时随机补齐。limit 默认为刚好容纳所有团队的名额。
+    """
+    rng = np.random.default_rng(seed)
+    tag = uuid.uuid4().hex[:8]
+    limit = limit or -(-groups // teachers)
+    now = timezone.now()
+
+    event = MutualSelectionEvent.objects.create(
+        event_name=f'benchmark-{tag}',
+        stu_start_time=now - timedelta(days=1),
+        stu_end_time=now + timedelta(days=1),
+        tea_start_time=now - timedelta(days=1),
+        tea_end_time=now + timedelta(days=1),
+        teacher_choice_limit=limit,
+        group_member_limit=max(students_per_group, 1),
+    )
+    major, _ = Major.objects.get_or_create(major_name='benchmark')
+
+    teacher_nos = [f'bench-{tag}-t{i}' for i in range(teachers)]
+    teacher.objects.bulk_create(
+        [teacher(teacher_no=teacher_no, teacher_name=f'教师{i}', introduction='benchmark')
+         for i, teacher_no in enumerate(teacher_nos)],
+        batch_size=BATCH_SIZE
+    )
+    # bulk_create 不触发信号，同步登录目录
+    sync_principal_directory('teacher', teacher_nos)
+    teacher_ids = list(teacher.objects.filter(
+        teacher_no__startswith=f'bench-{tag}-').order_by('teacher_id').values_list('teacher_id', flat=True))
+
+    stu_nos = [f'bench-{tag}-s{i}' for i in range(groups * students_per_group)]
+    Student.objects.bulk_create(
+        [Student(stu_no=stu_no, stu_name=f'学生{i}', grade='2025', major=major) for i, stu_no in enumerate(stu_nos)],
+        batch_size=BATCH_SIZE
+    )
+    sync_principal_directory('student', stu_nos)
+    student_ids = list(Student.objects.filter(
+        stu_no__startswith=f'bench-{tag}-').order_by('stu_id').values_list('stu_id', flat=True))
+
+    event.teachers.set(teacher_ids)
+    event.students.set(student_ids)
+
+    weights = _teacher_weights(len(teacher_ids), distribution, skew)
+    choices = min(3, len(teacher_ids))
+    new_groups = []
+    for g in range(groups):
+        picks = [teacher_ids[i] for i in rng.choice(len(teacher_ids), choices, replace=False, p=weights)]
+        picks += [None] * (3 - len(picks))
+        new_groups.append(Group(
+            event=event,
+            group_name=f'团队{g}',
+            project_title=f'项目{g}',
+            captain_id=student_ids[g * students_per_group] if students_per_group else None,
+            preferred_advisor_1_id=picks[0],
+            preferred_advisor_2_id=picks[1],
+            preferred_advisor_3_id=picks[2],
+        ))
+    Group.objects.bulk_create(new_groups, batch_size=BATCH_SIZE)
+    group_rows = list(Group.objects.filter(event=event).order_by('group_id').values_list(
+        'group_id', 'preferred_advisor_1_id', 'preferred_advisor_2_id', 'preferred_advisor_3_id'))
+    group_ids = [row[0] for row in group_rows]
+
+    GroupMembership.objects.bulk_create(
+        [GroupMembership(group_id=group_id, student_id=student_ids[g * students_per_group + m])
+         for g, group_id in enumerate(group_ids) for m in range(students_per_group)],
+        batch_size=BATCH_SIZE
+    )
+
+    chosen_by = {t: [] for t in teacher_ids}
+    for group_id, *advisors in group_rows:
+        for teacher_id in advisors:
+            if teacher_id is not None:
+                chosen_by[teacher_id].append(group_id)
+
+    preferences = []
+    for teacher_id in teacher_ids:
+        picked = list(rng.permutation(chosen_by[teacher_id])[:limit])
+        if len(picked) < limit:
+            others = [g for g in rng.permutation(group_ids)[:limit * 2].tolist() if g not in picked]
+            picked += others[:limit - len(picked)]
+        preferences += [
+            TeacherGroupPreference(teacher_id=teacher_id, group_id=int(group_id), preference_rank=rank)
+            for rank, group_id in enumerate(picked, start=1)
+        ]
+    TeacherGroupPreference.objects.bulk_create(preferences, batch_size=BATCH_SIZE)
+
+    return event
+
+
+def _admin_token():
+    admin = AdminUser.objects.create(
+        admin_name=f'benchmark-{uuid.uuid4().hex[:8]}',
+        admin_username=f'benchmark-{uuid.uuid4().hex[:8]}',
+        admin_password='!'
+    )
+    refresh = RefreshToken()
+    refresh['user_id'] = admin.admin_id
+    refresh['user_type'] = 'admin'
+    return str(refresh.access_token)
+
+
+def _measure(fn, repeat):
+    """计时 repeat 次（不开 tracemalloc），再单独运行一次统计峰值内存"""
+    durations = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - start)
+        queries = len(ctx)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'runs': repeat,
+        'min_seconds': round(min(durations), 6),
+        'median_seconds': round(statistics.median(durations), 6),
+        'max_seconds': round(max(durations), 6),
+        'queries': queries,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run_benchmarks(event, repeat=3):
+    """依次测量各个匹配入口，返回 {名称: 指标}"""
+    factory = APIRequestFactory()
+    auth = {'HTTP_AUTHORIZATION': f'Bearer {_admin_token()}'}
+    sample_group_id = Group.objects.filter(event=event).order_by('group_id').values_list(
+        'group_id', flat=True).first()
+
+    def call(action, method, path, data=None):
+        view = TeamViewSet.as_view({method: action})
+        if method == 'post':
+            request = factory.post(path, data, format='json', **auth)
+        else:
+            request = factory.get(path, data, **auth)
+        # 包含 JSON 渲染的耗时
+        response = view(request, pk=event.pk).render()
+        if response.status_code >= 400:
+            raise RuntimeError(f'{action} 返回 {response.status_code}: {getattr(response, "data", "")}')
+        return response
+
+    def score_matrix_cold():
+        invalidate_score_matrix(event.pk)
+        get_score_matrix(event)
+
+    cases = {
+        'score_matrix_cold': score_matrix_cold,
+        'auto_assign': lambda: call('auto_assign', 'post', '/', {'force': True}),
+        'auto_assign_reused': lambda: call('auto_assign', 'post', '/'),
+        'match_options': lambda: call('get_match_options', 'get', '/', {'group_id': sample_group_id}),
+        'all_match_options': lambda: call('get_all_match_options', 'get', '/'),
+        'all_match_options_top10': lambda: call('get_all_match_options', 'get', '/', {'top_k': 10}),
+    }
+    return {name: _measure(fn, repeat) for name, fn in cases.items()}
+
+
+def run_serialization_benchmarks(event, repeat=3):
+    """
+    分别用 DRF 序列化器和 values() 快速序列化生成 all-teams、teacher/dashboard、available-teammates
+    的 JSON（含渲染），返回 {名称: {'serializer': 指标, 'values': 指标, 'speedup': 中位数耗时之比}}
+    """
+    groups = Group.objects.filter(event=event).order_by('group_id')
+    ranked = annotate_teacher_ranks(groups, event.teachers.order_by('teacher_id').first())
+    students = event.students.order_by('stu_id')
+    render = JSONRenderer().render
+
+    cases = {
+        'all_teams': (
+            lambda: GroupDetailSerializer(GroupDetailSerializer.setup_eager_loading(groups), many=True).data,
+            lambda: serialize_groups(groups),
+        ),
+        'teacher_dashboard': (
+            lambda: GroupDetailSerializer(GroupDetailSerializer.setup_eager_loading(ranked), many=True).data,
+            lambda: serialize_groups(ranked),
+        ),
+        'available_teammates': (
+            lambda: AvailableTeammateSerializer(students.select_related('major'), many=True).data,
+            lambda: serialize_available_teammates(students),
+        ),
+    }
+
+    results = {}
+    for name, (serializer, values) in cases.items():
+        before = _measure(lambda: render(serializer()), repeat)
+        after = _measure(lambda: render(values()), repeat)
+        results[name] = {
+            'serializer': before,
+            'values': after,
+            'speedup': round(before['median_seconds'] / after['median_seconds'], 2),
+        }
+    return results
+
@@ -0,0 +1,154 @@
+"""
+热点读接口的快速序列化。
+
+直接从 values() / values_list() 的行拼装字典，输出与对应 DRF 序列化器逐字节一致的 JSON
+（字段顺序、None 的处理、截断规则都相同），省去 ModelSerializer 实例化和逐字段 to_representation 的开销。
+fields 为 SparseFieldsetMixin.selected_fields 的结果，None 表示全部字段。
+修改 GroupDetailSerializer / AvailableTeammateSerializer 的输出时需同步修改这里，tests.py 中有对比测试。
+"""
+from studentapp.models import Student
+from teacherapp.models import teacher
+
+from .models import GroupMembership
+from .serializers import TeamAdvisorSerializer, annotate_member_count
+
+STUDENT_COLUMNS = (
+    'stu_id', 'stu_no', 'stu_name', 'grade', 'major__major_name', 'phone', 'email', 'internship_location'
+)
+TEACHER_COLUMNS = tuple(TeamAdvisorSerializer.Meta.fields)
+ADVISOR_FIELDS = ('advisor', 'preferred_advisor_1', 'preferred_advisor_2', 'preferred_advisor_3')
+RANK_FIELDS = ('student_preference_rank', 'my_preference_rank')
+
+
+def _short(text, length):
+    if text:
+        return text[:length] + ('...' if len(text) > length else '')
+    return ''
+
+
+def _student(values, is_captain):
+    """与 TeamMemberSerializer 的输出一致"""
+    stu_id, stu_no, stu_name, grade, major_name, phone, email, internship_location = values
+    data = {'stu_id': stu_id, 'stu_no': stu_no, 'stu_name': stu_name, 'grade': grade}
+    # 没有专业时 major.major_name 取值失败，序列化器跳过该字段而不是输出 null
+    if major_name is not None:
+        data['major_name'] = major_name
+    data.update(phone=phone, email=email, is_captain=is_captain, internship_location=internship_location)
+    return data
+
+
+def serialize_groups(queryset, fields=None):
+    """
+    与 GroupDetailSerializer(queryset, many=True).data 一致（成员按 stu_id 排序）。
+    查询数固定：团队一次，需要时成员一次、教师一次；
+    student_preference_rank / my_preference_rank 只在查询集带有同名注解时输出，与序列化器相同。
+    """
+    def wanted(name):
+        return fields is None or name in fields
+
+    columns = [
+        'group_id', 'group_name', 'project_title', 'project_description', 'event_id',
+        'captain_id', *(f'{name}_id' for name in ADVISOR_FIELDS),
+    ]
+    if wanted('event_name'):
+        columns.append('event__event_name')
+    if wanted('group_member_limit'):
+        columns.append('event__group_member_limit')
+    ranks = [name for name in RANK_FIELDS if name in queryset.query.annotations and wanted(name)]
+    columns += ranks
+    if wanted('member_count') and not wanted('members'):
+        queryset = annotate_member_count(queryset)
+        columns.append('member_count')
+
+    rows = list(queryset.values(*columns))
+
+    students = {}
+    members_by_group = {}
+    if wanted('members'):
+        memberships = GroupMembership.objects.filter(
+            group_id__in=[row['group_id'] for row in rows]
+        ).order_by('student_id').values_list('group_id', *(f'student__{c}' for c in STUDENT_COLUMNS))
+        for group_id, *values in memberships:
+            students[values[0]] = values
+            members_by_group.setdefault(group_id, []).append(values)
+    if wanted('captain'):
+        missing = {row['captain_id'] for row in rows} - set(students) - {None}
+        if missing:
+            for values in Student.objects.filter(pk__in=missing).values_list(*STUDENT_COLUMNS):
+                students[values[0]] = values
+
+    teachers = {}
+    advisor_fields = [name for name in ADVISOR_FIELDS if wanted(name)]
+    teacher_ids = {row[f'{name}_id'] for row in rows for name in advisor_fields} - {None}
+    if teacher_ids:
+        teachers = {t['teacher_id']: t for t in teacher.objects.filter(pk__in=teacher_ids).values(*TEACHER_COLUMNS)}
+
+    data = []
+    for row in rows:
+        captain_id = row['captain_id']
+        members = members_by_group.get(row['group_id'], [])
+        item = {
+            'group_id': row['group_id'],
+            'group_name': row['group_name'],
+            'project_title': row['project_title'],
+            'project_description': row['project_description'],
+            'project_description_short': _short(row['project_description'], 100),
+            'event_id': row['event_id'],
+            'event_name': row.get('event__event_name'),
+            # 队长字段没有 group 上下文，TeamMemberSerializer 对其 is_captain 输出 False
+            'captain': _student(students[captain_id], False) if captain_id in students else None,
+            'members': [_student(values, values[0] == captain_id) for values in members],
+            'member_count': row['member_count'] if 'member_count' in row else len(members),
+        }
+        for name in ADVISOR_FIELDS:
+            item[name] = teachers.get(row[f'{name}_id'])
+        for name in ranks:
+            item[name] = row[name]
+        item['group_member_limit'] = row.get('event__group_member_limit')
+
+        if fields is not None:
+            item = {key: value for key, value in item.items() if key in fields}
+        data.append(item)
+    return data
+
+
+def merge_teacher_ranks(groups, teacher_id, my_ranks, fields=None):
+    """
+    在 serialize_groups 的完整输出上合并教师视角的志愿序号，与 annotate_teacher_ranks 后的输出一致。
+    student_preference_rank 由团队的三个志愿导师得出，my_preference_rank 取自 my_ranks（{group_id: 序号}）。
+    groups 为多个请求共享的快照，这里只生成新字典，不修改原对象。
+    """
+    data = []
+    for group in groups:
+        student_rank = None
+        for rank, name in enumerate(ADVISOR_FIELDS[1:], 1):
+            advisor = group[name]
+            if advisor is not None and advisor['teacher_id'] == teacher_id:
+                student_rank = rank
+                break
+
+        item = {}
+        for key, value in group.items():
+            if key == 'group_member_limit':
+                item['student_preference_rank'] = student_rank
+                item['my_preference_rank'] = my_ranks.get(group['group_id'])
+            item[key] = value
+
+        if fields is not None:
+            item = {key: value for key, value in item.items() if key in fields}
+        data.append(item)
+    return data
+
+
+def serialize_available_teammates(queryset, fields=None):
+    """与 AvailableTeammateSerializer(queryset, many=True).data 一致"""
+    data = []
+    for stu_id, stu_no, stu_name, major_name in queryset.values_list(
+            'stu_id', 'stu_no', 'stu_name', 'major__major_name'):
+        item = {'stu_id': stu_id, 'stu_no': stu_no, 'stu_name': stu_name}
+        if major_name is not None:
+            item['major_name'] = major_name
+        data.append(item)
+    if fields is not None:
+        data = [{key: value for key, value in item.items() if key in fields} for item in data]
+    return data
@@ -0,0 +1,98 @@
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from teamapp.benchmark import DISTRIBUTIONS, DISTRIBUTION_UNIFORM, generate_event, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        '生成合成活动并测量 auto_assign、match-options、all-match-options 的耗时、峰值内存和查询数，'
+        '结果输出为 JSON。默认在事务中运行并在结束后回滚，不保留生成的数据。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=500, help='团队数')
+        parser.add_argument('--teachers', type=int, default=100, help='教师数')
+        parser.add_argument('--students-per-group', type=int, default=3, help='每个团队的学生数')
+        parser.add_argument('--limit', type=int, default=None, help='教师名额，默认刚好容纳所有团队')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default=DISTRIBUTION_UNIFORM,
+                            help='学生志愿分布：uniform 均匀，skew 少数热门教师')
+        parser.add_argument('--skew', type=float, default=1.2, help='skew 分布的 Zipf 指数')
+        parser.add_argument('--seed', type=int, default=0, help='数据生成的随机种子')
+        parser.add_argument('--repeat', type=int, default=3, help='每个接口的计时次数')
+        parser.add_argument('--output', help='结果 JSON 文件路径，默认输出到标准输出')
+        parser.add_argument('--keep', action='store_true', help='保留生成的数据（默认回滚）')
+
+    def handle(self, *args, **options):
+        if options['groups'] < 1 or options['teachers'] < 1 or options['repeat'] < 1:
+            raise CommandError('groups、teachers、repeat 必须为正整数')
+
+        params = {
+            key: options[key] for key in (
+                'groups', 'teachers', 'students_per_group', 'limit',
+                'distribution', 'skew', 'seed', 'repeat'
+            )
+        }
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            event = generate_event(
+                options['groups'],
+                options['teachers'],
+                students_per_group=options['students_per_group'],
+                limit=options['limit'],
+                distribution=options['distribution'],
+                skew=options['skew'],
+                seed=options['seed'],
+            )
+            generate_seconds = time.perf_counter() - start
+            self.stderr.write(f'已生成活动 {event.event_id}（{generate_seconds:.1f} 秒），开始测量…')
+
+            results = self.run_benchmarks(event, repeat=options['repeat'])
+            params['limit'] = event.teacher_choice_limit
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'git_revision': self._git_revision(),
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+            },
+            'params': params,
+            'generate_seconds': round(generate_seconds, 3),
+            'results': results,
+        }
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output, encoding='utf-8')
+            self.stderr.write(self.style.SUCCESS(f'结果已写入 {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def run_benchmarks(self, event, repeat):
+        return run_benchmarks(event, repeat=repeat)
+
+    def _git_revision(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,13 @@
+from teamapp.benchmark import run_serialization_benchmarks
+
+from .benchmark_matching import Command as MatchingBenchmarkCommand
+
+
+class Command(MatchingBenchmarkCommand):
+    help = (
+        '生成合成活动，对比 DRF 序列化器与 values() 快速序列化在 all-teams、teacher/dashboard、'
+        'available-teammates 上的耗时、峰值内存和查询数，结果输出为 JSON。默认在事务中运行并在结束后回滚。'
+    )
+
+    def run_benchmarks(self, event, repeat):
+        return run_serialization_benchmarks(event, repeat=repeat)
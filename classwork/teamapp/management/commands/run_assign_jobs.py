@@ -0,0 +1,47 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from teamapp.assignment import claim_next_job, execute_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = '执行排队中的自动分配任务（只依赖数据库，可与 gunicorn 并行运行多个实例）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+        parser.add_argument('--interval', type=float, default=2.0, help='队列为空时的轮询间隔（秒）')
+        parser.add_argument(
+            '--stale-minutes', type=int, default=30,
+            help='执行超过该时长的任务视为工作进程已退出，重新排队'
+        )
+
+    def handle(self, *args, **options):
+        stale_timeout = timedelta(minutes=options['stale_minutes'])
+
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_jobs(stale_timeout)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'{requeued} 个超时任务已重新排队'))
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f'开始执行任务 #{job.pk}（活动 {job.event_id}，算法 {job.algorithm}）')
+            try:
+                execute_job(job)
+            except Exception:
+                self.stderr.write(traceback.format_exc())
+                continue
+            if job.status == job.STATUS_SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(f'任务 #{job.pk} 完成'))
+            else:
+                self.stdout.write(self.style.ERROR(f'任务 #{job.pk} 失败: {job.error}'))
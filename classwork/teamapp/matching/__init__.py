@@ -0,0 +1,21 @@
+from .engine import (
+    ALGORITHM_GREEDY,
+    ALGORITHM_MIN_COST_FLOW,
+    ALGORITHMS,
+    assign_groups,
+    match_by_preference,
+)
+from .flow import MinCostFlow
+from .matrix import ScoreMatrix
+from .repair import repair_assignments, repair_scope
+from .scoring import (
+    STUDENT_PREF_SCORES,
+    TEACHER_PREF_SCORES,
+    TEACHER_WEIGHT_MULTIPLIER,
+    preference_edges,
+)
+from .simulation import (
+    MAX_SCENARIOS,
+    parse_scenario,
+    run_scenarios,
+)
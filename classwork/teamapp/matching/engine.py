@@ -0,0 +1,150 @@
+"""
+团队-导师分配引擎。
+
+输入只包含 ID 和得分，不访问数据库，视图负责读取志愿并写回 ProvisionalAssignment。
+"""
+import heapq
+import random
+
+from .flow import MinCostFlow
+
+ALGORITHM_MIN_COST_FLOW = 'min_cost_flow'
+ALGORITHM_GREEDY = 'greedy'
+ALGORITHMS = (ALGORITHM_MIN_COST_FLOW, ALGORITHM_GREEDY)
+
+# 最小费用流要求整数费用，得分放大后取整
+SCORE_SCALE = 100
+
+
+def match_by_preference(candidates, capacity, algorithm=ALGORITHM_MIN_COST_FLOW):
+    """
+    在有志愿的 (团队, 教师) 组合中选出一组匹配，不超过教师容量。
+
+    candidates: [{'group_id', 'teacher_id', 'score', 'explanation'}, ...]，score > 0
+    capacity: {teacher_id: 剩余名额}
+    返回 {group_id: candidate}
+    """
+    if algorithm == ALGORITHM_GREEDY:
+        return _greedy_match(candidates, capacity)
+    if algorithm == ALGORITHM_MIN_COST_FLOW:
+        return _optimal_match(candidates, capacity)
+    raise ValueError(f'未知的分配算法: {algorithm}')
+
+
+def _greedy_match(candidates, capacity):
+    """按得分从高到低依次分配（原有算法，保留用于对比）"""
+    remaining = dict(capacity)
+    matched = {}
+    for match in sorted(candidates, key=lambda c: c['score'], reverse=True):
+        group_id, teacher_id = match['group_id'], match['teacher_id']
+        if group_id in matched or remaining.get(teacher_id, 0) <= 0:
+            continue
+        matched[group_id] = match
+        remaining[teacher_id] -= 1
+    return matched
+
+
+def _optimal_match(candidates, capacity):
+    """
+    最大权 b-匹配：源点 -> 团队(容量1) -> 教师(容量1，费用为负得分) -> 汇点(容量为教师名额)。
+    最小费用流的结果即总得分最高的分配。
+    """
+    group_nodes = {}
+    teacher_nodes = {}
+    for match in candidates:
+        group_nodes.setdefault(match['group_id'], len(group_nodes))
+        teacher_nodes.setdefault(match['teacher_id'], len(teacher_nodes))
+
+    source = len(group_nodes) + len(teacher_nodes)
+    sink = source + 1
+    solver = MinCostFlow(sink + 1)
+    teacher_offset = len(group_nodes)
+
+    for node in group_nodes.values():
+        solver.add_edge(source, node, 1, 0)
+    for teacher_id, node in teacher_nodes.items():
+        solver.add_edge(teacher_offset + node, sink, max(capacity.get(teacher_id, 0), 0), 0)
+
+    edges = []
+    for match in candidates:
+        edge = solver.add_edge(
+            group_nodes[match['group_id']],
+            teacher_offset + teacher_nodes[match['teacher_id']],
+            1,
+            -int(round(match['score'] * SCORE_SCALE))
+        )
+        edges.append((edge, match))
+
+    solver.min_cost_flow(source, sink)
+
+    return {
+        match['group_id']: match
+        for edge, match in edges
+        if solver.flow_on(edge) > 0
+    }
+
+
+def assign_groups(group_ids, teacher_ids, candidates, limit, algorithm=ALGORITHM_MIN_COST_FLOW,
+                  fixed_loads=None, rng=None):
+    """
+    完整的自动分配流程：
+    1. 按志愿匹配（贪心或最小费用流）；
+    2. 剩余团队分配给仍有名额且负载最低的教师（同负载随机）；
+    3. 名额全部用完后，超额分配给指导团队最少的教师（同负载随机）。
+    后两个阶段用按负载排序的堆，每个团队 O(log T)。
+
+    fixed_loads: {teacher_id: 已占用名额}，局部修复时传入不参与本次分配的团队占用的名额
+    rng: random.Random 实例，传入固定种子时结果可复现
+    返回 [{'group_id', 'teacher_id', 'score', 'explanation'}, ...]，顺序与 group_ids 一致。
+    """
+    fixed_loads = fixed_loads or {}
+    rng = rng if rng is not None else random.Random()
+    teacher_capacity = {t: limit - fixed_loads.get(t, 0) for t in teacher_ids}
+    matched = match_by_preference(candidates, teacher_capacity, algorithm)
+
+    assignments = {}
+    for group_id, match in matched.items():
+        assignments[group_id] = {
+            'group_id': group_id,
+            'teacher_id': match['teacher_id'],
+            'score': match['score'],
+            'explanation': match['explanation'],
+        }
+        teacher_capacity[match['teacher_id']] -= 1
+
+    unassigned_groups = [g for g in group_ids if g not in assignments]
+
+    if unassigned_groups and teacher_ids:
+        # 负载 = 已占用名额（含固定负载）；同负载时随机决定先后
+        loads = {t: limit - teacher_capacity[t] for t in teacher_ids}
+        available = [(loads[t], rng.random(), t) for t in teacher_ids if teacher_capacity[t] > 0]
+        heapq.heapify(available)
+        overflow = None
+
+        for group_id in unassigned_groups:
+            if available:
+                # 随机阶段：分配给仍有名额且负载最低的教师
+                _, _, teacher_id = heapq.heappop(available)
+                explanation = '随机分配（无志愿匹配）'
+                teacher_capacity[teacher_id] -= 1
+                loads[teacher_id] += 1
+                if teacher_capacity[teacher_id] > 0:
+                    heapq.heappush(available, (loads[teacher_id], rng.random(), teacher_id))
+            else:
+                # 所有教师都满额，超额分配给当前指导团队最少的教师
+                if overflow is None:
+                    overflow = [(loads[t], rng.random(), t) for t in teacher_ids]
+                    heapq.heapify(overflow)
+                _, _, teacher_id = heapq.heappop(overflow)
+                explanation = '超额分配（原名额已满）'
+                loads[teacher_id] += 1
+                heapq.heappush(overflow, (loads[teacher_id], rng.random(), teacher_id))
+
+            assignments[group_id] = {
+                'group_id': group_id,
+                'teacher_id': teacher_id,
+                'score': 0.0,
+                'explanation': explanation,
+            }
+
+    return [assignments[g] for g in group_ids if g in assignments]
@@ -0,0 +1,183 @@
+"""
+最小费用流求解器（原始-对偶 + Dinic 阻塞流）。
+
+与 Django 无关的纯 Python 实现，供分配引擎调用。
+"""
+import heapq
+from collections import deque
+
+
+class MinCostFlow:
+    """
+    带势函数的最小费用流。
+
+    每一轮用 Dijkstra 求出最短增广路长度，然后在“零约化费用”的可行子图上
+    用 Dinic 一次性推满所有同长度的增广路，轮数只与不同的路径费用种类有关。
+    费用必须为整数（用于判断约化费用是否为 0）。
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.graph = [[] for _ in range(n)]
+        self._to = []
+        self._cap = []
+        self._cost = []
+
+    def add_edge(self, u, v, cap, cost):
+        """添加一条 u -> v 的有向边，返回边编号（反向边为 编号 ^ 1）"""
+        index = len(self._to)
+        self._to.extend((v, u))
+        self._cap.extend((cap, 0))
+        self._cost.extend((cost, -cost))
+        self.graph[u].append(index)
+        self.graph[v].append(index + 1)
+        return index
+
+    def flow_on(self, edge):
+        """返回某条边上的当前流量"""
+        return self._cap[edge ^ 1]
+
+    def min_cost_flow(self, source, sink):
+        """
+        求任意流量下的最小费用（只要还存在负费用增广路就继续增广）。
+        返回 (总流量, 总费用)。
+        """
+        potential = self._initial_potential()
+        total_flow = 0
+        total_cost = 0
+
+        while True:
+            dist = self._dijkstra(source, potential)
+            if dist[sink] is None:
+                break
+
+            limit = dist[sink]
+            for v in range(self.n):
+                d = dist[v]
+                potential[v] += limit if d is None or d > limit else d
+
+            path_cost = potential[sink] - potential[source]
+            if path_cost >= 0:
+                break
+
+            pushed = self._blocking_flow(source, sink, potential)
+            if not pushed:
+                break
+            total_flow += pushed
+            total_cost += pushed * path_cost
+
+        return total_flow, total_cost
+
+    # --- 内部实现 ---
+
+    def _initial_potential(self):
+        """Bellman-Ford（队列优化）计算初始势，允许负费用边（要求无负环）"""
+        potential = [0] * self.n
+        in_queue = [True] * self.n
+        queue = deque(range(self.n))
+        to, cap, cost = self._to, self._cap, self._cost
+
+        while queue:
+            u = queue.popleft()
+            in_queue[u] = False
+            pu = potential[u]
+            for e in self.graph[u]:
+                if cap[e] <= 0:
+                    continue
+                v = to[e]
+                nd = pu + cost[e]
+                if nd < potential[v]:
+                    potential[v] = nd
+                    if not in_queue[v]:
+                        in_queue[v] = True
+                        queue.append(v)
+        return potential
+
+    def _dijkstra(self, source, potential):
+        dist = [None] * self.n
+        dist[source] = 0
+        heap = [(0, source)]
+        to, cap, cost = self._to, self._cap, self._cost
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d != dist[u]:
+                continue
+            pu = potential[u]
+            for e in self.graph[u]:
+                if cap[e] <= 0:
+                    continue
+                v = to[e]
+                nd = d + cost[e] + pu - potential[v]
+                if dist[v] is None or nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _blocking_flow(self, source, sink, potential):
+        """在零约化费用子图上反复求 Dinic 阻塞流"""
+        to, cap, cost = self._to, self._cap, self._cost
+        # 本轮内约化费用不变（增广产生的反向边约化费用同样为 0），只需按容量过滤
+        admissible = [
+            [e for e in edges if cost[e] + potential[u] - potential[to[e]] == 0]
+            for u, edges in enumerate(self.graph)
+        ]
+
+        total = 0
+        while True:
+            level = [-1] * self.n
+            level[source] = 0
+            queue = deque([source])
+            while queue:
+                u = queue.popleft()
+                for e in admissible[u]:
+                    v = to[e]
+                    if level[v] < 0 and cap[e] > 0:
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[sink] < 0:
+                return total
+
+            it = [0] * self.n
+            while True:
+                pushed = self._augment(source, sink, level, it, admissible)
+                if not pushed:
+                    break
+                total += pushed
+
+    def _augment(self, source, sink, level, it, admissible):
+        """沿层次图找一条增广路并推流（迭代实现，避免递归过深）"""
+        stack = [source]
+        path = []
+        to, cap = self._to, self._cap
+
+        while stack:
+            u = stack[-1]
+            if u == sink:
+                pushed = min(cap[e] for e in path)
+                for e in path:
+                    cap[e] -= pushed
+                    cap[e ^ 1] += pushed
+                return pushed
+
+            edges = admissible[u]
+            next_level = level[u] + 1
+            advanced = False
+            while it[u] < len(edges):
+                e = edges[it[u]]
+                v = to[e]
+                if cap[e] > 0 and level[v] == next_level:
+                    stack.append(v)
+                    path.append(e)
+                    advanced = True
+                    break
+                it[u] += 1
+
+            if not advanced:
+                # 死胡同，本轮不再访问
+                level[u] = -1
+                stack.pop()
+                if path:
+                    path.pop()
+                    it[stack[-1]] += 1
+        return 0
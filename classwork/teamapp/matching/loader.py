@@ -0,0 +1,49 @@
+"""
+从数据库读取活动的志愿数据，构建 ScoreMatrix。
+
+单独放在这里，matching 包的其余部分不依赖 Django，可以在子进程中直接使用。
+"""
+from django.db.models import F
+
+from teamapp.models import Group, TeacherGroupPreference, ScoreMatrixCache
+
+from .matrix import ScoreMatrix
+
+
+def load_score_matrix(event):
+    """固定三次查询：团队及学生志愿、参与教师、教师志愿"""
+    group_rows = Group.objects.filter(event=event).order_by('group_id').values_list(
+        'group_id', 'preferred_advisor_1_id', 'preferred_advisor_2_id', 'preferred_advisor_3_id'
+    )
+    student_prefs = {row[0]: list(row[1:]) for row in group_rows}
+
+    teacher_ids = list(event.teachers.order_by('teacher_id').values_list('teacher_id', flat=True))
+
+    teacher_prefs = TeacherGroupPreference.objects.filter(
+        group__event=event
+    ).values_list('teacher_id', 'group_id', 'preference_rank')
+
+    return ScoreMatrix.from_preferences(list(student_prefs), teacher_ids, student_prefs, teacher_prefs)
+
+
+def get_score_matrix(event):
+    """
+    优先读取缓存的得分矩阵，缓存失效时重新计算并写回。
+    写回时校验 version，计算期间志愿又发生变化则不覆盖。
+    """
+    cache, _ = ScoreMatrixCache.objects.get_or_create(event=event)
+    if cache.data is not None:
+        return ScoreMatrix.from_bytes(bytes(cache.data))
+
+    matrix = load_score_matrix(event)
+    ScoreMatrixCache.objects.filter(event=event, version=cache.version).update(data=matrix.to_bytes())
+    return matrix
+
+
+def invalidate_score_matrix(event_ids):
+    """使一个或多个活动的得分矩阵缓存失效"""
+    if isinstance(event_ids, int):
+        event_ids = [event_ids]
+    ScoreMatrixCache.objects.filter(event_id__in=list(event_ids)).update(
+        data=None, version=F('version') + 1
+    )
@@ -0,0 +1,211 @@
+"""
+团队 × 教师 得分矩阵。
+
+自动分配、单个团队的匹配选项和全局匹配矩阵共用同一份评分结果：
+志愿以稀疏形式（每个有志愿关系的组合一条）保存，自动分配直接读取稀疏边；
+管理员视图需要整行、整列或 top-k 时再按需展开为 NumPy 稠密矩阵。
+"""
+import hashlib
+import io
+
+import numpy as np
+
+from .scoring import (
+    STUDENT_PREF_SCORES,
+    TEACHER_PREF_SCORES,
+    TEACHER_WEIGHT_MULTIPLIER,
+    preference_edges,
+)
+
+
+def _score_table(pref_scores, max_rank):
+    """把 {志愿序号: 分数} 转成按序号下标取值的数组，0 号位表示无志愿"""
+    table = np.zeros(max_rank + 1, dtype=np.float64)
+    for rank in range(1, max_rank + 1):
+        table[rank] = pref_scores.get(rank, 0)
+    return table
+
+
+class ScoreMatrix:
+    """一个活动的双向志愿得分"""
+
+    def __init__(self, group_ids, teacher_ids, rows, cols, teacher_ranks, student_ranks,
+                 teacher_pref_scores=None, student_pref_scores=None, teacher_weight=None):
+        self.group_ids = list(group_ids)
+        self.teacher_ids = list(teacher_ids)
+        self.group_index = {g: i for i, g in enumerate(self.group_ids)}
+        self.teacher_index = {t: j for j, t in enumerate(self.teacher_ids)}
+
+        # 稀疏存储：第 k 个组合为 (rows[k], cols[k])，志愿序号 0 表示无志愿
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.teacher_ranks = np.asarray(teacher_ranks, dtype=np.int64)
+        self.student_ranks = np.asarray(student_ranks, dtype=np.int64)
+
+        self.teacher_pref_scores = TEACHER_PREF_SCORES if teacher_pref_scores is None else teacher_pref_scores
+        self.student_pref_scores = STUDENT_PREF_SCORES if student_pref_scores is None else student_pref_scores
+        self.teacher_weight = TEACHER_WEIGHT_MULTIPLIER if teacher_weight is None else teacher_weight
+
+        teacher_table = _score_table(self.teacher_pref_scores, int(self.teacher_ranks.max(initial=0)))
+        student_table = _score_table(self.student_pref_scores, int(self.student_ranks.max(initial=0)))
+        self.teacher_scores = teacher_table[self.teacher_ranks] * self.teacher_weight
+        self.student_scores = student_table[self.student_ranks]
+        self.scores = np.round(self.teacher_scores + self.student_scores, 2)
+
+        self._dense = {}
+
+    @classmethod
+    def from_preferences(cls, group_ids, teacher_ids, student_prefs, teacher_prefs, **weights):
+        """
+        student_prefs: {group_id: [第一志愿教师ID, 第二志愿教师ID, 第三志愿教师ID]}
+        teacher_prefs: 可迭代的 (teacher_id, group_id, preference_rank)
+        """
+        group_index = {g: i for i, g in enumerate(group_ids)}
+        teacher_index = {t: j for j, t in enumerate(teacher_ids)}
+        student_prefs = {g: p for g, p in student_prefs.items() if g in group_index}
+
+        edges = preference_edges(student_prefs, teacher_prefs, teacher_index)
+        rows, cols, teacher_ranks, student_ranks = [], [], [], []
+        for (group_id, teacher_id), (teacher_rank, student_rank) in edges.items():
+            rows.append(group_index[group_id])
+            cols.append(teacher_index[teacher_id])
+            teacher_ranks.append(teacher_rank or 0)
+            student_ranks.append(student_rank or 0)
+
+        return cls(group_ids, teacher_ids, rows, cols, teacher_ranks, student_ranks, **weights)
+
+    def with_weights(self, teacher_pref_scores=None, student_pref_scores=None, teacher_weight=None):
+        """用另一套评分规则重新计算得分，志愿数据不变"""
+        return ScoreMatrix(
+            self.group_ids, self.teacher_ids, self.rows, self.cols,
+            self.teacher_ranks, self.student_ranks,
+            teacher_pref_scores=teacher_pref_scores,
+            student_pref_scores=student_pref_scores,
+            teacher_weight=teacher_weight,
+        )
+
+    def to_bytes(self):
+        """序列化为压缩的 npz 二进制，用于持久化缓存（不含评分规则）"""
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            group_ids=np.asarray(self.group_ids, dtype=np.int64),
+            teacher_ids=np.asarray(self.teacher_ids, dtype=np.int64),
+            rows=self.rows.astype(np.int32),
+            cols=self.cols.astype(np.int32),
+            teacher_ranks=self.teacher_ranks.astype(np.int32),
+            student_ranks=self.student_ranks.astype(np.int32),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data, **weights):
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(
+                arrays['group_ids'].tolist(),
+                arrays['teacher_ids'].tolist(),
+                arrays['rows'],
+                arrays['cols'],
+                arrays['teacher_ranks'],
+                arrays['student_ranks'],
+                **weights
+            )
+
+    def fingerprint(self):
+        """
+        志愿数据和评分规则的摘要（sha256），与边的存储顺序无关。
+        团队、参与教师、学生志愿、教师志愿或评分规则任一变化都会改变结果。
+        """
+        order = np.lexsort((self.cols, self.rows))
+        digest = hashlib.sha256()
+        for values in (
+            self.group_ids, self.teacher_ids,
+            self.rows[order], self.cols[order],
+            self.teacher_ranks[order], self.student_ranks[order],
+        ):
+            digest.update(np.asarray(values, dtype=np.int64).tobytes())
+            digest.update(b'|')
+        digest.update(repr((
+            sorted(self.teacher_pref_scores.items()),
+            sorted(self.student_pref_scores.items()),
+            self.teacher_weight,
+        )).encode())
+        return digest.hexdigest()
+
+    @property
+    def shape(self):
+        return len(self.group_ids), len(self.teacher_ids)
+
+    # --- 稠密视图（按需展开） ---
+
+    def _densify(self, name, values, dtype):
+        if name not in self._dense:
+            matrix = np.zeros(self.shape, dtype=dtype)
+            matrix[self.rows, self.cols] = values
+            self._dense[name] = matrix
+        return self._dense[name]
+
+    @property
+    def score_matrix(self):
+        return self._densify('scores', self.scores, np.float64)
+
+    @property
+    def teacher_rank_matrix(self):
+        return self._densify('teacher_ranks', self.teacher_ranks, np.int64)
+
+    @property
+    def student_rank_matrix(self):
+        return self._densify('student_ranks', self.student_ranks, np.int64)
+
+    def row(self, group_id):
+        """某个团队对所有教师的得分，顺序与 teacher_ids 一致"""
+        return self.score_matrix[self.group_index[group_id]]
+
+    def column(self, teacher_id):
+        """某个教师对所有团队的得分，顺序与 group_ids 一致"""
+        return self.score_matrix[:, self.teacher_index[teacher_id]]
+
+    def ranked_teachers(self, k=None):
+        """
+        每个团队按得分从高到低排列的教师下标，同分时保持 teacher_ids 的顺序。
+        k 不为空时只保留前 k 个。
+        """
+        order = np.argsort(-self.score_matrix, axis=1, kind='stable')
+        return order if k is None else order[:, :k]
+
+    def top_k(self, group_id, k=None):
+        """某个团队得分最高的 k 个教师下标"""
+        order = np.argsort(-self.row(group_id), kind='stable')
+        return order if k is None else order[:k]
+
+    # --- 稀疏视图（自动分配使用） ---
+
+    def candidates(self, group_ids=None):
+        """
+        得分大于 0 的组合，格式与分配引擎的候选列表一致，
+        按 group_ids、teacher_ids 的顺序排列。
+        group_ids 不为空时只返回这些团队的组合。
+        """
+        mask = self.scores > 0
+        if group_ids is not None:
+            rows = [self.group_index[g] for g in group_ids if g in self.group_index]
+            mask &= np.isin(self.rows, rows)
+        positive = np.flatnonzero(mask)
+        positive = positive[np.lexsort((self.cols[positive], self.rows[positive]))]
+
+        candidates = []
+        for k in positive.tolist():
+            teacher_rank = int(self.teacher_ranks[k])
+            student_rank = int(self.student_ranks[k])
+            explanation_parts = []
+            if self.teacher_scores[k] > 0:
+                explanation_parts.append(f"教师第{teacher_rank}志愿")
+            if self.student_scores[k] > 0:
+                explanation_parts.append(f"学生第{student_rank}志愿")
+            candidates.append({
+                'group_id': self.group_ids[self.rows[k]],
+                'teacher_id': self.teacher_ids[self.cols[k]],
+                'score': float(self.scores[k]),
+                'explanation': " + ".join(explanation_parts),
+            })
+        return candidates
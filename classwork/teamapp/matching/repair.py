@@ -0,0 +1,75 @@
+"""
+手动调整后的局部修复。
+
+保留管理员手动指定的分配和不受影响的自动分配，只对受影响的团队重新运行分配引擎，
+其余团队占用的名额作为固定负载传入。
+"""
+from collections import Counter
+
+import numpy as np
+
+from .engine import ALGORITHM_MIN_COST_FLOW, assign_groups
+
+
+def repair_scope(matrix, current, pinned, affected_teachers, exclude_groups=()):
+    """
+    需要重新分配的团队：
+    - 尚未分配的团队；
+    - 当前分配给受影响教师（或已不在活动中的教师）的非固定团队；
+    - 对受影响教师的得分高于当前得分的非固定团队（名额空出后可能换到更好的志愿）。
+
+    current: {group_id: (teacher_id, score)}
+    pinned: 不可改动的团队ID（手动指定）
+    exclude_groups: 保持未分配、不参与修复的团队ID
+    返回按 matrix.group_ids 排序的团队ID列表
+    """
+    affected_teachers = set(affected_teachers)
+    frozen = set(pinned) | set(exclude_groups)
+    scope = set()
+
+    for group_id in matrix.group_ids:
+        if group_id in frozen:
+            continue
+        assignment = current.get(group_id)
+        if assignment is None:
+            scope.add(group_id)
+        elif assignment[0] in affected_teachers or assignment[0] not in matrix.teacher_index:
+            scope.add(group_id)
+
+    cols = [matrix.teacher_index[t] for t in affected_teachers if t in matrix.teacher_index]
+    if cols:
+        edges = np.flatnonzero(np.isin(matrix.cols, cols) & (matrix.scores > 0))
+        for k in edges.tolist():
+            group_id = matrix.group_ids[matrix.rows[k]]
+            if group_id in frozen or group_id in scope:
+                continue
+            if matrix.scores[k] > current[group_id][1]:
+                scope.add(group_id)
+
+    return [g for g in matrix.group_ids if g in scope]
+
+
+def repair_assignments(matrix, current, pinned, affected_teachers, limit,
+                       algorithm=ALGORITHM_MIN_COST_FLOW, exclude_groups=()):
+    """
+    局部修复，返回 (scope, results)：
+    scope 为重新分配的团队ID，results 为这些团队的新分配（格式同 assign_groups）。
+    """
+    scope = repair_scope(matrix, current, pinned, affected_teachers, exclude_groups)
+    if not scope:
+        return scope, []
+
+    scope_set = set(scope)
+    fixed_loads = Counter(
+        teacher_id for group_id, (teacher_id, _) in current.items()
+        if group_id not in scope_set
+    )
+    results = assign_groups(
+        scope,
+        matrix.teacher_ids,
+        matrix.candidates(scope),
+        limit,
+        algorithm=algorithm,
+        fixed_loads=fixed_loads
+    )
+    return scope, results
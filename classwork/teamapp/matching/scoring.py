@@ -0,0 +1,39 @@
+"""
+双向志愿评分规则。
+
+只为存在志愿关系的 (团队, 教师) 组合生成边，没有志愿的组合得分为 0，
+由分配引擎的随机阶段处理。这样内存和耗时与志愿条数成正比，而不是团队数 × 教师数。
+"""
+
+# 权重和评分规则
+TEACHER_WEIGHT_MULTIPLIER = 1.2  # 教师志愿权重稍高
+TEACHER_PREF_SCORES = {1: 10, 2: 8, 3: 6, 4: 4, 5: 2}
+STUDENT_PREF_SCORES = {1: 10, 2: 5, 3: 2}
+
+
+def preference_edges(student_prefs, teacher_prefs, teacher_ids):
+    """
+    合并学生志愿与教师志愿。
+
+    student_prefs: {group_id: [第一志愿教师ID, 第二志愿教师ID, 第三志愿教师ID]}
+    teacher_prefs: 可迭代的 (teacher_id, group_id, preference_rank)
+    teacher_ids: 参与活动的教师ID，未参与的教师会被忽略
+    返回 {(group_id, teacher_id): [teacher_rank, student_rank]}，缺失的一方为 None
+    """
+    teacher_ids = set(teacher_ids)
+    edges = {}
+
+    for group_id, advisors in student_prefs.items():
+        for rank, teacher_id in enumerate(advisors, start=1):
+            if teacher_id is None or teacher_id not in teacher_ids:
+                continue
+            # 与 list.index 一致：同一教师被重复填报时取最靠前的志愿
+            edges.setdefault((group_id, teacher_id), [None, rank])
+
+    for teacher_id, group_id, rank in teacher_prefs:
+        if teacher_id not in teacher_ids or group_id not in student_prefs:
+            continue
+        edges.setdefault((group_id, teacher_id), [None, None])[0] = rank
+
+    return edges
+
@@ -0,0 +1,174 @@
+"""
+评分权重的对比模拟。
+
+对同一份志愿数据套用多组评分规则分别运行分配引擎，只返回统计指标，不写数据库。
+各方案在进程池中并行计算，子进程只接收序列化后的得分矩阵，不依赖 Django。
+
+进程池每个工作进程只有一个，首次使用时创建，之后的请求共用，最多 SIMULATION_WORKERS 个子进程。
+子进程以 spawn 方式启动，不会复制 gunicorn 工作进程的数据库连接、锁和线程。
+"""
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .engine import ALGORITHM_MIN_COST_FLOW, assign_groups
+from .matrix import ScoreMatrix
+from .scoring import STUDENT_PREF_SCORES, TEACHER_PREF_SCORES, TEACHER_WEIGHT_MULTIPLIER
+
+MAX_SCENARIOS = 20
+
+# 模拟进程池的子进程数上限
+SIMULATION_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _parse_pref_scores(value, default, field):
+    if value is None:
+        return dict(default)
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f'{field} 必须是非空对象，例如 {{"1": 10, "2": 8}}')
+    scores = {}
+    for rank, score in value.items():
+        try:
+            rank, score = int(rank), float(score)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} 中的志愿序号和分数必须是数字')
+        if rank < 1 or score < 0:
+            raise ValueError(f'{field} 中的志愿序号必须从 1 开始，分数不能为负数')
+        scores[rank] = score
+    return scores
+
+
+def parse_scenario(config, index):
+    """
+    校验一个方案并补全默认值：
+    {'name', 'teacher_weight', 'teacher_pref_scores', 'student_pref_scores'}
+    """
+    if not isinstance(config, dict):
+        raise ValueError(f'第 {index + 1} 个方案格式错误')
+
+    teacher_weight = config.get('teacher_weight', TEACHER_WEIGHT_MULTIPLIER)
+    try:
+        teacher_weight = float(teacher_weight)
+    except (TypeError, ValueError):
+        raise ValueError(f'第 {index + 1} 个方案的 teacher_weight 必须是数字')
+    if teacher_weight < 0:
+        raise ValueError(f'第 {index + 1} 个方案的 teacher_weight 不能为负数')
+
+    return {
+        'name': str(config.get('name') or f'方案{index + 1}'),
+        'teacher_weight': teacher_weight,
+        'teacher_pref_scores': _parse_pref_scores(
+            config.get('teacher_pref_scores'), TEACHER_PREF_SCORES, 'teacher_pref_scores'),
+        'student_pref_scores': _parse_pref_scores(
+            config.get('student_pref_scores'), STUDENT_PREF_SCORES, 'student_pref_scores'),
+    }
+
+
+def assignment_metrics(matrix, results, limit):
+    """
+    统计一次分配结果。志愿命中按原始志愿序号计算，与评分权重无关，便于横向比较。
+    """
+    edge_index = {
+        (matrix.group_ids[r], matrix.teacher_ids[c]): k
+        for k, (r, c) in enumerate(zip(matrix.rows.tolist(), matrix.cols.tolist()))
+    }
+    total_groups = len(matrix.group_ids)
+
+    student_first = teacher_first = preference_matched = over_capacity = 0
+    loads = dict.fromkeys(matrix.teacher_ids, 0)
+    for result in results:
+        loads[result['teacher_id']] += 1
+        if result['score'] > 0:
+            preference_matched += 1
+        if result['explanation'].startswith('超额分配'):
+            over_capacity += 1
+        k = edge_index.get((result['group_id'], result['teacher_id']))
+        if k is not None:
+            student_first += matrix.student_ranks[k] == 1
+            teacher_first += matrix.teacher_ranks[k] == 1
+
+    load_values = np.fromiter(loads.values(), dtype=np.float64, count=len(loads))
+    return {
+        'total_score': round(sum(r['score'] for r in results), 2),
+        'assigned_count': len(results),
+        'unassigned_count': total_groups - len(results),
+        'preference_matched': preference_matched,
+        'random_assigned': len(results) - preference_matched,
+        'over_capacity_assigned': over_capacity,
+        'first_choice_rate': round(int(student_first) / total_groups, 4) if total_groups else 0,
+        'teacher_first_choice_rate': round(int(teacher_first) / total_groups, 4) if total_groups else 0,
+        'teacher_load': {
+            'min': int(load_values.min()) if load_values.size else 0,
+            'max': int(load_values.max()) if load_values.size else 0,
+            'std': round(float(load_values.std()), 4) if load_values.size else 0,
+            'over_limit_teachers': int((load_values > limit).sum()),
+            'idle_teachers': int((load_values == 0).sum()),
+        },
+    }
+
+
+def simulate(matrix_data, scenario, limit, algorithm=ALGORITHM_MIN_COST_FLOW, seed=0):
+    """在子进程中运行单个方案，matrix_data 为 ScoreMatrix.to_bytes() 的结果"""
+    matrix = ScoreMatrix.from_bytes(
+        matrix_data,
+        teacher_pref_scores=scenario['teacher_pref_scores'],
+        student_pref_scores=scenario['student_pref_scores'],
+        teacher_weight=scenario['teacher_weight'],
+    )
+    results = assign_groups(
+        matrix.group_ids, matrix.teacher_ids, matrix.candidates(), limit, algorithm,
+        rng=random.Random(seed)
+    )
+    return {
+        'name': scenario['name'],
+        'weights': {
+            'teacher_weight': scenario['teacher_weight'],
+            'teacher_pref_scores': scenario['teacher_pref_scores'],
+            'student_pref_scores': scenario['student_pref_scores'],
+        },
+        'metrics': assignment_metrics(matrix, results, limit),
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """本进程共用的模拟进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=SIMULATION_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    """子进程异常退出后进程池不可再用，丢弃后下次重新创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def run_scenarios(matrix, scenarios, limit, algorithm=ALGORITHM_MIN_COST_FLOW, seed=0):
+    """并行运行多个方案，结果顺序与 scenarios 一致；各方案使用同一随机种子"""
+    matrix_data = matrix.to_bytes()
+    if len(scenarios) == 1 or SIMULATION_WORKERS <= 1:
+        return [simulate(matrix_data, s, limit, algorithm, seed) for s in scenarios]
+
+    pool = get_pool()
+    try:
+        futures = [pool.submit(simulate, matrix_data, s, limit, algorithm, seed) for s in scenarios]
+        return [f.result() for f in futures]
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return [simulate(matrix_data, s, limit, algorithm, seed) for s in scenarios]
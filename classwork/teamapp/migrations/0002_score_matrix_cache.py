@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('teamapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreMatrixCache',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_matrix_cache', serialize=False, to='adminapp.mutualselectionevent')),
+                ('version', models.PositiveIntegerField(default=0, help_text='失效次数，用于避免写回过期结果')),
+                ('data', models.BinaryField(blank=True, help_text='ScoreMatrix.to_bytes() 的结果', null=True)),
+            ],
+            options={
+                'verbose_name': '得分矩阵缓存',
+                'verbose_name_plural': '得分矩阵缓存',
+                'db_table': 'score_matrix_cache',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('teamapp', '0002_score_matrix_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoAssignJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('algorithm', models.CharField(max_length=20, verbose_name='分配算法')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='pending', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='进度百分比')),
+                ('stage', models.CharField(blank=True, help_text='当前阶段说明', max_length=50)),
+                ('result', models.JSONField(blank=True, help_text='分配完成后的统计信息', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auto_assign_jobs', to='adminapp.mutualselectionevent')),
+            ],
+            options={
+                'verbose_name': '自动分配任务',
+                'verbose_name_plural': '自动分配任务',
+                'db_table': 'auto_assign_job',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='auto_assign_status_8b5541_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('teamapp', '0003_auto_assign_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoAssignResult',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='auto_assign_result', serialize=False, to='adminapp.mutualselectionevent')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('result', models.JSONField(help_text='auto_assign 返回的统计信息')),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '自动分配结果',
+                'verbose_name_plural': '自动分配结果',
+                'db_table': 'auto_assign_result',
+            },
+        ),
+        migrations.AddField(
+            model_name='autoassignjob',
+            name='force',
+            field=models.BooleanField(default=False, help_text='忽略上次结果，强制重新计算'),
+        ),
+        migrations.AddField(
+            model_name='autoassignjob',
+            name='seed',
+            field=models.BigIntegerField(default=0, help_text='随机阶段使用的种子'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    MutualSelectionEvent = apps.get_model('adminapp', 'MutualSelectionEvent')
+    EventDataVersion = apps.get_model('teamapp', 'EventDataVersion')
+    EventDataVersion.objects.bulk_create(
+        [EventDataVersion(event_id=pk) for pk in MutualSelectionEvent.objects.values_list('pk', flat=True)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('teamapp', '0004_auto_assign_result'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDataVersion',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to='adminapp.mutualselectionevent')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '活动数据版本',
+                'verbose_name_plural': '活动数据版本',
+                'db_table': 'event_data_version',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
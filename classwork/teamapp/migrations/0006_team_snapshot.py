@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:30
+
+import django.db.models.deletion
+import teamapp.models
+from django.db import migrations, models
+
+
+def create_snapshots(apps, schema_editor):
+    MutualSelectionEvent = apps.get_model('adminapp', 'MutualSelectionEvent')
+    TeamSnapshot = apps.get_model('teamapp', 'TeamSnapshot')
+    TeamSnapshot.objects.bulk_create(
+        [TeamSnapshot(event_id=pk, version=0, data=b'') for pk in MutualSelectionEvent.objects.values_list('pk', flat=True)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+        ('teamapp', '0005_event_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamSnapshot',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='team_snapshot', serialize=False, to='adminapp.mutualselectionevent')),
+                ('version', models.PositiveBigIntegerField(help_text='生成快照时的活动数据版本号，0 表示尚未生成')),
+                ('data', models.BinaryField(help_text='JSONRenderer 输出的字节内容')),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '团队快照',
+                'verbose_name_plural': '团队快照',
+                'db_table': 'team_snapshot',
+            },
+        ),
+        migrations.AlterField(
+            model_name='eventdataversion',
+            name='version',
+            field=models.PositiveBigIntegerField(default=teamapp.models.initial_data_version),
+        ),
+        migrations.RunPython(create_snapshots, migrations.RunPython.noop),
+    ]
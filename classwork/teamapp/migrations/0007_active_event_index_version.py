@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teamapp', '0006_team_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveEventIndexVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '活动索引版本',
+                'verbose_name_plural': '活动索引版本',
+                'db_table': 'active_event_index_version',
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import time
+
 from django.db import models
 from django.core.exceptions import ValidationError
 
@@ -218,4 +220,166 @@ class ProvisionalAssignment(models.Model):
         unique_together = ('event', 'group')
 
     def __str__(self):
-        return f"{self.event.event_name}: {self.group.group_name} -> {self.teacher.teacher_name}"
\ No newline at end of file
+        return f"{self.event.event_name}: {self.group.group_name} -> {self.teacher.teacher_name}"
+
+
+class ScoreMatrixCache(models.Model):
+    """
+    活动得分矩阵的持久化缓存（压缩后的 NumPy 数组）。
+    志愿发生变化时 version 自增并清空 data，下次读取时重新计算。
+    """
+    event = models.OneToOneField(
+        'adminapp.MutualSelectionEvent',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score_matrix_cache'
+    )
+    version = models.PositiveIntegerField(default=0, help_text="失效次数，用于避免写回过期结果")
+    data = models.BinaryField(null=True, blank=True, help_text="ScoreMatrix.to_bytes() 的结果")
+
+    class Meta:
+        db_table = 'score_matrix_cache'
+        verbose_name = '得分矩阵缓存'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.event_id} (v{self.version})"
+
+
+class AutoAssignJob(models.Model):
+    """
+    后台自动分配任务。
+    管理员提交后由 run_assign_jobs 命令在独立进程中执行，前端轮询进度。
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '排队中'),
+        (STATUS_RUNNING, '执行中'),
+        (STATUS_SUCCEEDED, '已完成'),
+        (STATUS_FAILED, '失败'),
+    ]
+
+    event = models.ForeignKey(
+        'adminapp.MutualSelectionEvent',
+        on_delete=models.CASCADE,
+        related_name='auto_assign_jobs'
+    )
+    algorithm = models.CharField(max_length=20, verbose_name='分配算法')
+    seed = models.BigIntegerField(default=0, help_text="随机阶段使用的种子")
+    force = models.BooleanField(default=False, help_text="忽略上次结果，强制重新计算")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="进度百分比")
+    stage = models.CharField(max_length=50, blank=True, help_text="当前阶段说明")
+    result = models.JSONField(null=True, blank=True, help_text="分配完成后的统计信息")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'auto_assign_job'
+        verbose_name = '自动分配任务'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} #{self.pk} ({self.status})"
+
+
+class AutoAssignResult(models.Model):
+    """
+    最近一次自动分配的输入指纹和统计结果。
+    输入（志愿、教师、名额、算法、种子）不变时直接返回该结果，不再重新分配；
+    手动调整或局部修复后删除。
+    """
+    event = models.OneToOneField(
+        'adminapp.MutualSelectionEvent',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='auto_assign_result'
+    )
+    fingerprint = models.CharField(max_length=64)
+    result = models.JSONField(help_text="auto_assign 返回的统计信息")
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'auto_assign_result'
+        verbose_name = '自动分配结果'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.event_id} ({self.fingerprint[:12]})"
+
+
+def initial_data_version():
+    """以创建时间（微秒）作为初始版本号，活动ID被重用时版本号也不会与已删除的活动重复"""
+    return time.time_ns() // 1000
+
+
+class EventDataVersion(models.Model):
+    """
+    活动数据版本号：团队、成员、教师志愿、临时分配变化时自增（见 versioning.py），
+    用于生成团队相关只读接口的 ETag 和团队快照。
+    """
+    event = models.OneToOneField(
+        'adminapp.MutualSelectionEvent',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='data_version'
+    )
+    version = models.PositiveBigIntegerField(default=initial_data_version)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'event_data_version'
+        verbose_name = '活动数据版本'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.event_id} (v{self.version})"
+
+
+class TeamSnapshot(models.Model):
+    """
+    活动全部团队的 JSON 快照（all-teams 的完整输出），按 EventDataVersion.version 标记。
+    版本号变化后的第一次请求重新生成，其余请求直接返回字节内容。
+    """
+    event = models.OneToOneField(
+        'adminapp.MutualSelectionEvent',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='team_snapshot'
+    )
+    version = models.PositiveBigIntegerField(help_text="生成快照时的活动数据版本号，0 表示尚未生成")
+    data = models.BinaryField(help_text="JSONRenderer 输出的字节内容")
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'team_snapshot'
+        verbose_name = '团队快照'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.event_id} (v{self.version})"
+
+
+class ActiveEventIndexVersion(models.Model):
+    """
+    活动时间索引的版本标记（只有一行）：活动或参与者变化后写入新的随机值（见 active_events.py），
+    各工作进程定期比较该值，变化时重新构建进程内的索引。
+    """
+    token = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'active_event_index_version'
+        verbose_name = '活动索引版本'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return self.token
@@ -1,8 +1,55 @@
+from django.db.models import Case, Count, IntegerField, OuterRef, Prefetch, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
-from .models import Group, GroupMembership, ProvisionalAssignment
+from .models import Group, GroupMembership, ProvisionalAssignment, TeacherGroupPreference
 from studentapp.models import Student
 from teacherapp.models import teacher
 from adminapp.models import MutualSelectionEvent
+from classwork.fieldsets import SparseFieldsetMixin
+
+
+def annotate_member_count(queryset):
+    """
+    附加 member_count 字段（子查询计数）。
+    不用 Count('members') 是因为查询集已按成员过滤时，连接后的计数只剩匹配的成员。
+    """
+    member_count = GroupMembership.objects.filter(group=OuterRef('pk')).values('group').annotate(
+        count=Count('id')
+    ).values('count')
+    return queryset.annotate(
+        member_count=Coalesce(Subquery(member_count, output_field=IntegerField()), 0)
+    )
+
+
+def annotate_teacher_ranks(queryset, current_teacher):
+    """
+    附加教师视角的两个志愿序号（GroupDetailSerializer 中的同名字段）：
+    student_preference_rank 为团队把该教师选为第几志愿，my_preference_rank 为教师给团队的志愿序号。
+    """
+    my_preference = TeacherGroupPreference.objects.filter(
+        teacher=current_teacher,
+        group=OuterRef('pk')
+    ).values('preference_rank')[:1]
+    return queryset.annotate(
+        student_preference_rank=Case(
+            When(preferred_advisor_1=current_teacher, then=Value(1)),
+            When(preferred_advisor_2=current_teacher, then=Value(2)),
+            When(preferred_advisor_3=current_teacher, then=Value(3)),
+            default=Value(None),
+            output_field=IntegerField(null=True)
+        ),
+        my_preference_rank=Subquery(my_preference, output_field=IntegerField(null=True))
+    )
+
+
+def _member_count(obj):
+    """优先使用注解或预取的成员，避免每个团队一次 COUNT 查询"""
+    annotated = getattr(obj, 'member_count', None)
+    if annotated is not None:
+        return annotated
+    if 'members' in getattr(obj, '_prefetched_objects_cache', {}):
+        return len(obj.members.all())
+    return obj.members.count()
 
 
 # --- 用于嵌套显示的简化序列化器 ---
@@ -29,7 +76,7 @@ class TeamMemberSerializer(serializers.ModelSerializer):
         return hasattr(obj, 'led_group') and obj.led_group is not None
 
 
-class TeamAdvisorSerializer(serializers.ModelSerializer):
+class TeamAdvisorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """用于显示导师信息的简化序列化器"""
 
     class Meta:
@@ -45,7 +92,7 @@ class TeamAdvisorSerializer(serializers.ModelSerializer):
         ]
 
 
-class AvailableTeammateSerializer(serializers.ModelSerializer):
+class AvailableTeammateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """用于显示当前活动中、尚未组队的学生列表"""
     major_name = serializers.CharField(source='major.major_name', read_only=True)
 
@@ -56,7 +103,7 @@ class AvailableTeammateSerializer(serializers.ModelSerializer):
 
 # --- 核心的团队信息序列化器 ---
 
-class GroupDetailSerializer(serializers.ModelSerializer):
+class GroupDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """用于显示团队完整信息的序列化器"""
     captain = TeamMemberSerializer(read_only=True)
     members = serializers.SerializerMethodField()
@@ -65,7 +112,7 @@ class GroupDetailSerializer(serializers.ModelSerializer):
     preferred_advisor_2 = TeamAdvisorSerializer(read_only=True)
     preferred_advisor_3 = TeamAdvisorSerializer(read_only=True)
     event_name = serializers.CharField(source='event.event_name', read_only=True)
-    event_id = serializers.IntegerField(source='event.event_id', read_only=True)
+    event_id = serializers.IntegerField(read_only=True)
     member_count = serializers.SerializerMethodField()
     group_member_limit = serializers.IntegerField(source='event.group_member_limit', read_only=True)  # 添加团队人数上限字段
 
@@ -86,9 +133,45 @@ class GroupDetailSerializer(serializers.ModelSerializer):
             'my_preference_rank',
             'group_member_limit'
         ]
+        expandable_fields = (
+            'captain', 'members',
+            'advisor', 'preferred_advisor_1', 'preferred_advisor_2', 'preferred_advisor_3',
+        )
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix='', fields=None):
+        """
+        一次性取出序列化需要的关联数据，序列化 N 个团队的查询数与 N 无关。
+        prefix 用于从其他模型关联过来的查询集，例如 ProvisionalAssignment 传入 'group__'。
+        fields 为 selected_fields 的结果，只加载这些字段用到的关联；None 表示全部。
+        """
+        def wanted(name):
+            return fields is None or name in fields
+
+        related = [
+            path for name, path in (
+                ('event_name', 'event'), ('group_member_limit', 'event'),
+                ('captain', 'captain__major'), ('advisor', 'advisor'),
+                ('preferred_advisor_1', 'preferred_advisor_1'),
+                ('preferred_advisor_2', 'preferred_advisor_2'),
+                ('preferred_advisor_3', 'preferred_advisor_3'),
+            ) if wanted(name)
+        ]
+        if related:
+            queryset = queryset.select_related(*{prefix + path for path in related})
+        if wanted('members'):
+            return queryset.prefetch_related(
+                Prefetch(prefix + 'members', queryset=Student.objects.select_related('major').order_by('stu_id'))
+            )
+        if wanted('member_count') and not prefix:
+            return annotate_member_count(queryset)
+        return queryset
 
     def get_members(self, obj):
-        members = obj.members.select_related('major').all()
+        if 'members' in getattr(obj, '_prefetched_objects_cache', {}):
+            members = obj.members.all()
+        else:
+            members = obj.members.select_related('major').all()
         # 传递团队信息到上下文，用于判断队长
         return TeamMemberSerializer(
             members,
@@ -97,7 +180,7 @@ class GroupDetailSerializer(serializers.ModelSerializer):
         ).data
 
     def get_member_count(self, obj):
-        return obj.members.count()
+        return _member_count(obj)
 
     def get_project_description_short(self, obj):
         if obj.project_description:
@@ -196,13 +279,13 @@ class TeacherPreferenceSerializer(serializers.Serializer):
 
 
 
-class ProvisionalAssignmentSerializer(serializers.ModelSerializer):
+class ProvisionalAssignmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     临时分配序列化器
     """
     group = GroupDetailSerializer(read_only=True)
     teacher = TeamAdvisorSerializer(read_only=True)
-    event_id = serializers.IntegerField(source='event.event_id', read_only=True)
+    event_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ProvisionalAssignment
@@ -215,6 +298,7 @@ class ProvisionalAssignmentSerializer(serializers.ModelSerializer):
             'score',
             'explanation'
         ]
+        expandable_fields = ('group', 'teacher')
 
 
 class GroupListSerializer(serializers.ModelSerializer):
@@ -225,7 +309,7 @@ class GroupListSerializer(serializers.ModelSerializer):
     captain_name = serializers.CharField(source='captain.stu_name', read_only=True)
     advisor_name = serializers.CharField(source='advisor.teacher_name', read_only=True)
     event_name = serializers.CharField(source='event.event_name', read_only=True)
-    member_count = serializers.IntegerField(source='members.count', read_only=True)
+    member_count = serializers.SerializerMethodField()
     project_description_short = serializers.SerializerMethodField()
 
     class Meta:
@@ -236,6 +320,13 @@ class GroupListSerializer(serializers.ModelSerializer):
             'event_name', 'captain_name', 'advisor_name', 'member_count'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return annotate_member_count(queryset.select_related('captain', 'advisor', 'event'))
+
+    def get_member_count(self, obj):
+        return _member_count(obj)
+
     def get_project_description_short(self, obj):
         """项目简介截取"""
         if obj.project_description:
@@ -251,7 +342,7 @@ class AdvisedGroupSummarySerializer(serializers.ModelSerializer):
     教师查看自己指导团队的摘要信息
     """
     captain = TeamMemberSerializer(read_only=True)
-    member_count = serializers.IntegerField(source='members.count', read_only=True)
+    member_count = serializers.SerializerMethodField()
     event_name = serializers.CharField(source='event.event_name', read_only=True)
     event_id = serializers.IntegerField(source='event.event_id', read_only=True)
     project_description_short = serializers.SerializerMethodField()
@@ -266,6 +357,13 @@ class AdvisedGroupSummarySerializer(serializers.ModelSerializer):
             'group_member_limit'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return annotate_member_count(queryset.select_related('captain__major', 'event'))
+
+    def get_member_count(self, obj):
+        return _member_count(obj)
+
     def get_project_description_short(self, obj):
         if obj.project_description:
             desc = obj.project_description
@@ -0,0 +1,140 @@
+"""
+志愿相关数据变化时，使活动的得分矩阵缓存失效；团队相关数据变化时，使活动的数据版本号自增。
+
+bulk_create / QuerySet.update 不会触发这些信号，相应的视图中需要手动调用
+invalidate_score_matrix / bump_event_version。
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from adminapp.models import MutualSelectionEvent
+from teacherapp.models import teacher
+
+from .matching.loader import invalidate_score_matrix
+from studentapp.models import Student
+
+from .models import (
+    EventDataVersion, Group, GroupMembership, ProvisionalAssignment, TeacherGroupPreference, TeamSnapshot,
+)
+from .active_events import active_events_changed
+from .snapshots import forget_team_snapshot
+from .versioning import bump_event_version
+
+# 只改这些字段时（登录、改密码）不影响团队数据的输出
+PRIVATE_FIELDS = frozenset({'last_login', 'password'})
+
+# 影响得分矩阵的团队字段；只改名称、简介、成员等时保留缓存
+SCORE_FIELDS = ('event', 'preferred_advisor_1', 'preferred_advisor_2', 'preferred_advisor_3', 'advisor')
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    # 记录加载时的值；从 __dict__ 读取，延迟加载的字段不会触发查询
+    instance._score_values = {name: instance.__dict__.get(f'{name}_id') for name in SCORE_FIELDS}
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, update_fields=None, **kwargs):
+    previous = instance._score_values
+    saved = {
+        name: instance.__dict__.get(f'{name}_id') for name in SCORE_FIELDS
+        if created or update_fields is None or name in update_fields
+    }
+    if created or any(previous[name] != value for name, value in saved.items()):
+        invalidate_score_matrix({instance.event_id, previous['event']} - {None})
+    instance._score_values = {**previous, **saved}
+    bump_event_version(instance.event_id)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_score_matrix(instance.event_id)
+    bump_event_version(instance.event_id)
+
+
+@receiver([post_save, post_delete], sender=TeacherGroupPreference)
+def teacher_preference_changed(sender, instance, **kwargs):
+    event_id = Group.objects.filter(pk=instance.group_id).values_list('event_id', flat=True).first()
+    if event_id is not None:
+        invalidate_score_matrix(event_id)
+        bump_event_version(event_id)
+
+
+@receiver([post_save, post_delete], sender=GroupMembership)
+def membership_changed(sender, instance, **kwargs):
+    bump_event_version(group_ids=[instance.group_id])
+
+
+@receiver([post_save, post_delete], sender=ProvisionalAssignment)
+def provisional_assignment_changed(sender, instance, **kwargs):
+    bump_event_version(instance.event_id)
+
+
+@receiver(post_save, sender=MutualSelectionEvent)
+def event_saved(sender, instance, created, **kwargs):
+    active_events_changed([instance.pk])
+    if created:
+        EventDataVersion.objects.get_or_create(event=instance)
+        TeamSnapshot.objects.get_or_create(event=instance, defaults={'version': 0, 'data': b''})
+    else:
+        # 活动名称、时间等也会出现在 dashboard 的输出中
+        bump_event_version(instance.pk)
+
+
+@receiver(post_delete, sender=MutualSelectionEvent)
+def event_deleted(sender, instance, **kwargs):
+    active_events_changed([instance.pk])
+    forget_team_snapshot(instance.pk)
+
+
+def participants_changed(instance, reverse, pk_set, kind):
+    """参与者变化时更新活动时间索引：正向为活动，反向为学生/教师（clear 时 pk_set 为空，按参与者重新读取）"""
+    if not reverse:
+        active_events_changed([instance.pk])
+    elif pk_set:
+        active_events_changed(pk_set)
+    else:
+        active_events_changed(**{kind: [instance.pk]})
+
+
+@receiver(m2m_changed, sender=MutualSelectionEvent.students.through)
+def event_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    participants_changed(instance, reverse, pk_set, 'students')
+    if not reverse:
+        bump_event_version(instance.pk)
+    elif pk_set:
+        bump_event_version(pk_set)
+
+
+@receiver(m2m_changed, sender=MutualSelectionEvent.teachers.through)
+def event_teachers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    participants_changed(instance, reverse, pk_set, 'teachers')
+    if not reverse:
+        invalidate_score_matrix(instance.pk)
+        bump_event_version(instance.pk)
+    elif pk_set:
+        invalidate_score_matrix(pk_set)
+        bump_event_version(pk_set)
+    else:
+        # 反向 clear 时 pk_set 为空，此前的关联已无法查询，全部失效
+        event_ids = list(MutualSelectionEvent.objects.values_list('pk', flat=True))
+        invalidate_score_matrix(event_ids)
+        bump_event_version(event_ids)
+
+
+@receiver(pre_delete, sender=teacher)
+def teacher_deleted(sender, instance, **kwargs):
+    invalidate_score_matrix(instance.mutual_selection_events.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=teacher)
+def profile_saved(sender, instance, created, update_fields=None, **kwargs):
+    """学生、教师资料出现在团队数据中（队长、成员、导师），修改后使其参与的活动版本号自增"""
+    if created or update_fields and PRIVATE_FIELDS.issuperset(update_fields):
+        return
+    bump_event_version(instance.mutual_selection_events.values_list('pk', flat=True))
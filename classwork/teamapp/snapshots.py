@@ -0,0 +1,86 @@
+"""
+活动团队快照：all-teams 对同一活动的所有学生输出相同的内容，预先渲染成 JSON 字节；
+教师 dashboard 在同一份团队数据上合并各自的志愿序号。
+
+两级缓存，都以 EventDataVersion.version 为准：
+- 进程内：{event_id: TeamSnapshotEntry}，同一进程内并发请求只生成一次（按活动 ID 取模分段加锁，锁的数量固定）；
+- 数据库：TeamSnapshot，多个工作进程共享，新进程读取一次即可。
+版本号变化后的第一次请求重新生成；写回时只覆盖更旧的快照。
+"""
+import json
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from .fast_serializers import serialize_groups
+from .models import Group, TeamSnapshot
+
+# 分段锁：不同活动可能共用一把锁，只是偶尔多等一次生成，锁不会随活动数增长
+LOCK_STRIPES = 64
+
+_snapshots = {}
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+class TeamSnapshotEntry:
+    """进程内的快照：JSON 字节，以及按需解析的团队列表（所有请求共享，只读）"""
+
+    def __init__(self, version, data, groups=None):
+        self.version = version
+        self.data = data
+        self._groups = groups
+
+    @property
+    def groups(self):
+        if self._groups is None:
+            self._groups = json.loads(self.data)
+        return self._groups
+
+
+def _lock_for(event_id):
+    return _locks[event_id % LOCK_STRIPES]
+
+
+def _store(event_id, version, data):
+    """快照行在创建活动时一并创建（signals.event_saved），这里只覆盖更旧的快照"""
+    TeamSnapshot.objects.filter(event_id=event_id, version__lt=version).update(version=version, data=data)
+
+
+def forget_team_snapshot(event_id):
+    """活动删除后释放进程内的快照"""
+    _snapshots.pop(event_id, None)
+
+
+def _get_entry(event_id, version):
+    """
+    version 必须在读取团队数据之前获取（versioning.get_event_version），快照内容只会比版本号新。
+    """
+    entry = _snapshots.get(event_id)
+    if entry is not None and entry.version == version:
+        return entry
+
+    with _lock_for(event_id):
+        entry = _snapshots.get(event_id)
+        if entry is not None and entry.version == version:
+            return entry
+
+        row = TeamSnapshot.objects.filter(event_id=event_id, version=version).values_list('data', flat=True).first()
+        if row is not None:
+            entry = TeamSnapshotEntry(version, bytes(row))
+        else:
+            # 完整输出（与 GroupDetailSerializer 一致，按 group_id 排序）
+            groups = serialize_groups(Group.objects.filter(event_id=event_id).order_by('group_id'))
+            entry = TeamSnapshotEntry(version, JSONRenderer().render(groups), groups)
+            _store(event_id, version, entry.data)
+        _snapshots[event_id] = entry
+        return entry
+
+
+def get_team_snapshot(event_id, version):
+    """返回版本号为 version 的团队快照字节"""
+    return _get_entry(event_id, version).data
+
+
+def get_team_payload(event_id, version):
+    """返回版本号为 version 的团队列表；各请求共享同一份对象，调用方不能修改"""
+    return _get_entry(event_id, version).groups
@@ -1,3 +1,1458 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import os
+import random
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from adminapp.models import AdminUser, MutualSelectionEvent
+from adminapp.serializers import StudentListSerializer
+from classwork import streaming
+from classwork.principals import get_principal, principal_token
+from studentapp.models import Major, Student
+from teacherapp.models import teacher
+
+from . import active_events
+from .active_events import (
+    active_event_for_student, active_event_for_teacher, dashboard_event_for_student, reset_active_events,
+)
+from .assignment import (
+    claim_next_job, clear_auto_assign_result, enqueue_auto_assign, execute_job, requeue_stale_jobs, run_auto_assign,
+    run_repair,
+)
+from .fast_serializers import merge_teacher_ranks, serialize_available_teammates, serialize_groups
+from .matching import (
+    ALGORITHM_GREEDY, ALGORITHM_MIN_COST_FLOW, STUDENT_PREF_SCORES, TEACHER_PREF_SCORES, TEACHER_WEIGHT_MULTIPLIER,
+    MinCostFlow, ScoreMatrix, assign_groups, match_by_preference,
+)
+from .matching.engine import SCORE_SCALE
+from .matching.loader import get_score_matrix, load_score_matrix
+from .matching.repair import repair_scope
+from .matching import simulation
+from .models import (
+    ActiveEventIndexVersion, AutoAssignJob, AutoAssignResult, Group, GroupMembership, ProvisionalAssignment,
+    ScoreMatrixCache, TeacherGroupPreference,
+)
+from .serializers import (
+    AvailableTeammateSerializer, GroupDetailSerializer, annotate_member_count, annotate_teacher_ranks,
+)
+from .snapshots import LOCK_STRIPES, _lock_for, _locks
+
+
+def warm_active_events(test):
+    """按本测试的数据构建活动时间索引，测试期间不再检查版本标记（计数查询时不受干扰）"""
+    reset_active_events()
+    active_events.get_index()
+    patcher = mock.patch.object(active_events, 'CHECK_INTERVAL', 3600)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class GroupSerializerQueryCountTests(TestCase):
+    """序列化 N 个团队的查询数不随 N 增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = MutualSelectionEvent.objects.create(
+            event_name='测试活动',
+            stu_start_time=now - timedelta(days=1),
+            stu_end_time=now + timedelta(days=1),
+            tea_start_time=now - timedelta(days=1),
+            tea_end_time=now + timedelta(days=1),
+            teacher_choice_limit=5,
+            group_member_limit=5,
+        )
+        cls.major = Major.objects.create(major_name='计算机')
+        cls.teachers = [
+            teacher.objects.create(teacher_no=f'T{i}', teacher_name=f'教师{i}')
+            for i in range(3)
+        ]
+        cls.event.teachers.set(cls.teachers)
+        cls.viewer = Student.objects.create(stu_no='viewer', stu_name='查看者', grade='2025', major=cls.major)
+        cls.event.students.add(cls.viewer)
+        cls.admin = AdminUser.objects.create(admin_name='admin', admin_username='admin', admin_password='!')
+        cls.group_count = 0
+
+    def setUp(self):
+        warm_active_events(self)
+
+    def add_groups(self, count, members_per_group=3):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_groups(count, members_per_group)
+
+    def _add_groups(self, count, members_per_group):
+        for _ in range(count):
+            n = self.__class__.group_count = self.__class__.group_count + 1
+            members = [
+                Student.objects.create(stu_no=f'S{n}-{m}', stu_name=f'学生{n}-{m}', grade='2025', major=self.major)
+                for m in range(members_per_group)
+            ]
+            self.event.students.add(*members)
+            group = Group.objects.create(
+                event=self.event,
+                group_name=f'团队{n}',
+                captain=members[0],
+                advisor=self.teachers[0],
+                preferred_advisor_1=self.teachers[0],
+                preferred_advisor_2=self.teachers[1],
+                preferred_advisor_3=self.teachers[2],
+            )
+            for member in members:
+                GroupMembership.objects.create(group=group, student=member)
+            TeacherGroupPreference.objects.create(teacher=self.teachers[0], group=group, preference_rank=n)
+            ProvisionalAssignment.objects.create(event=self.event, group=group, teacher=self.teachers[0])
+
+    def count_queries(self, fn):
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        return len(ctx)
+
+    def assert_constant_queries(self, fn):
+        self.add_groups(2)
+        small = self.count_queries(fn)
+        self.add_groups(6)
+        large = self.count_queries(fn)
+        self.assertEqual(small, large)
+        return large
+
+    def admin_client(self):
+        refresh = RefreshToken()
+        refresh['user_id'] = self.admin.admin_id
+        refresh['user_type'] = 'admin'
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        get_principal('admin', self.admin.admin_id)  # 预热认证用户缓存
+        return client
+
+    def test_group_detail_serializer(self):
+        def serialize():
+            queryset = GroupDetailSerializer.setup_eager_loading(Group.objects.filter(event=self.event))
+            data = GroupDetailSerializer(queryset, many=True).data
+            self.assertTrue(all(len(group['members']) == 3 for group in data))
+            self.assertTrue(all(group['member_count'] == 3 for group in data))
+            self.assertTrue(all(group['members'][0]['major_name'] == '计算机' for group in data))
+
+        self.assert_constant_queries(serialize)
+        # 团队（连同活动、队长、导师）一次，成员及专业一次
+        self.assertNumQueries(2, serialize)
+
+    def test_member_count_not_limited_by_member_filter(self):
+        self.add_groups(1)
+        member = GroupMembership.objects.first().student
+        group = annotate_member_count(Group.objects.filter(members=member)).get()
+        self.assertEqual(group.member_count, 3)
+
+    def test_all_teams(self):
+        client = APIClient()
+        client.force_authenticate(user=self.viewer)
+
+        def request():
+            response = client.get('/api/teams/all-teams/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assert_constant_queries(request)
+
+    def test_teacher_dashboard(self):
+        client = APIClient()
+        client.force_authenticate(user=self.teachers[0])
+
+        def request():
+            response = client.get('/api/teams/teacher/dashboard/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assert_constant_queries(request)
+
+    def test_teacher_history_detail(self):
+        client = APIClient()
+        client.force_authenticate(user=self.teachers[0])
+
+        def request():
+            response = client.get(f'/api/teams/{self.event.pk}/teacher/history-detail/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assert_constant_queries(request)
+
+    def test_admin_management_info(self):
+        client = self.admin_client()
+
+        def request():
+            response = client.get(f'/api/teams/{self.event.pk}/admin/management-info/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assert_constant_queries(request)
+
+    def test_admin_get_assignments(self):
+        client = self.admin_client()
+
+        def request():
+            response = client.get(f'/api/teams/{self.event.pk}/admin/get-assignments/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assert_constant_queries(request)
+
+    def test_sparse_fieldset_skips_unrequested_relations(self):
+        self.add_groups(2)
+        client = APIClient()
+        client.force_authenticate(user=self.viewer)
+
+        # 不带参数时返回快照，这里展开全部关联以实时生成完整输出作对比
+        expand_all = 'captain,members,advisor,preferred_advisor_1,preferred_advisor_2,preferred_advisor_3'
+        full = self.count_queries(lambda: client.get(f'/api/teams/all-teams/?expand={expand_all}'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/teams/all-teams/?fields=group_id,member_count')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {'group_id', 'member_count'})
+        self.assertEqual(response.json()[0]['member_count'], 3)
+        # 不查询成员和教师，member_count 改用子查询注解
+        self.assertLess(len(ctx), full)
+
+        response = client.get('/api/teams/all-teams/?fields=group_id&expand=captain')
+        self.assertEqual(set(response.json()[0]), {'group_id', 'captain'})
+
+
+class FastSerializerParityTests(TestCase):
+    """values() 快速序列化与 DRF 序列化器的输出逐字节一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = MutualSelectionEvent.objects.create(
+            event_name='对比活动',
+            stu_start_time=now - timedelta(days=1),
+            stu_end_time=now + timedelta(days=1),
+            tea_start_time=now - timedelta(days=1),
+            tea_end_time=now + timedelta(days=1),
+            teacher_choice_limit=3,
+            group_member_limit=4,
+        )
+        major = Major.objects.create(major_name='软件工程')
+        cls.teachers = [
+            teacher.objects.create(teacher_no='P0', teacher_name='教师甲', phone='123', research_direction='图形学'),
+            teacher.objects.create(teacher_no='P1', teacher_name='教师乙', introduction='简介'),
+        ]
+        cls.event.teachers.set(cls.teachers)
+
+        def student(no, **extra):
+            s = Student.objects.create(stu_no=no, stu_name=f'学生{no}', grade='2024', **extra)
+            cls.event.students.add(s)
+            return s
+
+        # 成员乱序加入、专业为空、队长不是成员、没有队长、没有导师、长简介
+        a1, a2, a3 = student('A3', major=major), student('A1', email='a@x.cn'), student('A2', major=major)
+        full = Group.objects.create(
+            event=cls.event, group_name='完整', project_title='标题', project_description='长' * 120,
+            captain=a2, advisor=cls.teachers[0], preferred_advisor_1=cls.teachers[1],
+            preferred_advisor_2=cls.teachers[0],
+        )
+        for s in (a3, a1, a2):
+            GroupMembership.objects.create(group=full, student=s)
+
+        b1, outsider = student('B1', internship_location='上海'), student('B0')
+        odd = Group.objects.create(event=cls.event, group_name='队长不在成员中', captain=outsider,
+                                   project_description='短简介')
+        GroupMembership.objects.create(group=odd, student=b1)
+
+        Group.objects.create(event=cls.event, group_name='空团队')
+        TeacherGroupPreference.objects.create(teacher=cls.teachers[0], group=full, preference_rank=1)
+
+        cls.free = [student('C2', major=major), student('C1')]
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def request(self, query=''):
+        return Request(APIRequestFactory().get('/' + query))
+
+    def groups(self):
+        return Group.objects.filter(event=self.event).order_by('group_id')
+
+    def assert_groups_match(self, queryset, query=''):
+        request = self.request(query)
+        expected = GroupDetailSerializer(
+            GroupDetailSerializer.setup_eager_loading(queryset), many=True, context={'request': request}
+        ).data
+        actual = serialize_groups(queryset, GroupDetailSerializer.selected_fields(request))
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_groups(self):
+        self.assert_groups_match(self.groups())
+
+    def test_groups_with_teacher_ranks(self):
+        queryset = annotate_teacher_ranks(self.groups(), self.teachers[0])
+        self.assert_groups_match(queryset)
+
+    def test_merge_teacher_ranks(self):
+        shared = serialize_groups(self.groups())
+        for current in self.teachers:
+            my_ranks = dict(
+                TeacherGroupPreference.objects.filter(teacher=current).values_list('group_id', 'preference_rank')
+            )
+            for query in ('', '?fields=group_id,my_preference_rank,student_preference_rank'):
+                with self.subTest(teacher=current.pk, query=query):
+                    request = self.request(query)
+                    queryset = annotate_teacher_ranks(self.groups(), current)
+                    expected = GroupDetailSerializer(
+                        GroupDetailSerializer.setup_eager_loading(queryset), many=True, context={'request': request}
+                    ).data
+                    actual = merge_teacher_ranks(shared, current.pk, my_ranks, GroupDetailSerializer.selected_fields(request))
+                    self.assertEqual(self.render(actual), self.render(expected))
+        # 共享的团队数据未被修改
+        self.assertEqual(shared, serialize_groups(self.groups()))
+
+    def test_groups_sparse_fieldsets(self):
+        for query in ('?fields=group_id,member_count', '?expand=captain', '?fields=group_id&expand=members,advisor',
+                      '?fields=event_name,captain,project_description_short'):
+            with self.subTest(query=query):
+                self.assert_groups_match(self.groups(), query)
+
+    def test_available_teammates(self):
+        queryset = Student.objects.filter(pk__in=[s.pk for s in self.free]).order_by('stu_id')
+        for query in ('', '?fields=stu_id,major_name'):
+            with self.subTest(query=query):
+                request = self.request(query)
+                expected = AvailableTeammateSerializer(queryset, many=True, context={'request': request}).data
+                actual = serialize_available_teammates(queryset, AvailableTeammateSerializer.selected_fields(request))
+                self.assertEqual(self.render(actual), self.render(expected))
+
+
+class EventVersionETagTests(TestCase):
+    """团队数据变化后版本号自增；If-None-Match 命中时返回 304，不再查询团队数据"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = MutualSelectionEvent.objects.create(
+            event_name='版本活动',
+            stu_start_time=now - timedelta(days=1),
+            stu_end_time=now + timedelta(days=1),
+            tea_start_time=now - timedelta(days=1),
+            tea_end_time=now + timedelta(days=1),
+            teacher_choice_limit=3,
+            group_member_limit=4,
+        )
+        cls.teacher = teacher.objects.create(teacher_no='V0', teacher_name='教师')
+        cls.event.teachers.add(cls.teacher)
+        cls.captain = Student.objects.create(stu_no='V1', stu_name='队长', grade='2024')
+        cls.other = Student.objects.create(stu_no='V2', stu_name='队员', grade='2024')
+        cls.event.students.add(cls.captain, cls.other)
+        cls.group = Group.objects.create(event=cls.event, group_name='团队', captain=cls.captain)
+        GroupMembership.objects.create(group=cls.group, student=cls.captain)
+
+    def setUp(self):
+        warm_active_events(self)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_not_modified_until_data_changes(self):
+        for user, url in ((self.captain, '/api/teams/dashboard/'), (self.captain, '/api/teams/all-teams/'),
+                          (self.teacher, '/api/teams/teacher/dashboard/')):
+            with self.subTest(url=url):
+                client = self.client_for(user)
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                # 当前活动来自进程内索引，只查询版本号
+                self.assertEqual(len(ctx), 1)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    membership = GroupMembership.objects.create(group=self.group, student=self.other)
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    membership.delete()
+
+    def test_etag_depends_on_query(self):
+        client = self.client_for(self.captain)
+        etag = client.get('/api/teams/all-teams/')['ETag']
+        response = client.get('/api/teams/all-teams/?fields=group_id', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_all_teams_snapshot(self):
+        def expected():
+            queryset = GroupDetailSerializer.setup_eager_loading(Group.objects.filter(event=self.event))
+            return JSONRenderer().render(GroupDetailSerializer(queryset.order_by('group_id'), many=True).data)
+
+        response = self.client_for(self.captain).get('/api/teams/all-teams/')
+        self.assertEqual(response.content, expected())
+
+        # 其他学生直接复用快照：只查询版本号
+        client = self.client_for(self.other)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/teams/all-teams/').content, response.content)
+        self.assertEqual(len(ctx), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupMembership.objects.create(group=self.group, student=self.other)
+        self.assertEqual(client.get('/api/teams/all-teams/').content, expected())
+
+    def test_snapshot_locks_are_bounded(self):
+        # 锁的数量固定，不随活动数增长；同一活动总是取到同一把锁
+        locks = {id(_lock_for(event_id)) for event_id in range(1, 1000)}
+        self.assertEqual(len(locks), LOCK_STRIPES)
+        self.assertEqual(len(_locks), LOCK_STRIPES)
+        self.assertIs(_lock_for(self.event.pk), _lock_for(self.event.pk))
+        self.assertIs(_lock_for(1), _lock_for(1 + LOCK_STRIPES))
+
+
+class StudentBootstrapTests(TestCase):
+    """bootstrap 的各部分与对应接口的输出一致，查询数不随团队数增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = MutualSelectionEvent.objects.create(
+            event_name='首屏活动',
+            stu_start_time=now - timedelta(days=1),
+            stu_end_time=now + timedelta(days=1),
+            tea_start_time=now - timedelta(days=1),
+            tea_end_time=now + timedelta(days=1),
+            teacher_choice_limit=3,
+            group_member_limit=4,
+        )
+        major = Major.objects.create(major_name='网络工程')
+        cls.teachers = [teacher.objects.create(teacher_no=f'B{i}', teacher_name=f'教师{i}') for i in range(2)]
+        cls.event.teachers.set(cls.teachers)
+        cls.student = Student.objects.create(stu_no='ME', stu_name='我', grade='2024', major=major)
+        cls.event.students.add(cls.student)
+        cls.count = 0
+
+    def setUp(self):
+        warm_active_events(self)
+
+    def add_groups(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                n = self.__class__.count = self.__class__.count + 1
+                members = [Student.objects.create(stu_no=f'BS{n}-{m}', stu_name=f'学生{n}', grade='2024')
+                           for m in range(2)]
+                self.event.students.add(*members)
+                group = Group.objects.create(event=self.event, group_name=f'团队{n}', captain=members[0],
+                                             preferred_advisor_1=self.teachers[n % 2])
+                for member in members:
+                    GroupMembership.objects.create(group=group, student=member)
+                self.event.students.add(Student.objects.create(stu_no=f'BF{n}', stu_name='未组队', grade='2024'))
+
+    def student_client(self):
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+        return client
+
+    def test_sections_match_endpoints(self):
+        self.add_groups(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            group = Group.objects.create(event=self.event, group_name='我的团队', captain=self.student)
+            GroupMembership.objects.create(group=group, student=self.student)
+
+        client = self.student_client()
+        data = client.get('/api/teams/student/bootstrap/').json()
+        endpoints = {
+            'dashboard': '/api/teams/dashboard/',
+            'all_teams': '/api/teams/all-teams/',
+            'available_teachers': '/api/teams/available-teachers/',
+            'available_teammates': '/api/teams/available-teammates/',
+            'profile': '/api/student/profile/',
+        }
+        self.assertEqual(list(data), list(endpoints))
+        for name, url in endpoints.items():
+            with self.subTest(section=name):
+                self.assertEqual(data[name], client.get(url).json())
+        self.assertTrue(data['dashboard']['is_captain'])
+
+        response = client.get('/api/teams/student/bootstrap/?sections=profile,dashboard')
+        self.assertEqual(list(response.json()), ['profile', 'dashboard'])
+        response = client.get('/api/teams/student/bootstrap/?sections=unknown')
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_budget(self):
+        client = self.student_client()
+
+        def count():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(client.get('/api/teams/student/bootstrap/').status_code, 200)
+            return len(ctx)
+
+        self.add_groups(2)
+        small = count()
+        self.add_groups(6)
+        self.assertEqual(count(), small)
+
+
+class ActiveEventIndexTests(TestCase):
+    """进程内索引的查找结果与原来的时间范围查询一致，参与者变化后立即生效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = now = timezone.now()
+        day = timedelta(days=1)
+
+        def event(name, stu_start, stu_end, tea_start, tea_end):
+            return MutualSelectionEvent.objects.create(
+                event_name=name, stu_start_time=now + stu_start * day, stu_end_time=now + stu_end * day,
+                tea_start_time=now + tea_start * day, tea_end_time=now + tea_end * day,
+                teacher_choice_limit=3, group_member_limit=4,
+            )
+
+        cls.events = [
+            event('学生阶段', -1, 1, 1, 2),
+            event('教师阶段', -3, -2, -1, 1),
+            event('已结束', -5, -4, -3, -2),
+        ]
+        cls.student = Student.objects.create(stu_no='IDX', stu_name='学生', grade='2024')
+        cls.teacher = teacher.objects.create(teacher_no='IDX', teacher_name='教师')
+        for e in cls.events:
+            e.students.add(cls.student)
+            e.teachers.add(cls.teacher)
+
+    def setUp(self):
+        reset_active_events()
+
+    def expected(self, filters):
+        return MutualSelectionEvent.objects.filter(**filters).order_by('event_id').first()
+
+    def test_matches_queries(self):
+        day = timedelta(days=1)
+        active_event_for_student(self.student.pk)  # 构建索引
+        for now in (self.now, self.now + 0.5 * day, self.now + 1.5 * day, self.now + 3 * day):
+            with self.subTest(now=now):
+                with self.assertNumQueries(0):
+                    student_event = active_event_for_student(self.student.pk, now)
+                    dashboard_event = dashboard_event_for_student(self.student.pk, now)
+                    teacher_event = active_event_for_teacher(self.teacher.pk, now)
+                self.assertEqual(student_event, self.expected(
+                    {'students': self.student, 'stu_start_time__lte': now, 'stu_end_time__gte': now}))
+                self.assertEqual(dashboard_event, self.expected(
+                    {'students': self.student, 'stu_start_time__lte': now, 'tea_end_time__gte': now}))
+                self.assertEqual(teacher_event, self.expected(
+                    {'teachers': self.teacher, 'tea_start_time__lte': now, 'tea_end_time__gte': now}))
+
+    def test_participant_changes(self):
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+        index = active_events._index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.events[0].students.remove(self.student)
+        self.assertIsNone(active_event_for_student(self.student.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.mutual_selection_events.add(self.events[0])
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.mutual_selection_events.clear()
+        self.assertIsNone(active_event_for_teacher(self.teacher.pk))
+        # 只更新受影响的部分，没有重建索引
+        self.assertIs(active_events._index, index)
+
+    def test_event_changes(self):
+        self.assertEqual(active_event_for_teacher(self.teacher.pk), self.events[1])
+        index = active_events._index
+        event = self.events[1]
+        event.tea_end_time = self.now - timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertIsNone(active_event_for_teacher(self.teacher.pk))
+
+        now = timezone.now()
+        created = MutualSelectionEvent.objects.create(
+            event_name='新活动', stu_start_time=now, stu_end_time=now, tea_start_time=now - timedelta(hours=1),
+            tea_end_time=now + timedelta(hours=1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            created.teachers.add(self.teacher)
+        self.assertEqual(active_event_for_teacher(self.teacher.pk), created)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            created.delete()
+        self.assertIsNone(active_event_for_teacher(self.teacher.pk))
+        self.assertIs(active_events._index, index)
+
+    def test_rolled_back_changes(self):
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.events[0].students.remove(self.student)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+
+    def test_changes_in_other_processes(self):
+        active_event_for_student(self.student.pk)
+        index = active_events._index
+        with mock.patch.object(active_events, 'CHECK_INTERVAL', 0):
+            # 标记未变化：只读取标记
+            with self.assertNumQueries(1):
+                self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+            self.assertIs(active_events._index, index)
+
+            # 其他进程修改了参与者并写入新的标记
+            MutualSelectionEvent.students.through.objects.filter(student_id=self.student.pk).delete()
+            ActiveEventIndexVersion.objects.update_or_create(pk=1, defaults={'token': 'other'})
+            self.assertIsNone(active_event_for_student(self.student.pk))
+            self.assertIsNot(active_events._index, index)
+            self.assertEqual(active_events._index.version, 'other')
+
+    def test_boundaries(self):
+        # 起止时间大量重合时，在各个时间点上以及时间点之间与原查询一致
+        rng = random.Random(3)
+        base = self.now.replace(microsecond=0)
+        hour = timedelta(hours=1)
+        student = Student.objects.create(stu_no='IDX-B', stu_name='边界', grade='2024')
+        for n in range(12):
+            start = rng.randint(-6, 6)
+            event = MutualSelectionEvent.objects.create(
+                event_name=f'边界{n}', stu_start_time=base + start * hour,
+                stu_end_time=base + (start + rng.randint(0, 4)) * hour,
+                tea_start_time=base, tea_end_time=base + 12 * hour,
+            )
+            if rng.random() < 0.7:
+                event.students.add(student)
+        reset_active_events()
+        for offset in range(-8 * 2, 12 * 2):
+            now = base + offset * hour / 2
+            with self.subTest(now=now):
+                self.assertEqual(active_event_for_student(student.pk, now), self.expected(
+                    {'students': student, 'stu_start_time__lte': now, 'stu_end_time__gte': now}))
+                self.assertEqual(dashboard_event_for_student(student.pk, now), self.expected(
+                    {'students': student, 'stu_start_time__lte': now, 'tea_end_time__gte': now}))
+
+    def test_writes_query_database(self):
+        # 模拟其他进程修改了活动：queryset.update 不触发信号，本进程的索引仍认为活动进行中
+        student_client, teacher_client = APIClient(), APIClient()
+        student_client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("student", self.student).access_token}')
+        teacher_client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("teacher", self.teacher).access_token}')
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+        self.assertEqual(active_event_for_teacher(self.teacher.pk), self.events[1])
+        past = self.now - timedelta(hours=1)
+        MutualSelectionEvent.objects.filter(pk=self.events[0].pk).update(stu_end_time=past)
+        MutualSelectionEvent.objects.filter(pk=self.events[1].pk).update(tea_end_time=past)
+        self.assertEqual(active_event_for_student(self.student.pk), self.events[0])
+
+        response = student_client.post('/api/teams/create-team/', {'group_name': '过期'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Group.objects.exists())
+        response = teacher_client.post('/api/teams/teacher/set-preferences/', {'preferences': {}}, format='json')
+        self.assertEqual(response.json(), {'error': '当前没有正在进行的互选活动'})
+
+
+
+
+
+
+
+
+
+
+
+
+def best_matching_score(candidates, capacity):
+    """穷举每个团队的选择（不分配或任一志愿教师），返回不超过容量时的最高总得分（放大后的整数）"""
+    by_group = {}
+    for match in candidates:
+        by_group.setdefault(match['group_id'], []).append(match)
+    groups = list(by_group)
+    best = 0
+    for choice in itertools.product(*[[None] + by_group[g] for g in groups]):
+        used = {}
+        for match in choice:
+            if match is not None:
+                used[match['teacher_id']] = used.get(match['teacher_id'], 0) + 1
+        if all(count <= capacity.get(t, 0) for t, count in used.items()):
+            best = max(best, sum(round(m['score'] * SCORE_SCALE) for m in choice if m is not None))
+    return best
+
+
+def random_instance(rng, max_groups=6, max_teachers=3):
+    groups = list(range(1, rng.randint(1, max_groups) + 1))
+    teachers = list(range(101, 101 + rng.randint(1, max_teachers)))
+    candidates = [
+        {'group_id': g, 'teacher_id': t, 'score': rng.randint(1, 12) / 2, 'explanation': f'{g}-{t}'}
+        for g in groups for t in teachers if rng.random() < 0.6
+    ]
+    return groups, teachers, candidates
+
+
+class MatchingEngineTests(SimpleTestCase):
+    """最小费用流和分配流程与穷举结果对比"""
+
+    def test_min_cost_flow(self):
+        # 源点 0，汇点 3：0->1->3 费用 -5，0->2->3 费用 +1（正费用路径不增广）
+        solver = MinCostFlow(4)
+        solver.add_edge(0, 1, 2, -2)
+        solver.add_edge(1, 3, 1, -3)
+        solver.add_edge(0, 2, 1, 0)
+        edge = solver.add_edge(2, 3, 1, 1)
+        self.assertEqual(solver.min_cost_flow(0, 3), (1, -5))
+        self.assertEqual(solver.flow_on(edge), 0)
+
+    def test_optimal_match_against_brute_force(self):
+        rng = random.Random(1)
+        for case in range(300):
+            groups, teachers, candidates = random_instance(rng)
+            capacity = {t: rng.randint(0, 2) for t in teachers}
+            with self.subTest(case=case):
+                matched = match_by_preference(candidates, capacity, ALGORITHM_MIN_COST_FLOW)
+                loads = {}
+                for group_id, match in matched.items():
+                    self.assertEqual(match['group_id'], group_id)
+                    self.assertIn(match, candidates)
+                    loads[match['teacher_id']] = loads.get(match['teacher_id'], 0) + 1
+                self.assertTrue(all(count <= capacity[t] for t, count in loads.items()))
+                self.assertEqual(
+                    sum(round(m['score'] * SCORE_SCALE) for m in matched.values()),
+                    best_matching_score(candidates, capacity),
+                )
+
+    def test_greedy_is_not_optimal(self):
+        candidates = [
+            {'group_id': 1, 'teacher_id': 101, 'score': 5, 'explanation': ''},
+            {'group_id': 1, 'teacher_id': 102, 'score': 4, 'explanation': ''},
+            {'group_id': 2, 'teacher_id': 101, 'score': 4, 'explanation': ''},
+        ]
+        capacity = {101: 1, 102: 1}
+        greedy = match_by_preference(candidates, capacity, ALGORITHM_GREEDY)
+        optimal = match_by_preference(candidates, capacity, ALGORITHM_MIN_COST_FLOW)
+        self.assertEqual(sum(m['score'] for m in greedy.values()), 5)
+        self.assertEqual(sum(m['score'] for m in optimal.values()), 8)
+
+    def test_assign_groups_against_brute_force(self):
+        rng = random.Random(2)
+        for case in range(300):
+            groups, teachers, candidates = random_instance(rng)
+            limit = rng.randint(1, 2)
+            fixed_loads = {t: rng.randint(0, limit) for t in teachers if rng.random() < 0.3}
+            with self.subTest(case=case):
+                result = assign_groups(groups, teachers, candidates, limit,
+                                       fixed_loads=fixed_loads, rng=random.Random(case))
+                # 每个团队都分配一次，顺序与输入一致
+                self.assertEqual([a['group_id'] for a in result], groups)
+
+                preferred = [a for a in result if a['score'] > 0]
+                capacity = {t: limit - fixed_loads.get(t, 0) for t in teachers}
+                self.assertEqual(
+                    sum(round(a['score'] * SCORE_SCALE) for a in preferred),
+                    best_matching_score(candidates, capacity),
+                )
+
+                loads = {t: fixed_loads.get(t, 0) for t in teachers}
+                for a in result:
+                    loads[a['teacher_id']] += 1
+                free = sum(capacity.values())
+                overflow = [a for a in result if a['explanation'] == '超额分配（原名额已满）']
+                # 名额用完前不超额；名额用完后超额的团队均匀分给各教师
+                self.assertEqual(len(overflow), max(0, len(groups) - free))
+                if overflow:
+                    self.assertLessEqual(max(loads.values()) - min(loads.values()), 1)
+                else:
+                    self.assertTrue(all(load <= limit for load in loads.values()))
+
+    def replay_loads(self, result, teachers, fixed_loads, limit):
+        """按结果顺序重放随机/超额阶段，检查每次都选中当时负载最低的教师"""
+        loads = {t: fixed_loads.get(t, 0) for t in teachers}
+        for a in result:
+            if a['score'] > 0:
+                loads[a['teacher_id']] += 1
+        for a in result:
+            if a['score'] > 0:
+                continue
+            if a['explanation'] == '随机分配（无志愿匹配）':
+                eligible = [t for t in teachers if loads[t] < limit]
+            else:
+                self.assertEqual(a['explanation'], '超额分配（原名额已满）')
+                self.assertFalse([t for t in teachers if loads[t] < limit])
+                eligible = teachers
+            self.assertEqual(loads[a['teacher_id']], min(loads[t] for t in eligible))
+            self.assertIn(a['teacher_id'], eligible)
+            loads[a['teacher_id']] += 1
+        return loads
+
+    def test_lowest_load_first(self):
+        rng = random.Random(3)
+        for case in range(200):
+            groups, teachers, candidates = random_instance(rng, max_groups=8)
+            limit = rng.randint(1, 2)
+            fixed_loads = {t: rng.randint(0, limit) for t in teachers if rng.random() < 0.5}
+            with self.subTest(case=case):
+                result = assign_groups(groups, teachers, candidates, limit,
+                                       fixed_loads=fixed_loads, rng=random.Random(case))
+                self.replay_loads(result, teachers, fixed_loads, limit)
+
+    def test_ties(self):
+        groups, teachers = list(range(1, 8)), [101, 102, 103]
+
+        def run(seed, fixed_loads=None):
+            return [a['teacher_id'] for a in assign_groups(
+                groups, teachers, [], 2, fixed_loads=fixed_loads, rng=random.Random(seed))]
+
+        # 同一种子结果相同；同负载的教师由种子决定先后
+        self.assertEqual(run(1), run(1))
+        self.assertGreater(len({tuple(run(seed)) for seed in range(20)}), 1)
+        for seed in range(20):
+            order = run(seed)
+            # 前三个团队分给三个不同的教师，之后依次轮换，超额的团队同样均分
+            self.assertEqual(len(set(order[:3])), 3)
+            self.assertEqual(len(set(order[3:6])), 3)
+            self.assertEqual(Counter(order), Counter({t: 2 for t in teachers}) + Counter([order[6]]))
+
+        # 已有固定负载的教师排在后面
+        for seed in range(20):
+            order = run(seed, fixed_loads={101: 1})
+            self.assertNotEqual(order[0], 101)
+            self.assertNotEqual(order[1], 101)
+
+
+def legacy_scores(group_ids, teacher_ids, student_prefs, teacher_prefs):
+    """原 auto_assign 的逐对评分（团队数 × 教师数），用于对比"""
+    teacher_rank_of = {}
+    for teacher_id, group_id, rank in teacher_prefs:
+        if teacher_id in teacher_ids:
+            teacher_rank_of.setdefault(teacher_id, {})[group_id] = rank
+    scores = {}
+    for group_id in group_ids:
+        for teacher_id in teacher_ids:
+            teacher_score = student_score = 0
+            explanation_parts = []
+            teacher_rank = teacher_rank_of.get(teacher_id, {}).get(group_id)
+            if teacher_rank:
+                teacher_score = TEACHER_PREF_SCORES.get(teacher_rank, 0)
+                if teacher_score > 0:
+                    explanation_parts.append(f"教师第{teacher_rank}志愿")
+            try:
+                student_rank = student_prefs[group_id].index(teacher_id) + 1
+                student_score = STUDENT_PREF_SCORES.get(student_rank, 0)
+                if student_score > 0:
+                    explanation_parts.append(f"学生第{student_rank}志愿")
+            except (ValueError, IndexError):
+                pass
+            total_score = round((teacher_score * TEACHER_WEIGHT_MULTIPLIER) + student_score, 2)
+            scores[group_id, teacher_id] = (total_score, " + ".join(explanation_parts))
+    return scores
+
+
+class ScoreMatrixParityTests(SimpleTestCase):
+    """稀疏评分（scoring.py / matrix.py）与原逐对评分结果一致"""
+
+    group_ids = [11, 12, 13, 14, 15]
+    teacher_ids = [1, 2, 3, 4]
+    student_prefs = {
+        11: [1, 2, 3],
+        12: [2, 2, None],  # 重复填报同一教师取第一志愿
+        13: [9, 4, 1],  # 9 未参与活动
+        14: [None, None, None],
+        15: [3, 1, 2],
+    }
+    teacher_prefs = [
+        (1, 11, 1), (1, 13, 2), (1, 14, 5),
+        (2, 12, 1), (2, 15, 6),  # 第 6 志愿不计分
+        (3, 15, 3), (3, 11, 4),
+        (9, 11, 1),  # 未参与活动的教师
+        (4, 99, 1),  # 不属于本活动的团队
+    ]
+
+    def test_parity(self):
+        expected = legacy_scores(self.group_ids, self.teacher_ids, self.student_prefs, self.teacher_prefs)
+        matrix = ScoreMatrix.from_preferences(self.group_ids, self.teacher_ids, self.student_prefs, self.teacher_prefs)
+
+        for (group_id, teacher_id), (score, _) in expected.items():
+            self.assertAlmostEqual(matrix.row(group_id)[matrix.teacher_index[teacher_id]], score)
+        self.assertEqual(
+            {(c['group_id'], c['teacher_id']): (c['score'], c['explanation']) for c in matrix.candidates()},
+            {key: value for key, value in expected.items() if value[0] > 0},
+        )
+        self.assertEqual(expected[12, 2], (22.0, '教师第1志愿 + 学生第1志愿'))
+        self.assertEqual(expected[15, 2], (2.0, '学生第3志愿'))
+
+    def test_serialization_keeps_scores(self):
+        matrix = ScoreMatrix.from_preferences(self.group_ids, self.teacher_ids, self.student_prefs, self.teacher_prefs)
+        restored = ScoreMatrix.from_bytes(matrix.to_bytes())
+        self.assertEqual(restored.candidates(), matrix.candidates())
+        self.assertEqual(restored.fingerprint(), matrix.fingerprint())
+
+
+class ScoreMatrixLoaderTests(TestCase):
+    """从数据库读取志愿构建得分矩阵"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = MutualSelectionEvent.objects.create(
+            event_name='志愿', stu_start_time=now, stu_end_time=now + timedelta(days=1),
+            tea_start_time=now, tea_end_time=now + timedelta(days=1),
+        )
+        cls.teachers = [teacher.objects.create(teacher_no=f'LT{i}', teacher_name=f'导师{i}') for i in range(4)]
+        cls.event.teachers.set(cls.teachers[:3])
+        cls.groups = []
+
+    def add_groups(self, count):
+        t = self.teachers
+        for _ in range(count):
+            n = len(self.groups)
+            # 学生志愿轮换，第 4 名教师未参与活动
+            group = Group.objects.create(
+                event=self.event, group_name=f'团队{n}',
+                preferred_advisor_1=t[n % 4], preferred_advisor_2=t[(n + 1) % 4], preferred_advisor_3=None,
+            )
+            TeacherGroupPreference.objects.create(teacher=t[n % 3], group=group, preference_rank=n % 5 + 1)
+            self.groups.append(group)
+
+    def test_query_count(self):
+        for count in (2, 20):
+            self.add_groups(count - len(self.groups))
+            with self.subTest(groups=count), self.assertNumQueries(3):
+                matrix = load_score_matrix(self.event)
+            self.assertEqual(matrix.group_ids, [g.pk for g in self.groups])
+
+    def test_preferences(self):
+        self.add_groups(5)
+        matrix = load_score_matrix(self.event)
+        self.assertEqual(matrix.teacher_ids, [t.pk for t in self.teachers[:3]])
+        self.assertEqual(matrix.shape, (5, 3))
+
+        expected_student = [[0] * 3 for _ in range(5)]
+        expected_teacher = [[0] * 3 for _ in range(5)]
+        for n in range(5):
+            for rank, teacher_index in enumerate((n % 4, (n + 1) % 4), start=1):
+                if teacher_index < 3:
+                    expected_student[n][teacher_index] = rank
+            expected_teacher[n][n % 3] = n % 5 + 1
+        self.assertEqual(matrix.student_rank_matrix.tolist(), expected_student)
+        self.assertEqual(matrix.teacher_rank_matrix.tolist(), expected_teacher)
+
+    def test_cached(self):
+        self.add_groups(3)
+        matrix = get_score_matrix(self.event)
+        self.assertIsNotNone(ScoreMatrixCache.objects.get(event=self.event).data)
+        with self.assertNumQueries(1):
+            cached = get_score_matrix(self.event)
+        self.assertEqual(cached.fingerprint(), matrix.fingerprint())
+
+    def cached(self):
+        return ScoreMatrixCache.objects.get(event=self.event).data is not None
+
+    def test_invalidated_on_changes(self):
+        self.add_groups(3)
+        group, t = self.groups[0], self.teachers
+
+        def change(description, fn):
+            get_score_matrix(self.event)
+            self.assertTrue(self.cached())
+            fn()
+            with self.subTest(description):
+                self.assertFalse(self.cached())
+                # 重新计算的矩阵反映修改后的志愿
+                self.assertEqual(get_score_matrix(self.event).fingerprint(), load_score_matrix(self.event).fingerprint())
+
+        def set_student_preference():
+            group.preferred_advisor_3 = t[2]
+            group.save()
+
+        preference = TeacherGroupPreference.objects.get(group=group)
+
+        def set_teacher_rank():
+            preference.preference_rank = 5
+            preference.save()
+
+        change('学生志愿', set_student_preference)
+        change('教师志愿修改', set_teacher_rank)
+        change('教师志愿删除', preference.delete)
+        change('教师志愿新增', lambda: TeacherGroupPreference.objects.create(teacher=t[1], group=group, preference_rank=1))
+        change('参与教师加入', lambda: self.event.teachers.add(t[3]))
+        change('参与教师退出', lambda: self.event.teachers.remove(t[0]))
+        change('教师退出所有活动', t[1].mutual_selection_events.clear)
+        change('团队删除', self.groups[1].delete)
+        change('教师删除', t[2].delete)
+
+    def test_kept_on_unrelated_group_changes(self):
+        self.add_groups(3)
+        group = Group.objects.get(pk=self.groups[0].pk)
+        get_score_matrix(self.event)
+
+        group.group_name = '改名'
+        group.project_description = '简介'
+        group.save()
+        self.assertTrue(self.cached())
+
+        # 内存中改了志愿但只保存名称：缓存保留，之后保存志愿时仍然失效
+        group.preferred_advisor_1 = self.teachers[3]
+        group.save(update_fields=['group_name'])
+        self.assertTrue(self.cached())
+        group.save(update_fields=['preferred_advisor_1'])
+        self.assertFalse(self.cached())
+
+        get_score_matrix(self.event)
+        Group.objects.only('group_id', 'group_name').get(pk=group.pk).save()
+        self.assertTrue(self.cached())
+
+        group.advisor = self.teachers[0]
+        group.save()
+        self.assertFalse(self.cached())
+
+
+def create_assign_event(prefix, group_count=6, teacher_count=3, limit=2):
+    """自动分配用的活动：学生志愿按教师轮换，每个教师把第一个团队列为第一志愿"""
+    now = timezone.now()
+    event = MutualSelectionEvent.objects.create(
+        event_name=f'{prefix}分配', stu_start_time=now - timedelta(days=2), stu_end_time=now - timedelta(days=1),
+        tea_start_time=now - timedelta(days=2), tea_end_time=now - timedelta(days=1), teacher_choice_limit=limit,
+    )
+    teachers = [
+        teacher.objects.create(teacher_no=f'{prefix}T{i}', teacher_name=f'{prefix}导师{i}')
+        for i in range(teacher_count)
+    ]
+    event.teachers.set(teachers)
+    groups = [
+        Group.objects.create(
+            event=event, group_name=f'{prefix}团队{n}',
+            preferred_advisor_1=teachers[n % teacher_count],
+            preferred_advisor_2=teachers[(n + 1) % teacher_count],
+        )
+        for n in range(group_count)
+    ]
+    for i, t in enumerate(teachers):
+        TeacherGroupPreference.objects.create(teacher=t, group=groups[i], preference_rank=1)
+    return event, groups, teachers
+
+
+class AutoAssignJobTests(TestCase):
+    """后台分配任务：提交 -> 领取 -> 进度 -> 完成/失败，超时重新排队"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event, cls.groups, cls.teachers = create_assign_event('JOB')
+        now = timezone.now()
+        cls.empty_event = MutualSelectionEvent.objects.create(
+            event_name='无团队', stu_start_time=now, stu_end_time=now, tea_start_time=now, tea_end_time=now,
+        )
+
+    def test_lifecycle(self):
+        job, created = enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW, seed=3)
+        self.assertTrue(created)
+        self.assertEqual((job.status, job.progress), (AutoAssignJob.STATUS_PENDING, 0))
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, AutoAssignJob.STATUS_RUNNING)
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(claim_next_job())
+
+        execute_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.stage), (AutoAssignJob.STATUS_SUCCEEDED, 100, '已完成'))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.result['seed'], 3)
+        self.assertEqual(job.result['assigned_count'], len(self.groups))
+        self.assertEqual(ProvisionalAssignment.objects.filter(event=self.event).count(), len(self.groups))
+
+    def test_progress(self):
+        stages = []
+        run_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW, progress=lambda percent, stage: stages.append(percent))
+        self.assertEqual(stages, sorted(stages))
+        self.assertEqual(stages[0], 5)
+
+        # 输入未变化时直接复用上次结果
+        stages.clear()
+        run_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW, progress=lambda percent, stage: stages.append(percent))
+        self.assertEqual(stages, [5, 100])
+
+    def test_failed(self):
+        job, _ = enqueue_auto_assign(self.empty_event, ALGORITHM_MIN_COST_FLOW)
+        execute_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, AutoAssignJob.STATUS_FAILED)
+        self.assertEqual(job.error, '当前活动没有任何团队')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_duplicate_enqueue(self):
+        job, created = enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW)
+        again, created_again = enqueue_auto_assign(self.event, ALGORITHM_GREEDY)
+        self.assertEqual((again.pk, created, created_again), (job.pk, True, False))
+
+        # 执行中的任务同样不重复提交
+        claim_next_job()
+        self.assertEqual(enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW), (job, False))
+        # 其他活动不受影响
+        self.assertTrue(enqueue_auto_assign(self.empty_event, ALGORITHM_MIN_COST_FLOW)[1])
+
+        execute_job(AutoAssignJob.objects.get(pk=job.pk))
+        self.assertTrue(enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW)[1])
+
+    def test_requeue_stale(self):
+        stale, _ = enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW)
+        fresh, _ = enqueue_auto_assign(self.empty_event, ALGORITHM_MIN_COST_FLOW)
+        claim_next_job()
+        claim_next_job()
+        AutoAssignJob.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at, stale.stage), (AutoAssignJob.STATUS_PENDING, None, '重新排队'))
+        self.assertEqual(fresh.status, AutoAssignJob.STATUS_RUNNING)
+        self.assertEqual(claim_next_job().pk, stale.pk)
+
+    def test_command(self):
+        done, _ = enqueue_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW)
+        failed, _ = enqueue_auto_assign(self.empty_event, ALGORITHM_MIN_COST_FLOW)
+        stdout = io.StringIO()
+        call_command('run_assign_jobs', '--once', stdout=stdout)
+        self.assertEqual(
+            list(AutoAssignJob.objects.order_by('pk').values_list('status', flat=True)),
+            [AutoAssignJob.STATUS_SUCCEEDED, AutoAssignJob.STATUS_FAILED],
+        )
+        self.assertIn(f'任务 #{done.pk} 完成', stdout.getvalue())
+        self.assertIn(f'任务 #{failed.pk} 失败: 当前活动没有任何团队', stdout.getvalue())
+
+    def test_async_endpoint(self):
+        admin = AdminUser.objects.create(admin_name='任务', admin_username='job-admin', admin_password='-')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", admin).access_token}')
+        response = client.post(f'/api/teams/{self.event.pk}/admin/auto-assign/', {'async': 'true'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(
+            client.post(f'/api/teams/{self.event.pk}/admin/auto-assign/', {'async': 'true'}).json()['job_id'], job_id
+        )
+
+        execute_job(claim_next_job())
+        data = client.get(f'/api/teams/admin/auto-assign-jobs/{job_id}/').json()
+        self.assertEqual((data['status'], data['progress']), (AutoAssignJob.STATUS_SUCCEEDED, 100))
+
+
+class SimulateWeightsTests(TestCase):
+    """评分权重模拟接口：多个方案共用进程池，默认权重的结果与自动分配一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event, cls.groups, cls.teachers = create_assign_event('SIM', group_count=8)
+        cls.admin = AdminUser.objects.create(admin_name='模拟', admin_username='sim-admin', admin_password='-')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", self.admin).access_token}')
+        self.url = f'/api/teams/{self.event.pk}/admin/simulate-weights/'
+
+    def simulate(self, scenarios, **data):
+        return self.client.post(self.url, {'scenarios': scenarios, **data}, format='json')
+
+    def test_scenarios(self):
+        response = self.simulate([
+            {'name': '默认'},
+            {'name': '只看学生', 'teacher_weight': 0},
+            {'name': '只看教师', 'student_pref_scores': {'1': 0}},
+        ], seed=5)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([s['name'] for s in data['scenarios']], ['默认', '只看学生', '只看教师'])
+        self.assertEqual(data['scenarios'][1]['weights']['teacher_weight'], 0)
+
+        # 默认权重与同一种子的自动分配结果一致，且不写入临时分配
+        default = data['scenarios'][0]['metrics']
+        self.assertFalse(ProvisionalAssignment.objects.filter(event=self.event).exists())
+        result = run_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW, seed=5)
+        self.assertEqual(default['total_score'], result['total_score'])
+        self.assertEqual(default['preference_matched'], result['preference_matched'])
+        self.assertEqual(default['assigned_count'], len(self.groups))
+
+    def test_pool_reused(self):
+        # 单核环境下 SIMULATION_WORKERS 为 1，不使用进程池
+        patcher = mock.patch.object(simulation, 'SIMULATION_WORKERS', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: simulation._discard_pool(simulation.get_pool()))
+
+        scenarios = [{'name': 'a'}, {'name': 'b', 'teacher_weight': 2}]
+        first = self.simulate(scenarios).json()
+        pool = simulation.get_pool()
+        second = self.simulate(scenarios).json()
+        self.assertIs(simulation.get_pool(), pool)
+        self.assertEqual(first['scenarios'], second['scenarios'])
+
+    def test_invalid(self):
+        self.assertEqual(self.simulate([]).status_code, 400)
+        self.assertEqual(self.simulate([{'teacher_weight': -1}]).json(), {'error': '第 1 个方案的 teacher_weight 不能为负数'})
+        self.assertEqual(self.simulate([{}] * (simulation.MAX_SCENARIOS + 1)).status_code, 400)
+        self.assertEqual(self.simulate([{}], algorithm='unknown').status_code, 400)
+
+
+class RepairAssignmentsTests(TestCase):
+    """局部修复只重新分配受影响的团队，其余分配（含手动指定）保持不变"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event, cls.groups, cls.teachers = create_assign_event('REP', group_count=8, teacher_count=4, limit=3)
+        cls.admin = AdminUser.objects.create(admin_name='修复', admin_username='repair-admin', admin_password='-')
+
+    def setUp(self):
+        run_auto_assign(self.event, ALGORITHM_MIN_COST_FLOW)
+
+    def assignments(self):
+        return {
+            a.group_id: a for a in ProvisionalAssignment.objects.filter(event=self.event)
+        }
+
+    def check_repair(self, affected, exclude_groups=()):
+        before = self.assignments()
+        pinned = {g for g, a in before.items() if a.assignment_type == 'manual'}
+        scope = repair_scope(
+            get_score_matrix(self.event), {g: (a.teacher_id, a.score) for g, a in before.items()},
+            pinned, affected, exclude_groups,
+        )
+        result = run_repair(self.event, ALGORITHM_MIN_COST_FLOW, affected, exclude_groups)
+        after = self.assignments()
+
+        self.assertEqual(result['repaired_groups'], len(scope))
+        self.assertLess(len(scope), len(self.groups))
+        for group_id, assignment in before.items():
+            if group_id not in scope:
+                # 范围外的记录未被删除重建
+                self.assertEqual(after[group_id].pk, assignment.pk)
+                self.assertEqual(after[group_id].teacher_id, assignment.teacher_id)
+        for group_id in pinned:
+            self.assertEqual(after[group_id].assignment_type, 'manual')
+        loads = Counter(a.teacher_id for a in after.values())
+        self.assertLessEqual(max(loads.values()), self.event.teacher_choice_limit)
+        self.assertEqual(
+            {c['group_id'] for c in result['changes']},
+            {g for g in scope if g not in before or after.get(g) and after[g].teacher_id != before[g].teacher_id},
+        )
+        return scope, after
+
+    def test_manual_move(self):
+        group = self.groups[0]
+        old_teacher = ProvisionalAssignment.objects.get(group=group).teacher_id
+        new_teacher = next(t.pk for t in self.teachers if t.pk != old_teacher)
+        ProvisionalAssignment.objects.filter(group=group).update(
+            teacher_id=new_teacher, assignment_type='manual', score=9999)
+
+        scope, after = self.check_repair([old_teacher, new_teacher])
+        self.assertNotIn(group.pk, scope)
+        self.assertEqual(after[group.pk].teacher_id, new_teacher)
+
+    def test_cancelled_group_stays_unassigned(self):
+        group = self.groups[1]
+        freed_teacher = ProvisionalAssignment.objects.get(group=group).teacher_id
+        ProvisionalAssignment.objects.filter(group=group).delete()
+
+        scope, after = self.check_repair([freed_teacher], exclude_groups=(group.pk,))
+        self.assertNotIn(group.pk, after)
+
+    def test_unassigned_group_placed(self):
+        group = self.groups[2]
+        ProvisionalAssignment.objects.filter(group=group).delete()
+
+        # 没有受影响的教师时只分配未分配的团队
+        scope, after = self.check_repair([])
+        self.assertEqual(scope, [group.pk])
+        self.assertIn(group.pk, after)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", self.admin).access_token}')
+        before = self.assignments()
+        group = self.groups[0]
+        target = next(t.pk for t in self.teachers if t.pk != before[group.pk].teacher_id)
+        response = client.post(f'/api/teams/{self.event.pk}/admin/manual-assign/', {
+            'group_id': group.pk, 'teacher_id': target, 'repair': 'true',
+        })
+        self.assertEqual(response.status_code, 200)
+        after = self.assignments()
+        self.assertEqual((after[group.pk].teacher_id, after[group.pk].assignment_type), (target, 'manual'))
+        self.assertLess(response.json()['repair']['repaired_groups'], len(self.groups) - 1)
+
+
+class AutoAssignReuseTests(TestCase):
+    """输入（志愿、名额、算法、种子）不变时复用上次的自动分配结果"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event, cls.groups, cls.teachers = create_assign_event('FP')
+
+    def assign(self, algorithm=ALGORITHM_MIN_COST_FLOW, **kwargs):
+        return run_auto_assign(MutualSelectionEvent.objects.get(pk=self.event.pk), algorithm, **kwargs)
+
+    def assignment_ids(self):
+        return set(ProvisionalAssignment.objects.filter(event=self.event).values_list('pk', flat=True))
+
+    def test_unchanged_input(self):
+        first = self.assign(seed=1)
+        ids = self.assignment_ids()
+        again = self.assign(seed=1)
+        self.assertTrue(again['reused'])
+        self.assertEqual({**again, 'reused': False}, first)
+        self.assertEqual(self.assignment_ids(), ids)
+        self.assertEqual(AutoAssignResult.objects.get(event=self.event).fingerprint, first['fingerprint'])
+
+        self.assertFalse(self.assign(seed=1, force=True)['reused'])
+        self.assertNotEqual(self.assignment_ids(), ids)
+
+    def test_changed_input(self):
+        first = self.assign()
+
+        def changed(description, **kwargs):
+            with self.subTest(description):
+                result = self.assign(**kwargs)
+                self.assertFalse(result['reused'])
+                self.assertNotEqual(result['fingerprint'], first['fingerprint'])
+
+        changed('种子', seed=7)
+        changed('算法', algorithm=ALGORITHM_GREEDY)
+
+        MutualSelectionEvent.objects.filter(pk=self.event.pk).update(teacher_choice_limit=3)
+        changed('名额')
+        self.assertTrue(self.assign()['reused'])
+
+        TeacherGroupPreference.objects.create(teacher=self.teachers[0], group=self.groups[4], preference_rank=2)
+        changed('教师志愿')
+        self.assertTrue(self.assign()['reused'])
+
+        # 每个活动只保存最近一次结果，改回原来的名额要重新计算
+        MutualSelectionEvent.objects.filter(pk=self.event.pk).update(teacher_choice_limit=2)
+        self.assertFalse(self.assign()['reused'])
+
+        # 手动调整后上次结果不再可复用
+        clear_auto_assign_result(self.event)
+        self.assertFalse(self.assign()['reused'])
+
+
+class BenchmarkCommandTests(TestCase):
+    """benchmark_matching 在小规模数据上的冒烟测试"""
+
+    def benchmark(self, *args):
+        out = io.StringIO()
+        call_command(
+            'benchmark_matching', '--groups', '4', '--teachers', '2', '--students-per-group', '1',
+            '--repeat', '1', *args, stdout=out, stderr=io.StringIO(),
+        )
+        return json.loads(out.getvalue())
+
+    def test_report(self):
+        report = self.benchmark()
+        self.assertEqual(report['params']['groups'], 4)
+        self.assertEqual(report['params']['limit'], 2)
+        self.assertEqual(set(report['results']), {
+            'score_matrix_cold', 'auto_assign', 'auto_assign_reused',
+            'match_options', 'all_match_options', 'all_match_options_top10',
+        })
+        for name, metrics in report['results'].items():
+            with self.subTest(name):
+                self.assertEqual(metrics['runs'], 1)
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreater(metrics['peak_memory_bytes'], 0)
+        # 默认回滚生成的数据
+        self.assertFalse(MutualSelectionEvent.objects.filter(event_name__startswith='benchmark-').exists())
+
+    def test_keep(self):
+        self.benchmark('--keep')
+        event = MutualSelectionEvent.objects.get(event_name__startswith='benchmark-')
+        self.assertEqual(event.teachers.count(), 2)
+        self.assertEqual(Group.objects.filter(event=event).count(), 4)
+
+    def test_output_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            out = io.StringIO()
+            call_command(
+                'benchmark_matching', '--groups', '2', '--teachers', '1', '--repeat', '1',
+                '--output', path, stdout=out, stderr=io.StringIO(),
+            )
+            self.assertEqual(out.getvalue(), '')
+            with open(path, encoding='utf-8') as f:
+                self.assertIn('auto_assign', json.load(f)['results'])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_matching', '--groups', '0', stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class StreamingResponseTests(TestCase):
+    """?stream=1 输出的 JSON 解析后与普通响应一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AdminUser.objects.create(admin_name='流式', admin_username='stream-admin', admin_password='-')
+        major = Major.objects.create(major_name='流式专业')
+        cls.students = [
+            Student.objects.create(stu_no=f'S{i:02d}', stu_name=f'流式{i}', grade='2024', major=major if i % 2 else None)
+            for i in range(7)
+        ]
+        cls.event, cls.groups, cls.teachers = create_assign_event('ST')
+        cls.event.students.set(cls.students)
+        GroupMembership.objects.create(group=cls.groups[0], student=cls.students[0])
+        GroupMembership.objects.create(group=cls.groups[0], student=cls.students[1])
+        GroupMembership.objects.create(group=cls.groups[1], student=cls.students[2])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {principal_token("admin", self.admin).access_token}')
+
+    def get_stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_student_list(self):
+        streamed = self.get_stream('/api/admin/students/?stream=1')
+        paged = []
+        url = '/api/admin/students/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            paged.extend(data['results'])
+            url = data['next']
+        self.assertEqual(len(streamed), len(self.students))
+        self.assertEqual(streamed, paged)
+
+        # 过滤条件同样生效
+        self.assertEqual(
+            self.get_stream('/api/admin/students/?stream=1&search=流式3'),
+            self.client.get('/api/admin/students/?search=流式3').json()['results'],
+        )
+
+    def test_management_info(self):
+        url = f'/api/teams/{self.event.pk}/admin/management-info/'
+        streamed = self.get_stream(f'{url}?stream=1')
+        plain = self.client.get(url).json()
+
+        def by_id(data):
+            # 普通响应中的列表不保证顺序
+            data['event']['students'].sort(key=lambda s: s['stu_id'])
+            data['ungrouped_students_list'].sort(key=lambda s: s['stu_id'])
+            data['groups_list'].sort(key=lambda g: g['group_id'])
+            return data
+
+        self.assertEqual(by_id(streamed), by_id(plain))
+        self.assertEqual(len(streamed['ungrouped_students_list']), 4)
+        self.assertEqual(len(streamed['groups_list']), len(self.groups))
+
+    def test_chunk_boundaries(self):
+        queryset = Student.objects.filter(pk__in=[s.pk for s in self.students]).order_by('stu_id')
+        expected = StudentListSerializer(queryset, many=True).data
+        for chunk_size in (1, 2, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                text = ''.join(streaming.iter_json(
+                    {'items': streaming.serialized_array(queryset, StudentListSerializer, chunk_size=chunk_size)}
+                ))
+                self.assertEqual(json.loads(text), {'items': expected})
+        empty = streaming.serialized_array(Student.objects.none(), StudentListSerializer)
+        self.assertEqual(''.join(streaming.iter_json(empty)), '[]')
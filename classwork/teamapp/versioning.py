@@ -0,0 +1,94 @@
+"""
+活动数据版本号与条件 GET。
+
+团队、成员、教师志愿、临时分配等数据变化时，所属活动的版本号加一（signals.py 与批量写入处调用）。
+学生 dashboard、all-teams、教师 dashboard 用版本号生成 ETag，If-None-Match 命中时直接返回 304，
+不再查询和序列化团队数据。
+
+版本号在事务提交后才增加：读取方先读版本号再读数据，得到的 ETag 不会比数据新；
+同一事务内的多次变更只产生一次 UPDATE。事务回滚时待提交的活动会在下一次提交时多加一次，
+只会让客户端多收到一次完整响应。
+版本号取 max(原值 + 1, 当前微秒时间)：仍然单调递增，且被回滚的版本号不会再次出现，
+不会与回滚前生成的快照、ETag 重复。
+"""
+import hashlib
+import threading
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import EventDataVersion, Group, initial_data_version
+
+_pending = threading.local()
+
+
+def _pending_sets():
+    if not hasattr(_pending, 'event_ids'):
+        _pending.event_ids = set()
+        _pending.group_ids = set()
+    return _pending.event_ids, _pending.group_ids
+
+
+def _flush():
+    event_ids, group_ids = _pending_sets()
+    if not event_ids and not group_ids:
+        return
+    event_ids, group_ids = set(event_ids), set(group_ids)
+    _pending.event_ids.clear()
+    _pending.group_ids.clear()
+
+    if group_ids:
+        event_ids.update(Group.objects.filter(pk__in=group_ids).values_list('event_id', flat=True))
+    if event_ids:
+        EventDataVersion.objects.filter(event_id__in=event_ids).update(
+            version=Greatest(F('version') + 1, Value(initial_data_version())), updated_at=timezone.now()
+        )
+
+
+def bump_event_version(event_ids=(), group_ids=()):
+    """
+    使活动的版本号在当前事务提交后加一。
+    可以直接传活动ID，也可以传团队ID（提交后统一查询所属活动，避免逐条查询）。
+    """
+    if isinstance(event_ids, int):
+        event_ids = [event_ids]
+    if isinstance(group_ids, int):
+        group_ids = [group_ids]
+    pending_events, pending_groups = _pending_sets()
+    pending_events.update(event_ids)
+    pending_groups.update(group_ids)
+    # 每次都注册回调：第一个执行的回调处理全部待提交的活动，其余的为空操作
+    transaction.on_commit(_flush)
+
+
+def get_event_version(event_id):
+    version, _ = EventDataVersion.objects.get_or_create(event_id=event_id)
+    return version.version
+
+
+def event_etag(scope, event_id, version, request, *parts):
+    """
+    ETag = 接口 + 活动 + 版本号 + 调用方相关部分 + 查询参数。
+    version 必须在读取数据之前通过 get_event_version 获取。
+    """
+    query = hashlib.sha1(request.META.get('QUERY_STRING', '').encode()).hexdigest()[:8]
+    values = [scope, event_id, version, *parts, query]
+    return '"%s"' % '-'.join(str(value) for value in values)
+
+
+def not_modified(request, etag):
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        with_etag(response, etag)
+    return response
+
+
+def with_etag(response, etag):
+    """附加 ETag，并要求客户端每次都带上 If-None-Match 重新验证"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
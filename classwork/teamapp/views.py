@@ -1,13 +1,15 @@
+from django.http import HttpResponse
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Case, When, Value, IntegerField, OuterRef, Subquery
+from django.db.models import Count
 from rest_framework import status, viewsets, serializers
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from adminapp.models import MutualSelectionEvent
 from studentapp.models import Student
+from studentapp.serializers import StudentProfileSerializer
 from teacherapp.models import teacher
-from .models import Group, GroupMembership, TeacherGroupPreference, ProvisionalAssignment
+from .models import Group, GroupMembership, TeacherGroupPreference, ProvisionalAssignment, AutoAssignJob
 from .serializers import (
     GroupDetailSerializer,
     GroupCreateUpdateSerializer,
@@ -17,11 +19,39 @@ from .serializers import (
     ProvisionalAssignmentSerializer,
 
 )
+from .matching import (
+    ALGORITHM_MIN_COST_FLOW,
+    ALGORITHMS,
+    STUDENT_PREF_SCORES,
+    TEACHER_PREF_SCORES,
+    TEACHER_WEIGHT_MULTIPLIER,
+    MAX_SCENARIOS,
+    parse_scenario,
+    run_scenarios,
+)
+from .matching.loader import get_score_matrix, invalidate_score_matrix
+from .fast_serializers import merge_teacher_ranks, serialize_available_teammates, serialize_groups
+from classwork.streaming import serialized_array, stream_json_response, wants_stream
+from .active_events import (
+    active_event_for_student, active_event_for_teacher, dashboard_event_for_student,
+    query_active_event_for_student, query_active_event_for_teacher,
+)
+from .snapshots import get_team_payload, get_team_snapshot
+from .versioning import bump_event_version, event_etag, get_event_version, not_modified, with_etag
+from .assignment import (
+    DEFAULT_SEED,
+    clear_auto_assign_result,
+    enqueue_auto_assign,
+    job_payload,
+    run_auto_assign,
+    run_repair,
+)
 from adminapp.models import AdminUser
 
-import random
 from collections import defaultdict
 
+import numpy as np
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -30,6 +60,10 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
 
+# 学生工作台 bootstrap 接口可返回的部分
+BOOTSTRAP_SECTIONS = ('dashboard', 'all_teams', 'available_teachers', 'available_teammates', 'profile')
+
+
 def is_admin(user):
     return isinstance(user, AdminUser)
 
@@ -54,21 +88,56 @@ class TeamViewSet(viewsets.GenericViewSet):
         return GroupDetailSerializer
 
     # --- 辅助函数 ---
-    def get_active_event_for_student(self, student: Student):
-        now = timezone.now()
-        return MutualSelectionEvent.objects.filter(
-            students=student,
-            stu_start_time__lte=now,
-            stu_end_time__gte=now
-        ).first()
+    def eager_groups(self, queryset):
+        """按 ?fields= / ?expand= 只加载团队序列化需要的关联"""
+        return GroupDetailSerializer.setup_eager_loading(
+            queryset, fields=GroupDetailSerializer.selected_fields(self.request)
+        )
 
-    def get_active_event_for_teacher(self, current_teacher: teacher):
-        now = timezone.now()
-        return MutualSelectionEvent.objects.filter(
-            teachers=current_teacher,
-            tea_start_time__lte=now,
-            tea_end_time__gte=now
-        ).first()
+    # 读接口的当前活动从进程内的活动时间索引中查找，不访问数据库（见 active_events）；
+    # 写接口传 for_write=True，直接查询数据库，不按可能过期的索引授权
+    def get_active_event_for_student(self, student: Student, for_write=False):
+        if for_write:
+            return query_active_event_for_student(student.pk)
+        return active_event_for_student(student.pk)
+
+    def get_active_event_for_teacher(self, current_teacher: teacher, for_write=False):
+        if for_write:
+            return query_active_event_for_teacher(current_teacher.pk)
+        return active_event_for_teacher(current_teacher.pk)
+
+    def get_dashboard_event_for_student(self, student: Student, now):
+        # 查找当前时间已经开始（stu_start_time <= now），
+        # 并且 教师结束时间还没过（tea_end_time >= now）的活动。
+        # 这样涵盖了：学生互选期 + 教师互选期
+        # 这里我们假设只要 tea_end_time 还没过，学生就能看到
+        return dashboard_event_for_student(student.pk, now)
+
+    def dashboard_data(self, active_event, now):
+        """学生 dashboard 中与团队无关的部分；my_team_info / is_captain 由调用方填写"""
+        response_data = {
+            'has_active_event': active_event is not None,
+            'active_event_info': None,
+            'my_team_info': None,
+            'is_captain': False,
+            'is_editable': False,  # 控制前端按钮显示
+            'phase_status': 'none'  # 告知前端当前处于什么阶段
+        }
+        if active_event:
+            # 判断当前所处阶段
+            if now <= active_event.stu_end_time:
+                response_data['is_editable'] = True
+                response_data['phase_status'] = 'student_selection'  # 学生互选进行中
+            else:
+                response_data['phase_status'] = 'teacher_selection'  # 学生已结束，导师选人中/等待结果
+
+            response_data['active_event_info'] = {
+                'event_id': active_event.event_id,
+                'event_name': active_event.event_name,
+                'end_time': active_event.stu_end_time,  # 依然返回学生截止时间
+                'tea_end_time': active_event.tea_end_time  # 返回教师截止时间
+            }
+        return response_data
 
     def get_student_membership_in_event(self, student: Student, event: MutualSelectionEvent):
         """获取学生在指定活动中的团队成员关系"""
@@ -93,56 +162,30 @@ class TeamViewSet(viewsets.GenericViewSet):
             return Response({'error': '当前用户不是学生账号'}, status=status.HTTP_403_FORBIDDEN)
 
         now = timezone.now()
+        active_event = self.get_dashboard_event_for_student(student, now)
+        response_data = self.dashboard_data(active_event, now)
 
-        # 1. 修改查询逻辑：
-        # 查找当前时间已经开始（stu_start_time <= now），
-        # 并且 教师结束时间还没过（tea_end_time >= now）的活动。
-        # 这样涵盖了：学生互选期 + 教师互选期
-        active_event = MutualSelectionEvent.objects.filter(
-            students=student,
-            stu_start_time__lte=now,
-            tea_end_time__gte=now
-        ).first()
-
-        # 如果上面没找到，再试着找一下刚刚结束但还没完全归档的（可选，视需求而定）
-        # 这里我们假设只要 tea_end_time 还没过，学生就能看到
-
-        response_data = {
-            'has_active_event': active_event is not None,
-            'active_event_info': None,
-            'my_team_info': None,
-            'is_captain': False,
-            'is_editable': False,  # 新增字段：控制前端按钮显示
-            'phase_status': 'none'  # 新增字段：告知前端当前处于什么阶段
-        }
-
+        etag = None
         if active_event:
-            # 判断当前所处阶段
-            if now <= active_event.stu_end_time:
-                is_editable = True
-                phase_status = 'student_selection'  # 学生互选进行中
-            else:
-                is_editable = False
-                phase_status = 'teacher_selection'  # 学生已结束，导师选人中/等待结果
-
-            response_data['active_event_info'] = {
-                'event_id': active_event.event_id,
-                'event_name': active_event.event_name,
-                'end_time': active_event.stu_end_time,  # 依然返回学生截止时间
-                'tea_end_time': active_event.tea_end_time  # 返回教师截止时间
-            }
-            response_data['is_editable'] = is_editable
-            response_data['phase_status'] = phase_status
+            version = get_event_version(active_event.event_id)
+            etag = event_etag(
+                'dashboard', active_event.event_id, version, request, f's{student.pk}', response_data['phase_status']
+            )
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
 
             # 获取团队信息
             membership = self.get_student_membership_in_event(student, active_event)
             if membership:
-                group = membership.group
+                group = self.eager_groups(Group.objects.all()).get(pk=membership.group_id)
                 # 使用 GroupDetailSerializer 获取完整信息
-                response_data['my_team_info'] = GroupDetailSerializer(group).data
-                response_data['is_captain'] = (group.captain == student)
+                response_data['my_team_info'] = GroupDetailSerializer(group, context=self.get_serializer_context()).data
+                response_data['is_captain'] = (group.captain_id == student.pk)
 
-        return Response(response_data)
+        if etag is None:
+            return Response(response_data)
+        return with_etag(Response(response_data), etag)
 
     @action(detail=False, methods=['get'], url_path='student/history')
     def student_history(self, request):
@@ -191,7 +234,7 @@ class TeamViewSet(viewsets.GenericViewSet):
 
         response_data = {
             'event_name': event.event_name,
-            'my_team_info': GroupDetailSerializer(group).data if group else None,
+            'my_team_info': GroupDetailSerializer(group, context=self.get_serializer_context()).data if group else None,
         }
         return Response(response_data)
 
@@ -205,7 +248,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '您没有参与正在进行的互选活动，无法创建团队'},
@@ -229,7 +272,7 @@ class TeamViewSet(viewsets.GenericViewSet):
         GroupMembership.objects.create(student=student, group=group)
 
         return Response(
-            GroupDetailSerializer(group).data,
+            GroupDetailSerializer(group, context=self.get_serializer_context()).data,
             status=status.HTTP_201_CREATED
         )
 
@@ -243,7 +286,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '您没有参与正在进行的互选活动'},
@@ -283,7 +326,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有进行中的活动'},
@@ -329,11 +372,21 @@ class TeamViewSet(viewsets.GenericViewSet):
         if not active_event:
             return Response([], status=status.HTTP_200_OK)
 
-        queryset = self.get_queryset().filter(event=active_event).select_related(
-            'captain', 'advisor'
-        ).prefetch_related('members')
+        version = get_event_version(active_event.event_id)
+        etag = event_etag('all-teams', active_event.event_id, version, request)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        fields = GroupDetailSerializer.selected_fields(request)
+        if fields is None:
+            # 完整输出对所有学生都相同，直接返回预先渲染的快照
+            data = get_team_snapshot(active_event.event_id, version)
+            return with_etag(HttpResponse(data, content_type='application/json'), etag)
+
+        queryset = self.get_queryset().filter(event=active_event).order_by('group_id')
 
-        return Response(GroupDetailSerializer(queryset, many=True).data)
+        return with_etag(Response(serialize_groups(queryset, fields)), etag)
 
     @action(detail=False, methods=['put'], url_path='my-team/update')
     def update_my_team(self, request):
@@ -345,7 +398,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有进行中的活动'},
@@ -363,8 +416,8 @@ class TeamViewSet(viewsets.GenericViewSet):
                                                  context={'active_event': active_event})
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        group.refresh_from_db()
-        return Response(GroupDetailSerializer(group).data)
+        group = self.eager_groups(Group.objects.all()).get(pk=group.pk)
+        return Response(GroupDetailSerializer(group, context=self.get_serializer_context()).data)
 
     @action(detail=False, methods=['post'], url_path='my-team/remove-member')
     @transaction.atomic
@@ -377,7 +430,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有进行中的活动'},
@@ -436,7 +489,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有进行中的活动'},
@@ -489,17 +542,86 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        return Response(serialize_available_teammates(
+            self.available_teammates_queryset(student, active_event),
+            AvailableTeammateSerializer.selected_fields(request)
+        ))
+
+    def available_teammates_queryset(self, student: Student, event: MutualSelectionEvent):
+        """活动中尚未加入任何团队的其他学生"""
         grouped_student_ids = GroupMembership.objects.filter(
-            group__event=active_event
+            group__event=event
         ).values_list('student_id', flat=True)
 
-        available_students = active_event.students.exclude(
+        return event.students.exclude(
             pk__in=grouped_student_ids
-        ).exclude(pk=student.pk)
+        ).exclude(pk=student.pk).order_by('stu_id')
 
-        return Response(
-            self.get_serializer(available_students, many=True).data
-        )
+    @action(detail=False, methods=['get'], url_path='student/bootstrap')
+    def student_bootstrap(self, request):
+        """
+        学生工作台首屏数据：一次返回 dashboard、all-teams、available-teachers、available-teammates
+        和个人信息，内容与各接口相同。?sections= 指定只返回其中几部分（逗号分隔）。
+        活动只查询一次；我的团队取自活动团队快照，不再单独查询。
+        没有进行中的活动时 all_teams 为 []，available_teachers / available_teammates 为 null。
+        """
+        student = request.user
+        if not isinstance(student, Student):
+            return Response({'error': '当前用户不是学生账号'}, status=status.HTTP_403_FORBIDDEN)
+
+        sections = request.query_params.get('sections')
+        sections = BOOTSTRAP_SECTIONS if not sections else [name.strip() for name in sections.split(',')]
+        unknown = [name for name in sections if name not in BOOTSTRAP_SECTIONS]
+        if unknown:
+            return Response(
+                {'error': f"未知的 sections: {', '.join(unknown)}，可选值：{', '.join(BOOTSTRAP_SECTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        now = timezone.now()
+        # dashboard 的活动覆盖学生互选期和教师互选期，其余部分只在学生互选期内有效
+        dashboard_event = self.get_dashboard_event_for_student(student, now)
+        active_event = dashboard_event if dashboard_event and now <= dashboard_event.stu_end_time else None
+        dashboard = self.dashboard_data(dashboard_event, now)
+
+        etag = None
+        teams = None
+        if dashboard_event:
+            version = get_event_version(dashboard_event.event_id)
+            etag = event_etag(
+                'bootstrap', dashboard_event.event_id, version, request, f's{student.pk}', dashboard['phase_status']
+            )
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+            if 'dashboard' in sections or 'all_teams' in sections:
+                teams = get_team_payload(dashboard_event.event_id, version)
+
+        data = {}
+        for name in sections:
+            if name == 'dashboard':
+                for team in teams or ():
+                    if any(member['stu_id'] == student.pk for member in team['members']):
+                        dashboard['my_team_info'] = team
+                        dashboard['is_captain'] = (team['captain'] or {}).get('stu_id') == student.pk
+                        break
+                data['dashboard'] = dashboard
+            elif name == 'all_teams':
+                data['all_teams'] = teams if active_event else []
+            elif name == 'available_teachers':
+                data['available_teachers'] = TeamAdvisorSerializer(
+                    active_event.teachers.all(), many=True
+                ).data if active_event else None
+            elif name == 'available_teammates':
+                data['available_teammates'] = serialize_available_teammates(
+                    self.available_teammates_queryset(student, active_event)
+                ) if active_event else None
+            elif name == 'profile':
+                data['profile'] = StudentProfileSerializer(student).data
+
+        if etag is None:
+            return Response(data)
+        return with_etag(Response(data), etag)
 
     @action(detail=False, methods=['post'], url_path='my-team/add-member')
     @transaction.atomic
@@ -512,7 +634,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有进行中的活动'},
@@ -578,14 +700,7 @@ class TeamViewSet(viewsets.GenericViewSet):
             )
 
         try:
-            group = Group.objects.prefetch_related(
-                'members__major',
-                'captain',
-                'advisor',
-                'preferred_advisor_1',
-                'preferred_advisor_2',
-                'preferred_advisor_3'
-            ).get(pk=pk)
+            group = self.eager_groups(Group.objects.all()).get(pk=pk)
         except Group.DoesNotExist:
             return Response(
                 {'error': '团队不存在'},
@@ -594,13 +709,13 @@ class TeamViewSet(viewsets.GenericViewSet):
 
         # 检查学生是否有权查看（参与了该活动）
         active_event = self.get_active_event_for_student(student)
-        if active_event and group.event == active_event:
+        if active_event and group.event_id == active_event.pk:
             # 当前活动中的团队，可以查看
-            return Response(GroupDetailSerializer(group).data)
+            return Response(GroupDetailSerializer(group, context=self.get_serializer_context()).data)
 
         # 检查是否是历史活动中的团队
-        if group.event.students.filter(pk=student.pk).exists():
-            return Response(GroupDetailSerializer(group).data)
+        if MutualSelectionEvent.objects.filter(pk=group.event_id, students=student).exists():
+            return Response(GroupDetailSerializer(group, context=self.get_serializer_context()).data)
 
         return Response(
             {'error': '您没有权限查看该团队信息'},
@@ -618,7 +733,7 @@ class TeamViewSet(viewsets.GenericViewSet):
             return Response({'error': '当前用户不是学生账号'}, status=status.HTTP_403_FORBIDDEN)
 
         # 1. 检查活动有效性
-        active_event = self.get_active_event_for_student(student)
+        active_event = self.get_active_event_for_student(student, for_write=True)
         if not active_event:
             return Response({'error': '当前没有进行中的互选活动，无法操作'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -672,46 +787,31 @@ class TeamViewSet(viewsets.GenericViewSet):
                 "active_event": None
             }, status=status.HTTP_200_OK)
 
-        # 1. 查询当前活动中的所有团队
-        teams_in_event = Group.objects.filter(event=active_event).select_related(
-            'captain', 'preferred_advisor_1', 'preferred_advisor_2', 'preferred_advisor_3'
-        ).prefetch_related('members__major')
-
-        # 2. ✅【核心修改】使用 `Case/When` 动态添加 `student_preference_rank` 字段
-        # 这个字段表示学生团队将当前老师选为第几志愿
-        student_preference_subquery = Case(
-            When(preferred_advisor_1=current_teacher, then=Value(1)),
-            When(preferred_advisor_2=current_teacher, then=Value(2)),
-            When(preferred_advisor_3=current_teacher, then=Value(3)),
-            default=Value(None),
-            output_field=IntegerField(null=True)
-        )
-
-        # 3. 同时保留之前的 `my_preference_rank` 字段查询
-        my_preference_subquery = TeacherGroupPreference.objects.filter(
-            teacher=current_teacher,
-            group=OuterRef('pk')
-        ).values('preference_rank')[:1]
-
-        # 4. 将两个新字段附加到查询集上
-        queryset = teams_in_event.annotate(
-            student_preference_rank=student_preference_subquery,
-            my_preference_rank=Subquery(my_preference_subquery, output_field=IntegerField(null=True))
-        )
+        version = get_event_version(active_event.event_id)
+        etag = event_etag('teacher-dashboard', active_event.event_id, version, request, f't{current_teacher.pk}')
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
 
-        # 5. 获取老师自己的志愿，用于顶部卡片栏
+        # 1. 老师自己的志愿：用于顶部卡片栏，同时给出每个团队的 my_preference_rank
         preferences = TeacherGroupPreference.objects.filter(
             teacher=current_teacher,
             group__event=active_event
+        ).values_list('preference_rank', 'group_id')
+        preferences_data = {str(rank): group_id for rank, group_id in preferences}
+        my_ranks = {group_id: rank for rank, group_id in preferences}
+
+        # 2. 活动全部团队的完整输出由所有老师共享（见 snapshots），只在其上合并当前老师的
+        # student_preference_rank（团队把当前老师选为第几志愿）和 my_preference_rank
+        teams = merge_teacher_ranks(
+            get_team_payload(active_event.event_id, version),
+            current_teacher.pk,
+            my_ranks,
+            GroupDetailSerializer.selected_fields(request),
         )
-        preferences_data = {str(p.preference_rank): p.group_id for p in preferences}
-
-        # 6. 序列化数据并返回
-        # 注意: 确保 GroupDetailSerializer 包含 student_preference_rank 和 my_preference_rank 字段
-        serializer = GroupDetailSerializer(queryset, many=True)
 
-        return Response({
-            "teams": serializer.data,
+        return with_etag(Response({
+            "teams": teams,
             "preferences": preferences_data,
             "active_event": {
                 "event_id": active_event.event_id,
@@ -719,7 +819,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 "end_time": active_event.tea_end_time,
                 "teacher_choice_limit": active_event.teacher_choice_limit,
             }
-        })
+        }), etag)
 
     @action(detail=False, methods=['post'], url_path='teacher/set-preferences')
     @transaction.atomic
@@ -731,7 +831,7 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        active_event = self.get_active_event_for_teacher(current_teacher)
+        active_event = self.get_active_event_for_teacher(current_teacher, for_write=True)
         if not active_event:
             return Response(
                 {'error': '当前没有正在进行的互选活动'},
@@ -764,6 +864,9 @@ class TeamViewSet(viewsets.GenericViewSet):
 
         if new_preferences:
             TeacherGroupPreference.objects.bulk_create(new_preferences)
+        # bulk_create 不触发信号
+        invalidate_score_matrix(active_event.pk)
+        bump_event_version(active_event.pk)
 
         return Response({'message': '志愿设置成功！'}, status=status.HTTP_200_OK)
 
@@ -810,10 +913,10 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        advised_groups = Group.objects.filter(
+        advised_groups = self.eager_groups(Group.objects.filter(
             event=event,
             advisor=current_teacher
-        ).prefetch_related('members', 'captain')
+        ))
 
         preferences = TeacherGroupPreference.objects.filter(
             teacher=current_teacher,
@@ -823,9 +926,11 @@ class TeamViewSet(viewsets.GenericViewSet):
 
         response_data = {
             'event_name': event.event_name,
-            'advised_groups': GroupDetailSerializer(advised_groups, many=True).data,
+            'advised_groups': GroupDetailSerializer(advised_groups, many=True, context=self.get_serializer_context()).data,
             'preferences': preferences_data,
-            'all_teams_in_event': GroupDetailSerializer(event.groups.all(), many=True).data
+            'all_teams_in_event': GroupDetailSerializer(
+                self.eager_groups(event.groups.all()), many=True, context=self.get_serializer_context()
+            ).data
         }
         return Response(response_data)
 
@@ -843,11 +948,7 @@ class TeamViewSet(viewsets.GenericViewSet):
             )
 
         try:
-            group = Group.objects.prefetch_related(
-                'members__major',
-                'captain',
-                'advisor'
-            ).get(pk=pk)
+            group = self.eager_groups(Group.objects.all()).get(pk=pk)
         except Group.DoesNotExist:
             return Response(
                 {'error': '团队不存在'},
@@ -855,13 +956,13 @@ class TeamViewSet(viewsets.GenericViewSet):
             )
 
         # 检查教师是否有权查看（参与了该活动）
-        if not group.event.teachers.filter(teacher_id=current_teacher.teacher_id).exists():
+        if not MutualSelectionEvent.objects.filter(pk=group.event_id, teachers=current_teacher).exists():
             return Response(
                 {'error': '您没有权限查看该团队信息'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        return Response(GroupDetailSerializer(group).data)
+        return Response(GroupDetailSerializer(group, context=self.get_serializer_context()).data)
 
     @action(detail=False, methods=['get'], url_path='teacher/current-advised-groups')
     def get_current_advised_groups(self, request):
@@ -883,24 +984,24 @@ class TeamViewSet(viewsets.GenericViewSet):
             })
 
         # 获取当前活动中指导的团队
-        advised_groups = Group.objects.filter(
+        advised_groups = self.eager_groups(Group.objects.filter(
             event=active_event,
             advisor=current_teacher
-        ).prefetch_related(
-            'members__major',
-            'captain'
-        )
+        ))
 
         return Response({
             'event_id': active_event.event_id,
             'event_name': active_event.event_name,
-            'groups': GroupDetailSerializer(advised_groups, many=True).data})
+            'groups': GroupDetailSerializer(advised_groups, many=True, context=self.get_serializer_context()).data})
 
     # --- 管理员端 API ---
 
     @action(detail=True, methods=['post'], url_path='admin/auto-assign')
-    @transaction.atomic
     def auto_assign(self, request, pk=None):
+        """
+        自动分配。请求参数 async=true 时提交后台任务（由 run_assign_jobs 命令执行），
+        立即返回任务ID，通过 admin/auto-assign-jobs/<job_id> 查询进度。
+        """
         if not is_admin(request.user):
             return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -916,178 +1017,109 @@ class TeamViewSet(viewsets.GenericViewSet):
         #         status=status.HTTP_400_BAD_REQUEST
         #     )
 
-        # 清除旧的临时分配
-        ProvisionalAssignment.objects.filter(event=event).delete()
+        # 分配算法：默认最小费用流（总得分最优），greedy 为原有贪心算法，保留用于对比
+        algorithm = request.data.get('algorithm') or request.query_params.get('algorithm') or ALGORITHM_MIN_COST_FLOW
+        if algorithm not in ALGORITHMS:
+            return Response(
+                {'error': f'不支持的分配算法: {algorithm}，可选值: {", ".join(ALGORITHMS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        groups = list(Group.objects.filter(event=event))
-        teachers = list(event.teachers.all())
+        # 随机阶段的种子：输入和种子都不变时直接返回上次的结果，force=true 强制重新计算
+        seed = request.data.get('seed', request.query_params.get('seed', DEFAULT_SEED))
+        try:
+            seed = int(seed)
+        except (TypeError, ValueError):
+            return Response({'error': 'seed 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        force = str(request.data.get('force', request.query_params.get('force'))).lower() in ('1', 'true', 'yes')
+
+        run_async = request.data.get('async', request.query_params.get('async'))
+        if str(run_async).lower() in ('1', 'true', 'yes'):
+            job, created = enqueue_auto_assign(event, algorithm, seed=seed, force=force)
+            return Response(
+                {
+                    'message': '分配任务已提交' if created else '该活动已有进行中的分配任务',
+                    **job_payload(job),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
 
-        if not groups:
-            return Response({'error': '当前活动没有任何团队'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = run_auto_assign(event, algorithm, seed=seed, force=force)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not teachers:
-            return Response({'error': '当前活动没有参与的教师'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
 
-        # 构建学生志愿字典
-        student_prefs = {
-            g.group_id: [
-                g.preferred_advisor_1_id,
-                g.preferred_advisor_2_id,
-                g.preferred_advisor_3_id
-            ]
-            for g in groups
-        }
+    @action(detail=False, methods=['get'], url_path=r'admin/auto-assign-jobs/(?P<job_id>\d+)')
+    def auto_assign_job_status(self, request, job_id=None):
+        """查询后台分配任务的进度和结果"""
+        if not is_admin(request.user):
+            return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
-        # 构建教师志愿字典
-        teacher_prefs = {
-            t.teacher_id: {
-                pref.group_id: pref.preference_rank
-                for pref in t.group_preferences.filter(group__event=event)
-            }
-            for t in teachers
-        }
+        try:
+            job = AutoAssignJob.objects.get(pk=job_id)
+        except AutoAssignJob.DoesNotExist:
+            return Response({'error': '任务不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 教师剩余容量
-        teacher_capacity = {t.teacher_id: event.teacher_choice_limit for t in teachers}
+        return Response(job_payload(job))
 
-        # 权重和评分规则
-        TEACHER_WEIGHT_MULTIPLIER = 1.2  # 教师志愿权重稍高
-        TEACHER_PREF_SCORES = {1: 10, 2: 8, 3: 6, 4: 4, 5: 2}
-        STUDENT_PREF_SCORES = {1: 10, 2: 5, 3: 2}
+    @action(detail=True, methods=['post'], url_path='admin/simulate-weights')
+    def simulate_weights(self, request, pk=None):
+        """
+        对比多组评分权重下的分配效果，不写入 ProvisionalAssignment。
+        请求体: {"algorithm": "min_cost_flow", "scenarios": [
+            {"name": "...", "teacher_weight": 1.2,
+             "teacher_pref_scores": {"1": 10, ...}, "student_pref_scores": {"1": 10, ...}}, ...]}
+        未填写的字段使用当前默认规则。
+        """
+        if not is_admin(request.user):
+            return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
-        # ========== 第一阶段：基于双向志愿的优先匹配 ==========
-        scores = []
-        for group in groups:
-            for t in teachers:
-                teacher_score = 0
-                student_score = 0
-                explanation_parts = []
-
-                # 计算教师志愿得分
-                teacher_rank = teacher_prefs.get(t.teacher_id, {}).get(group.group_id)
-                if teacher_rank:
-                    teacher_score = TEACHER_PREF_SCORES.get(teacher_rank, 0)
-                    if teacher_score > 0:
-                        explanation_parts.append(f"教师第{teacher_rank}志愿")
-
-                # 计算学生志愿得分
-                try:
-                    student_rank = student_prefs[group.group_id].index(t.teacher_id) + 1
-                    student_score = STUDENT_PREF_SCORES.get(student_rank, 0)
-                    if student_score > 0:
-                        explanation_parts.append(f"学生第{student_rank}志愿")
-                except (ValueError, IndexError):
-                    pass
-
-                # 计算总分
-                total_score = (teacher_score * TEACHER_WEIGHT_MULTIPLIER) + student_score
-
-                # 即使总分为0也要记录，用于后续随机分配
-                scores.append({
-                    'group': group,
-                    'teacher': t,
-                    'score': round(total_score, 2),
-                    'explanation': " + ".join(explanation_parts) if explanation_parts else "无志愿匹配",
-                    'has_preference': total_score > 0
-                })
+        try:
+            event = MutualSelectionEvent.objects.get(pk=pk)
+        except MutualSelectionEvent.DoesNotExist:
+            return Response({'error': '活动不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 按得分降序排序
-        scores.sort(key=lambda x: (x['has_preference'], x['score']), reverse=True)
-
-        assigned_groups = set()
-        provisional_assignments = []
-
-        # ========== 第二阶段：优先匹配有志愿的组合 ==========
-        for match in scores:
-            if not match['has_preference']:
-                break  # 已经到无志愿匹配的部分了
-
-            group, teacher_obj = match['group'], match['teacher']
-            if group.group_id in assigned_groups or teacher_capacity[teacher_obj.teacher_id] <= 0:
-                continue
-
-            provisional_assignments.append(
-                ProvisionalAssignment(
-                    event=event,
-                    group=group,
-                    teacher=teacher_obj,
-                    assignment_type='auto',
-                    score=match['score'],
-                    explanation=match['explanation']
-                )
+        algorithm = request.data.get('algorithm') or ALGORITHM_MIN_COST_FLOW
+        if algorithm not in ALGORITHMS:
+            return Response(
+                {'error': f'不支持的分配算法: {algorithm}，可选值: {", ".join(ALGORITHMS)}'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            assigned_groups.add(group.group_id)
-            teacher_capacity[teacher_obj.teacher_id] -= 1
-
-        # ========== 第三阶段：随机分配剩余团队 ==========
-        unassigned_groups = [g for g in groups if g.group_id not in assigned_groups]
-        available_teachers_list = [t for t in teachers if teacher_capacity[t.teacher_id] > 0]
-
-        if unassigned_groups and available_teachers_list:
-            # 打乱教师顺序，实现随机性
-            random.shuffle(available_teachers_list)
-
-            for group in unassigned_groups:
-                # 找到还有容量的教师
-                assigned = False
-                for t in available_teachers_list:
-                    if teacher_capacity[t.teacher_id] > 0:
-                        provisional_assignments.append(
-                            ProvisionalAssignment(
-                                event=event,
-                                group=group,
-                                teacher=t,
-                                assignment_type='auto',
-                                score=0.0,
-                                explanation='随机分配（无志愿匹配）'
-                            )
-                        )
-                        assigned_groups.add(group.group_id)
-                        teacher_capacity[t.teacher_id] -= 1
-                        assigned = True
-                        break
 
-                # 如果所有教师都满额，但还有未分配的团队，需要扩容
-                if not assigned:
-                    # 找到当前指导团队最少的教师
-                    min_assigned_teacher = min(teachers,
-                                               key=lambda t: event.teacher_choice_limit - teacher_capacity[
-                                                   t.teacher_id])
-
-                    provisional_assignments.append(
-                        ProvisionalAssignment(
-                            event=event,
-                            group=group,
-                            teacher=min_assigned_teacher,
-                            assignment_type='auto',
-                            score=0.0,
-                            explanation=f'超额分配（原名额已满）'
-                        )
-                    )
-                    assigned_groups.add(group.group_id)
-                    # 注意：这里不再减少容量，因为已经超额了
-
-        # 批量创建分配记录
-        ProvisionalAssignment.objects.bulk_create(provisional_assignments)
-
-        # 统计信息
-        preference_matched = sum(1 for pa in provisional_assignments if pa.score > 0)
-        random_assigned = sum(1 for pa in provisional_assignments if pa.score == 0)
-        over_capacity_teachers = [
-            t.teacher_name for t in teachers
-            if teacher_capacity[t.teacher_id] < 0
-        ]
+        configs = request.data.get('scenarios')
+        if not isinstance(configs, list) or not configs:
+            return Response({'error': '请求体中必须包含一个非空的 "scenarios" 列表。'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(configs) > MAX_SCENARIOS:
+            return Response({'error': f'一次最多比较 {MAX_SCENARIOS} 个方案'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            scenarios = [parse_scenario(config, i) for i, config in enumerate(configs)]
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            seed = int(request.data.get('seed', DEFAULT_SEED))
+        except (TypeError, ValueError):
+            return Response({'error': 'seed 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+        score_matrix = get_score_matrix(event)
+        if not score_matrix.group_ids:
+            return Response({'error': '当前活动没有任何团队'}, status=status.HTTP_400_BAD_REQUEST)
+        if not score_matrix.teacher_ids:
+            return Response({'error': '当前活动没有参与的教师'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = run_scenarios(score_matrix, scenarios, event.teacher_choice_limit, algorithm, seed=seed)
 
         return Response({
-            'message': '自动分配完成！',
-            'total_groups': len(groups),
-            'total_teachers': len(teachers),
-            'assigned_count': len(provisional_assignments),
-            'preference_matched': preference_matched,
-            'random_assigned': random_assigned,
-            'unassigned_count': len(groups) - len(provisional_assignments),
-            'over_capacity_teachers': over_capacity_teachers,
-            'details': f'志愿匹配: {preference_matched}组，随机分配: {random_assigned}组'
+            'event_id': event.event_id,
+            'algorithm': algorithm,
+            'seed': seed,
+            'total_groups': len(score_matrix.group_ids),
+            'total_teachers': len(score_matrix.teacher_ids),
+            'teacher_limit': event.teacher_choice_limit,
+            'scenarios': results,
         })
 
     @action(detail=True, methods=['get'], url_path='admin/match-options')
@@ -1109,93 +1141,79 @@ class TeamViewSet(viewsets.GenericViewSet):
         except (Group.DoesNotExist, MutualSelectionEvent.DoesNotExist):
             return Response({'error': '团队或活动不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 获取团队的学生志愿
-        student_prefs = [
-            group.preferred_advisor_1_id,
-            group.preferred_advisor_2_id,
-            group.preferred_advisor_3_id
-        ]
+        score_matrix = get_score_matrix(event)
+        row = score_matrix.group_index[group.group_id]
+        scores = score_matrix.score_matrix[row].tolist()
+        teacher_ranks = score_matrix.teacher_rank_matrix[row].tolist()
+        student_ranks = score_matrix.student_rank_matrix[row].tolist()
 
         # 获取所有参与教师
-        teachers = event.teachers.all()
+        teachers = event.teachers.in_bulk(score_matrix.teacher_ids)
 
         # 计算当前每个教师已分配的团队数
-        teacher_assignments = defaultdict(int)
-        for assignment in ProvisionalAssignment.objects.filter(event=event):
-            teacher_assignments[assignment.teacher_id] += 1
-
-        # 评分规则
-        TEACHER_WEIGHT_MULTIPLIER = 1.2
-        TEACHER_PREF_SCORES = {1: 10, 2: 8, 3: 6, 4: 4, 5: 2}
-        STUDENT_PREF_SCORES = {1: 10, 2: 5, 3: 2}
+        teacher_assignments = self._get_teacher_loads(event)
+        limit = event.teacher_choice_limit
 
         match_options = []
-        for t in teachers:
-            teacher_score = 0
-            student_score = 0
+        for col in score_matrix.top_k(group.group_id).tolist():
+            t = teachers[score_matrix.teacher_ids[col]]
+            total_score = scores[col]
             details = []
 
-            # 计算教师志愿得分
-            teacher_pref = TeacherGroupPreference.objects.filter(
-                teacher=t,
-                group=group
-            ).first()
-
-            if teacher_pref:
-                teacher_score = TEACHER_PREF_SCORES.get(teacher_pref.preference_rank, 0)
-                if teacher_score > 0:
-                    details.append({
-                        'type': 'teacher_preference',
-                        'rank': teacher_pref.preference_rank,
-                        'score': teacher_score * TEACHER_WEIGHT_MULTIPLIER,
-                        'description': f'教师第{teacher_pref.preference_rank}志愿'
-                    })
-
-            # 计算学生志愿得分
-            try:
-                student_rank = student_prefs.index(t.teacher_id) + 1
-                student_score = STUDENT_PREF_SCORES.get(student_rank, 0)
-                if student_score > 0:
-                    details.append({
-                        'type': 'student_preference',
-                        'rank': student_rank,
-                        'score': student_score,
-                        'description': f'学生第{student_rank}志愿'
-                    })
-            except (ValueError, IndexError):
-                pass
-
-            # 计算总分
-            total_score = (teacher_score * TEACHER_WEIGHT_MULTIPLIER) + student_score
+            # 教师志愿得分
+            teacher_rank = teacher_ranks[col]
+            teacher_score = TEACHER_PREF_SCORES.get(teacher_rank, 0)
+            if teacher_score > 0:
+                details.append({
+                    'type': 'teacher_preference',
+                    'rank': teacher_rank,
+                    'score': teacher_score * TEACHER_WEIGHT_MULTIPLIER,
+                    'description': f'教师第{teacher_rank}志愿'
+                })
+
+            # 学生志愿得分
+            student_rank = student_ranks[col]
+            student_score = STUDENT_PREF_SCORES.get(student_rank, 0)
+            if student_score > 0:
+                details.append({
+                    'type': 'student_preference',
+                    'rank': student_rank,
+                    'score': student_score,
+                    'description': f'学生第{student_rank}志愿'
+                })
 
             # 判断是否超额
             current_load = teacher_assignments[t.teacher_id]
-            is_over_capacity = current_load >= event.teacher_choice_limit
+            is_over_capacity = current_load >= limit
 
             match_options.append({
                 'teacher_id': t.teacher_id,
                 'teacher_name': t.teacher_name,
                 'teacher_no': t.teacher_no,
                 'research_direction': t.research_direction,
-                'total_score': round(total_score, 2),
+                'total_score': total_score,
                 'score_details': details,
                 'current_load': current_load,
-                'capacity_limit': event.teacher_choice_limit,
+                'capacity_limit': limit,
                 'is_over_capacity': is_over_capacity,
-                'load_percentage': round((current_load / event.teacher_choice_limit) * 100,
-                                         1) if event.teacher_choice_limit > 0 else 0,
+                'load_percentage': round((current_load / limit) * 100, 1) if limit > 0 else 0,
                 'recommendation': self._get_recommendation(total_score, is_over_capacity)
             })
 
-        # 按总分降序排序
-        match_options.sort(key=lambda x: x['total_score'], reverse=True)
-
         return Response({
             'group_id': group.group_id,
             'group_name': group.group_name,
             'match_options': match_options
         })
 
+    def _get_teacher_loads(self, event):
+        """各教师当前的临时分配数量"""
+        loads = defaultdict(int)
+        for teacher_id, count in ProvisionalAssignment.objects.filter(event=event).values(
+                'teacher_id').annotate(count=Count('id')).values_list('teacher_id', 'count'):
+            loads[teacher_id] = count
+        return loads
+
     def _get_recommendation(self, score, is_over_capacity):
         """生成推荐等级"""
         if is_over_capacity:
@@ -1216,6 +1234,7 @@ class TeamViewSet(viewsets.GenericViewSet):
         """
         ✅ 新增：获取活动中所有团队和教师的匹配矩阵
         用于管理员全局查看匹配情况
+        可选参数 top_k：每个团队只返回得分最高的 k 位教师
         """
         if not is_admin(request.user):
             return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
@@ -1225,99 +1244,78 @@ class TeamViewSet(viewsets.GenericViewSet):
         except MutualSelectionEvent.DoesNotExist:
             return Response({'error': '活动不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        groups = Group.objects.filter(event=event)
-        teachers = event.teachers.all()
-
-        # 构建学生志愿字典
-        student_prefs = {
-            g.group_id: [
-                g.preferred_advisor_1_id,
-                g.preferred_advisor_2_id,
-                g.preferred_advisor_3_id
-            ]
-            for g in groups
-        }
-
-        # 构建教师志愿字典
-        teacher_prefs_map = {}
-        for pref in TeacherGroupPreference.objects.filter(group__event=event):
-            key = (pref.teacher_id, pref.group_id)
-            teacher_prefs_map[key] = pref.preference_rank
+        top_k = request.query_params.get('top_k')
+        if top_k is not None:
+            try:
+                top_k = int(top_k)
+                if top_k <= 0:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'top_k 必须是正整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+        score_matrix = get_score_matrix(event)
+        groups = Group.objects.filter(event=event).select_related('captain').annotate(
+            member_count=Count('members')
+        ).order_by('group_id')
+        teachers = event.teachers.in_bulk(score_matrix.teacher_ids)
+        teacher_names = [teachers[t].teacher_name for t in score_matrix.teacher_ids]
 
         # 计算教师当前负载
-        teacher_assignments = defaultdict(int)
-        for assignment in ProvisionalAssignment.objects.filter(event=event):
-            teacher_assignments[assignment.teacher_id] += 1
-
-        # 评分规则
-        TEACHER_WEIGHT_MULTIPLIER = 1.2
-        TEACHER_PREF_SCORES = {1: 10, 2: 8, 3: 6, 4: 4, 5: 2}
-        STUDENT_PREF_SCORES = {1: 10, 2: 5, 3: 2}
+        teacher_assignments = self._get_teacher_loads(event)
+        limit = event.teacher_choice_limit
+        loads = [teacher_assignments[t] for t in score_matrix.teacher_ids]
+        over_capacity = [load >= limit for load in loads]
+
+        # 按得分排序（同分保持教师顺序），整体一次性取出
+        order = score_matrix.ranked_teachers(top_k)
+        sorted_scores = np.take_along_axis(score_matrix.score_matrix, order, axis=1).tolist()
+        sorted_teacher_ranks = np.take_along_axis(score_matrix.teacher_rank_matrix, order, axis=1).tolist()
+        sorted_student_ranks = np.take_along_axis(score_matrix.student_rank_matrix, order, axis=1).tolist()
+        order = order.tolist()
+        teacher_ids = score_matrix.teacher_ids
 
         # 构建匹配矩阵
         match_matrix = []
         for group in groups:
-            group_matches = {
+            row = score_matrix.group_index[group.group_id]
+            match_matrix.append({
                 'group_id': group.group_id,
                 'group_name': group.group_name,
                 'captain_name': group.captain.stu_name if group.captain else '无',
-                'member_count': group.members.count(),
-                'teachers': []
-            }
-
-            for t in teachers:
-                teacher_score = 0
-                student_score = 0
-
-                # 教师志愿得分
-                teacher_rank = teacher_prefs_map.get((t.teacher_id, group.group_id))
-                if teacher_rank:
-                    teacher_score = TEACHER_PREF_SCORES.get(teacher_rank, 0) * TEACHER_WEIGHT_MULTIPLIER
-
-                # 学生志愿得分
-                try:
-                    student_rank = student_prefs[group.group_id].index(t.teacher_id) + 1
-                    student_score = STUDENT_PREF_SCORES.get(student_rank, 0)
-                except (ValueError, IndexError):
-                    pass
-
-                total_score = teacher_score + student_score
-                current_load = teacher_assignments[t.teacher_id]
-                is_over_capacity = current_load >= event.teacher_choice_limit
-
-                group_matches['teachers'].append({
-                    'teacher_id': t.teacher_id,
-                    'teacher_name': t.teacher_name,
-                    'score': round(total_score, 2),
-                    'teacher_rank': teacher_rank,
-                    'student_rank': student_prefs[group.group_id].index(t.teacher_id) + 1 if t.teacher_id in
-                                                                                             student_prefs[
-                                                                                                 group.group_id] else None,
-                    'current_load': current_load,
-                    'is_over_capacity': is_over_capacity
-                })
-
-            # 按得分排序
-            group_matches['teachers'].sort(key=lambda x: x['score'], reverse=True)
-            match_matrix.append(group_matches)
+                'member_count': group.member_count,
+                'teachers': [
+                    {
+                        'teacher_id': teacher_ids[col],
+                        'teacher_name': teacher_names[col],
+                        'score': score,
+                        'teacher_rank': teacher_rank or None,
+                        'student_rank': student_rank or None,
+                        'current_load': loads[col],
+                        'is_over_capacity': over_capacity[col]
+                    }
+                    for col, score, teacher_rank, student_rank in zip(
+                        order[row], sorted_scores[row], sorted_teacher_ranks[row], sorted_student_ranks[row]
+                    )
+                ]
+            })
 
         # 教师统计
         teacher_stats = []
-        for t in teachers:
-            assigned_count = teacher_assignments[t.teacher_id]
+        for col, teacher_id in enumerate(teacher_ids):
+            assigned_count = loads[col]
             teacher_stats.append({
-                'teacher_id': t.teacher_id,
-                'teacher_name': t.teacher_name,
+                'teacher_id': teacher_id,
+                'teacher_name': teacher_names[col],
                 'assigned_count': assigned_count,
-                'capacity_limit': event.teacher_choice_limit,
-                'remaining_capacity': max(0, event.teacher_choice_limit - assigned_count),
-                'is_over_capacity': assigned_count > event.teacher_choice_limit
+                'capacity_limit': limit,
+                'remaining_capacity': max(0, limit - assigned_count),
+                'is_over_capacity': assigned_count > limit
             })
 
         return Response({
             'event_name': event.event_name,
-            'total_groups': groups.count(),
-            'total_teachers': teachers.count(),
+            'total_groups': len(match_matrix),
+            'total_teachers': len(teacher_ids),
             'match_matrix': match_matrix,
             'teacher_stats': teacher_stats
         })
@@ -1327,24 +1325,32 @@ class TeamViewSet(viewsets.GenericViewSet):
         if not is_admin(request.user):
             return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
-        assignments = ProvisionalAssignment.objects.filter(
-            event_id=pk
-        ).select_related(
-            'group', 'teacher', 'group__captain'
-        ).prefetch_related('group__members')
+        fields = ProvisionalAssignmentSerializer.selected_fields(request)
+        assignments = ProvisionalAssignment.objects.filter(event_id=pk)
+        if fields is None or 'teacher' in fields:
+            assignments = assignments.select_related('teacher')
+        if fields is None or 'group' in fields:
+            assignments = GroupDetailSerializer.setup_eager_loading(
+                assignments.select_related('group'), prefix='group__'
+            )
 
-        serializer = ProvisionalAssignmentSerializer(assignments, many=True)
+        serializer = ProvisionalAssignmentSerializer(assignments, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='admin/manual-assign')
     @transaction.atomic
     def manual_assign(self, request, pk=None):
+        """
+        手动指定或取消某个小组的分配。
+        repair=true 时随后只对受影响的教师和小组做局部重新分配，手动指定的结果保持不变。
+        """
         if not is_admin(request.user):
             return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
         event_id = pk
         group_id = request.data.get('group_id')
         teacher_id = request.data.get('teacher_id')
+        repair = str(request.data.get('repair', '')).lower() in ('1', 'true', 'yes')
 
         try:
             event = MutualSelectionEvent.objects.get(pk=event_id)
@@ -1355,7 +1361,10 @@ class TeamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        previous_teacher_id = ProvisionalAssignment.objects.filter(group=group).values_list(
+            'teacher_id', flat=True).first()
         ProvisionalAssignment.objects.filter(group=group).delete()
+        clear_auto_assign_result(event)
 
         if teacher_id:
             try:
@@ -1383,11 +1392,54 @@ class TeamViewSet(viewsets.GenericViewSet):
                 score=9999,
                 explanation='管理员手动指定'
             )
-            return Response({
-                'message': f'已手动将小组"{group.group_name}"分配给 {teacher_obj.teacher_name}。'
-            })
+            message = f'已手动将小组"{group.group_name}"分配给 {teacher_obj.teacher_name}。'
+        else:
+            message = f'已取消小组"{group.group_name}"的分配。'
+
+        if not repair:
+            return Response({'message': message})
+
+        affected_teachers = {t for t in (previous_teacher_id, teacher_id and teacher_obj.pk) if t}
+        repair_result = run_repair(
+            event,
+            ALGORITHM_MIN_COST_FLOW,
+            affected_teacher_ids=affected_teachers,
+            # 取消分配的小组保持未分配
+            exclude_groups=() if teacher_id else (group.pk,)
+        )
+        return Response({'message': message, 'repair': repair_result})
+
+    @action(detail=True, methods=['post'], url_path='admin/repair-assignments')
+    def repair_assignments(self, request, pk=None):
+        """
+        局部修复临时分配：手动指定的结果固定不变，
+        只重新分配未分配的小组以及与受影响教师相关的小组。
+        teacher_ids 为空时取仍有剩余名额的教师。
+        """
+        if not is_admin(request.user):
+            return Response({'error': '无权访问'}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response({'message': f'已取消小组"{group.group_name}"的分配。'})
+        try:
+            event = MutualSelectionEvent.objects.get(pk=pk)
+        except MutualSelectionEvent.DoesNotExist:
+            return Response({'error': '活动不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        algorithm = request.data.get('algorithm') or ALGORITHM_MIN_COST_FLOW
+        if algorithm not in ALGORITHMS:
+            return Response(
+                {'error': f'不支持的分配算法: {algorithm}，可选值: {", ".join(ALGORITHMS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        teacher_ids = request.data.get('teacher_ids')
+        if teacher_ids is not None:
+            try:
+                teacher_ids = [int(t) for t in teacher_ids]
+            except (TypeError, ValueError):
+                return Response({'error': 'teacher_ids 必须是教师ID列表'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = run_repair(event, algorithm, affected_teacher_ids=teacher_ids)
+        return Response({'message': '局部修复完成！', **result})
 
     @action(detail=True, methods=['post'], url_path='admin/publish')
     @transaction.atomic
@@ -1412,6 +1464,8 @@ class TeamViewSet(viewsets.GenericViewSet):
 
         for pa in provisional_assignments:
             Group.objects.filter(pk=pa.group_id).update(advisor=pa.teacher)
+        # QuerySet.update 不触发信号
+        bump_event_version(event.pk)
 
         return Response({
             'message': f'结果发布成功！共为 {provisional_assignments.count()} 个团队确定了最终导师。'
@@ -1434,9 +1488,9 @@ class TeamViewSet(viewsets.GenericViewSet):
         total_student_count = event.students.count()
         grouped_student_ids = GroupMembership.objects.filter(group__event=event).values_list('student_id',
                                                                                              flat=True).distinct()
-        grouped_student_count = len(grouped_student_ids)
+        grouped_student_count = grouped_student_ids.count()
         ungrouped_students = event.students.exclude(pk__in=grouped_student_ids).select_related('major')
-        groups_in_event = Group.objects.filter(event=event).select_related('captain').prefetch_related('members')
+        groups_in_event = self.eager_groups(Group.objects.filter(event=event))
         all_event_students = event.students.all().select_related('major')
 
         # 临时序列化器，避免依赖其他 app
@@ -1447,20 +1501,36 @@ class TeamViewSet(viewsets.GenericViewSet):
                 model = Student
                 fields = ['stu_id', 'stu_name', 'stu_no', 'grade', 'major_name']
 
+        stats = {
+            'total_students': total_student_count,
+            'grouped_students': grouped_student_count,
+            'ungrouped_students': total_student_count - grouped_student_count,
+            'total_groups': groups_in_event.count(),
+        }
+
+        # ?stream=1：学生和团队列表分批读取、边序列化边输出
+        if wants_stream(request):
+            context = self.get_serializer_context()
+            return stream_json_response({
+                'event': {
+                    'event_id': event.event_id,
+                    'event_name': event.event_name,
+                    'students': serialized_array(all_event_students.order_by('stu_id'), TempStudentSerializer)
+                },
+                'stats': stats,
+                'ungrouped_students_list': serialized_array(ungrouped_students.order_by('stu_id'), TempStudentSerializer),
+                'groups_list': serialized_array(groups_in_event.order_by('group_id'), GroupDetailSerializer, context=context),
+            })
+
         return Response({
             'event': {
                 'event_id': event.event_id,
                 'event_name': event.event_name,
                 'students': TempStudentSerializer(all_event_students, many=True).data
             },
-            'stats': {
-                'total_students': total_student_count,
-                'grouped_students': grouped_student_count,
-                'ungrouped_students': total_student_count - grouped_student_count,
-                'total_groups': groups_in_event.count(),
-            },
+            'stats': stats,
             'ungrouped_students_list': TempStudentSerializer(ungrouped_students, many=True).data,
-            'groups_list': GroupDetailSerializer(groups_in_event, many=True).data,
+            'groups_list': GroupDetailSerializer(groups_in_event, many=True, context=self.get_serializer_context()).data,
         })
 
 
@@ -1509,8 +1579,9 @@ class TeamViewSet(viewsets.GenericViewSet):
         all_member_ids.add(int(captain_id))
         memberships = [GroupMembership(group=group, student_id=mid) for mid in all_member_ids]
         GroupMembership.objects.bulk_create(memberships)
+        bump_event_version(group.event_id)
 
-        return Response(GroupDetailSerializer(group).data, status=status.HTTP_201_CREATED)
+        return Response(GroupDetailSerializer(group, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['put'], url_path='admin/update-group')
     @transaction.atomic
@@ -1582,8 +1653,8 @@ class TeamViewSet(viewsets.GenericViewSet):
         group.save()
 
         # --- 返回更新后的数据 ---
-        updated_group = Group.objects.prefetch_related('members').get(pk=pk)
-        return Response(GroupDetailSerializer(updated_group).data, status=status.HTTP_200_OK)
+        updated_group = self.eager_groups(Group.objects.all()).get(pk=pk)
+        return Response(GroupDetailSerializer(updated_group, context=self.get_serializer_context()).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['delete'], url_path='admin/delete-group')
     def admin_delete_group(self, request, pk=None):
@@ -7,6 +7,9 @@ const STUDENT_BASE = 'student/';
 const TEACHER_BASE = 'teacher/';
 const TEAM_BASE = 'teams/';
 
+// 管理端列表接口使用游标分页：返回 { next, previous, results }，?with_count=1 时另有 count，
+// 页面通过 utils 中的 useCursorList 一次加载一页
+
 export default {
   // ========================================
   // 认证相关 (Authentication)
@@ -65,8 +68,8 @@ export default {
     return apiClient.post(`${ADMIN_BASE}register/`, data);
   },
 
-  getUsers() {
-    return apiClient.get(`${ADMIN_BASE}users/`);
+  getUsers(params = {}) {
+    return apiClient.get(`${ADMIN_BASE}users/`, { params });
   },
 
   createAdminUser(adminData) {
@@ -114,9 +117,14 @@ export default {
     return apiClient.put(`${STUDENT_BASE}profile/`, studentData);
   },
 
-  // 学生账号管理
-  getStudents() {
-    return apiClient.get(`${ADMIN_BASE}students/`);
+  // 学生账号管理（游标分页，支持 search / grade / major_name）
+  getStudents(params = {}) {
+    return apiClient.get(`${ADMIN_BASE}students/`, { params });
+  },
+
+  // 所有年级，供筛选使用
+  getStudentGrades() {
+    return apiClient.get(`${ADMIN_BASE}students/grades/`);
   },
 
   createStudent(studentData) {
@@ -167,8 +175,8 @@ export default {
   },
 
   // 教师账号管理
-  getTeachers() {
-    return apiClient.get(`${ADMIN_BASE}teachers/`);
+  getTeachers(params = {}) {
+    return apiClient.get(`${ADMIN_BASE}teachers/`, { params });
   },
 
   createTeacher(teacherData) {
@@ -211,6 +219,32 @@ export default {
     return apiClient.get(`${ADMIN_BASE}mutualselectionevents/`, { params });
   },
 
+  // 单个活动详情（包含全部参与者，编辑时使用）
+  getMutualSelectionEvent(eventId, params = {}) {
+    return apiClient.get(`${ADMIN_BASE}mutualselectionevents/${eventId}/`, { params });
+  },
+
+  // 活动参与者（分页，支持 search）
+  getEventStudents(eventId, params = {}) {
+    return apiClient.get(`${ADMIN_BASE}mutualselectionevents/${eventId}/students/`, { params });
+  },
+
+  getEventTeachers(eventId, params = {}) {
+    return apiClient.get(`${ADMIN_BASE}mutualselectionevents/${eventId}/teachers/`, { params });
+  },
+
+  // 活动参与者 ID：{ teacher_ids, student_ids }
+  getEventParticipantIds(eventId) {
+    return apiClient.get(`${ADMIN_BASE}mutualselectionevents/${eventId}/participant-ids/`);
+  },
+
+  // 已参与其他未结束活动的教师、学生 ID，exclude 为正在编辑的活动
+  getBusyParticipants(exclude = null) {
+    return apiClient.get(`${ADMIN_BASE}mutualselectionevents/busy-participants/`, {
+      params: exclude ? { exclude } : {}
+    });
+  },
+
   createMutualSelectionEvent(eventData) {
     return apiClient.post(`${ADMIN_BASE}mutualselectionevents/`, eventData);
   },
@@ -236,6 +270,12 @@ export default {
     return apiClient.get(`${TEAM_BASE}dashboard/`);
   },
 
+  // 首屏数据：sections 可选 dashboard / all_teams / available_teachers / available_teammates / profile
+  getStudentBootstrap(sections) {
+    const params = sections ? { sections: sections.join(',') } : {};
+    return apiClient.get(`${TEAM_BASE}student/bootstrap/`, { params });
+  },
+
   // 团队操作
   createTeam(data) {
     return apiClient.post(`${TEAM_BASE}create-team/`, data);
@@ -376,8 +416,9 @@ export default {
   // 其他 (Others)
   // ========================================
 
+  // 专业数量少，下拉框只取一页（最多 1000 条）
   getMajors() {
-    return apiClient.get(`${ADMIN_BASE}majors/`);
+    return apiClient.get(`${ADMIN_BASE}majors/`, { params: { page_size: 1000 } });
   },
 
   getGroups() {
@@ -385,7 +426,7 @@ export default {
   },
  // 【新增】获取活动管理详情（统计、未分组学生等）
   getEventManagementInfo(eventId) {
-    return apiClient.get(`${TEAM_BASE}${eventId}/admin/management-info/`);
+    return apiClient.get(`${TEAM_BASE}${eventId}/admin/management-info/`, { params: { stream: 1 } });
   },
   // 【新增】管理员强制创建团队
   adminCreateGroup(data) {
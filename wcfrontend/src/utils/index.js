@@ -1,3 +1,4 @@
+import { computed, ref } from 'vue'
 import dayjs from 'dayjs'
 import 'dayjs/locale/zh-cn'
 
@@ -65,4 +66,65 @@ export const throttle = (fn, delay = 300) => {
       timer = null
     }, delay)
   }
-}
\ No newline at end of file
+}
+
+/**
+ * 游标分页列表：一次只加载一页，沿接口返回的 next 翻页
+ * fetchPage(params) 返回 axios 响应，data 为 { next, previous, results, count }
+ * 第一页带 with_count=1 取总数，翻页时沿用
+ * 上一页使用记下的各页游标重新加载（排序字段有重复值时，反向游标的分页边界可能与正向不一致）
+ */
+export const useCursorList = (fetchPage, pageSize = 50) => {
+  const items = ref([])
+  const loading = ref(false)
+  const total = ref(null)
+  const page = ref(1)
+  const nextCursor = ref(null)
+  // cursors[i] 为第 i + 1 页的游标，第一页为 null
+  let cursors = [null]
+  let filters = {}
+
+  const cursorOf = (url) => (url ? new URL(url, window.location.origin).searchParams.get('cursor') : null)
+
+  const load = async (pageNumber) => {
+    const cursor = cursors[pageNumber - 1]
+    loading.value = true
+    try {
+      const params = { ...filters, page_size: pageSize }
+      if (cursor) {
+        params.cursor = cursor
+      } else {
+        params.with_count = 1
+      }
+      const response = await fetchPage(params)
+      items.value = response.data.results
+      nextCursor.value = cursorOf(response.data.next)
+      if (response.data.count !== undefined) total.value = response.data.count
+      page.value = pageNumber
+    } finally {
+      loading.value = false
+    }
+  }
+
+  return {
+    items,
+    loading,
+    total,
+    page,
+    hasNext: computed(() => !!nextCursor.value),
+    hasPrevious: computed(() => page.value > 1),
+    // 按新的筛选条件从第一页开始加载
+    search: (newFilters = filters) => {
+      filters = newFilters
+      cursors = [null]
+      return load(1)
+    },
+    reload: () => load(page.value),
+    nextPage: () => {
+      if (!nextCursor.value) return
+      cursors = [...cursors.slice(0, page.value), nextCursor.value]
+      return load(page.value + 1)
+    },
+    previousPage: () => page.value > 1 && load(page.value - 1)
+  }
+}